@@ -83,6 +83,8 @@ def run_migrations_online() -> None:
         config.get_section(config.config_ini_section),
         prefix="sqlalchemy.",
         poolclass=pool.NullPool,
+        # Partition bounds are read in the session time zone, as in the app
+        connect_args={"options": "-c timezone=utc"},
     )
 
     with connectable.connect() as connection:
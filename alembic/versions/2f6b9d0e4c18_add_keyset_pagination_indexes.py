@@ -0,0 +1,105 @@
+"""add keyset pagination indexes
+
+Revision ID: 2f6b9d0e4c18
+Revises: 7a4e2b8c1d53
+Create Date: 2026-10-17 15:26:09.104377
+
+"""
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision = "2f6b9d0e4c18"
+down_revision = "7a4e2b8c1d53"
+branch_labels = None
+depends_on = None
+
+# (table, index name, columns before, columns after, INCLUDE columns)
+WIDENED_INDEXES = [
+    (
+        "fuel",
+        "ix_fuel_datetime",
+        ["datetime"],
+        ["datetime", "id"],
+        ["quantity", "fuel_type", "emission_type"],
+    ),
+    (
+        "energy",
+        "ix_energy_datetime",
+        ["datetime"],
+        ["datetime", "id"],
+        ["quantity", "location", "energy_category"],
+    ),
+    (
+        "energy",
+        "ix_energy_location_datetime",
+        ["location", "datetime"],
+        ["location", "datetime", "id"],
+        ["quantity"],
+    ),
+    (
+        "oil",
+        "ix_oil_datetime",
+        ["datetime"],
+        ["datetime", "id"],
+        ["quantity", "oil_type"],
+    ),
+    (
+        "oil",
+        "ix_oil_oil_type_datetime",
+        ["oil_type", "datetime"],
+        ["oil_type", "datetime", "id"],
+        ["quantity"],
+    ),
+    (
+        "roadtrip",
+        "ix_roadtrip_datetime",
+        ["datetime"],
+        ["datetime", "id"],
+        ["quantity", "group"],
+    ),
+]
+
+# (table, index name, columns)
+NEW_INDEXES = [
+    ("fuel", "ix_fuel_fuel_type_datetime", ["fuel_type", "datetime", "id"]),
+    (
+        "fuel",
+        "ix_fuel_emission_type_datetime",
+        ["emission_type", "datetime", "id"],
+    ),
+    (
+        "energy",
+        "ix_energy_emission_type_datetime",
+        ["emission_type", "datetime", "id"],
+    ),
+    (
+        "oil",
+        "ix_oil_emission_type_datetime",
+        ["emission_type", "datetime", "id"],
+    ),
+    ("roadtrip", "ix_roadtrip_group_datetime", ["group", "datetime", "id"]),
+    (
+        "roadtrip",
+        "ix_roadtrip_emission_type_datetime",
+        ["emission_type", "datetime", "id"],
+    ),
+]
+
+
+def upgrade() -> None:
+    # The list endpoints page with `WHERE (datetime, id) > (...) ORDER BY
+    # datetime, id`, optionally after an equality filter on one enum column,
+    # so every index ends in `datetime, id` to serve the seek directly.
+    for table, name, _, columns, include in WIDENED_INDEXES:
+        op.drop_index(name, table_name=table)
+        op.create_index(name, table, columns, postgresql_include=include)
+    for table, name, columns in NEW_INDEXES:
+        op.create_index(name, table, columns)
+
+
+def downgrade() -> None:
+    for table, name, _ in reversed(NEW_INDEXES):
+        op.drop_index(name, table_name=table)
+    for table, name, columns, _, include in reversed(WIDENED_INDEXES):
+        op.drop_index(name, table_name=table)
+        op.create_index(name, table, columns, postgresql_include=include)
@@ -0,0 +1,65 @@
+"""add report indexes
+
+Revision ID: 5d1f3c9a7e21
+Revises: 9cec9e8f03c0
+Create Date: 2026-10-17 10:12:41.318205
+
+"""
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision = "5d1f3c9a7e21"
+down_revision = "9cec9e8f03c0"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    # Every report filters on a one year `datetime` range and aggregates
+    # `quantity` grouped by one of the enum columns, so the INCLUDE columns
+    # let Postgres answer them with index only scans.
+    op.create_index(
+        "ix_fuel_datetime",
+        "fuel",
+        ["datetime"],
+        postgresql_include=["quantity", "fuel_type", "emission_type"],
+    )
+    op.create_index(
+        "ix_energy_datetime",
+        "energy",
+        ["datetime"],
+        postgresql_include=["quantity", "location", "energy_category"],
+    )
+    op.create_index(
+        "ix_energy_location_datetime",
+        "energy",
+        ["location", "datetime"],
+        postgresql_include=["quantity"],
+    )
+    op.create_index(
+        "ix_oil_datetime",
+        "oil",
+        ["datetime"],
+        postgresql_include=["quantity", "oil_type"],
+    )
+    op.create_index(
+        "ix_oil_oil_type_datetime",
+        "oil",
+        ["oil_type", "datetime"],
+        postgresql_include=["quantity"],
+    )
+    op.create_index(
+        "ix_roadtrip_datetime",
+        "roadtrip",
+        ["datetime"],
+        postgresql_include=["quantity", "group"],
+    )
+
+
+def downgrade() -> None:
+    op.drop_index("ix_roadtrip_datetime", table_name="roadtrip")
+    op.drop_index("ix_oil_oil_type_datetime", table_name="oil")
+    op.drop_index("ix_oil_datetime", table_name="oil")
+    op.drop_index("ix_energy_location_datetime", table_name="energy")
+    op.drop_index("ix_energy_datetime", table_name="energy")
+    op.drop_index("ix_fuel_datetime", table_name="fuel")
@@ -0,0 +1,71 @@
+"""add monthly rollup
+
+Revision ID: 5e1b7c9d3a20
+Revises: 8d2a6f4b1c07
+Create Date: 2026-10-17 20:41:12.309842
+
+"""
+import sqlalchemy as sa
+import sqlmodel
+
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision = "5e1b7c9d3a20"
+down_revision = "8d2a6f4b1c07"
+branch_labels = None
+depends_on = None
+
+ROLLUP_CATEGORIES = {
+    "fuel": "fuel_type",
+    "oil": "oil_type",
+    "energy": "location",
+    "roadtrip": "group",
+}
+
+
+def upgrade() -> None:
+    op.create_table(
+        "monthly_rollup",
+        sa.Column(
+            "domain", sqlmodel.sql.sqltypes.AutoString(), nullable=False
+        ),
+        sa.Column("year", sa.Integer(), autoincrement=False, nullable=False),
+        sa.Column("month", sa.Integer(), autoincrement=False, nullable=False),
+        sa.Column(
+            "category", sqlmodel.sql.sqltypes.AutoString(), nullable=False
+        ),
+        sa.Column(
+            "emission_type", sqlmodel.sql.sqltypes.AutoString(), nullable=False
+        ),
+        sa.Column("count", sa.Integer(), nullable=False),
+        sa.Column("sum", sa.Float(), nullable=False),
+        sa.Column("min", sa.Float(), nullable=False),
+        sa.Column("max", sa.Float(), nullable=False),
+        sa.PrimaryKeyConstraint(
+            "domain", "year", "month", "category", "emission_type"
+        ),
+    )
+    # Roll up the rows already there, months are UTC months
+    for domain, category in ROLLUP_CATEGORIES.items():
+        op.execute(
+            f"""
+            INSERT INTO monthly_rollup
+            SELECT
+                '{domain}',
+                extract(year FROM datetime AT TIME ZONE 'UTC')::int,
+                extract(month FROM datetime AT TIME ZONE 'UTC')::int,
+                coalesce("{category}"::text, ''),
+                coalesce(emission_type::text, ''),
+                count(*),
+                sum(quantity),
+                min(quantity),
+                max(quantity)
+            FROM {domain}
+            GROUP BY 2, 3, 4, 5
+            """
+        )
+
+
+def downgrade() -> None:
+    op.drop_table("monthly_rollup")
@@ -0,0 +1,107 @@
+"""partition tables by year
+
+Revision ID: 7a4e2b8c1d53
+Revises: 5d1f3c9a7e21
+Create Date: 2026-10-17 12:03:27.540912
+
+"""
+from datetime import date
+
+import sqlalchemy as sa
+
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision = "7a4e2b8c1d53"
+down_revision = "5d1f3c9a7e21"
+branch_labels = None
+depends_on = None
+
+# table -> (index name, columns, INCLUDE columns), as in 5d1f3c9a7e21
+TABLES = {
+    "fuel": [
+        (
+            "ix_fuel_datetime",
+            ["datetime"],
+            ["quantity", "fuel_type", "emission_type"],
+        ),
+    ],
+    "energy": [
+        (
+            "ix_energy_datetime",
+            ["datetime"],
+            ["quantity", "location", "energy_category"],
+        ),
+        (
+            "ix_energy_location_datetime",
+            ["location", "datetime"],
+            ["quantity"],
+        ),
+    ],
+    "oil": [
+        ("ix_oil_datetime", ["datetime"], ["quantity", "oil_type"]),
+        ("ix_oil_oil_type_datetime", ["oil_type", "datetime"], ["quantity"]),
+    ],
+    "roadtrip": [
+        ("ix_roadtrip_datetime", ["datetime"], ["quantity", "group"]),
+    ],
+}
+
+
+def _replace_table(table: str, old: str, partitioned: bool) -> None:
+    # Rename the current table out of the way, create the new one with the
+    # same columns and copy the rows over. The `id` sequence is handed to
+    # the new table so ids keep counting from where they were.
+    op.rename_table(table, old)
+    op.execute(f"ALTER TABLE {old} DROP CONSTRAINT {table}_pkey")
+    for index_name, _, _ in TABLES[table]:
+        op.drop_index(index_name, table_name=old)
+
+    partition_by = " PARTITION BY RANGE (datetime)" if partitioned else ""
+    op.execute(
+        f"CREATE TABLE {table} (LIKE {old} INCLUDING DEFAULTS){partition_by}"
+    )
+    primary_key = ["id", "datetime"] if partitioned else ["id"]
+    op.create_primary_key(f"{table}_pkey", table, primary_key)
+    for index_name, columns, include in TABLES[table]:
+        op.create_index(index_name, table, columns, postgresql_include=include)
+
+    if partitioned:
+        op.execute(
+            f"CREATE TABLE {table}_default PARTITION OF {table} DEFAULT"
+        )
+        years = (
+            op.get_bind()
+            .execute(
+                sa.text(
+                    "SELECT DISTINCT extract(year FROM datetime)::int "
+                    f"FROM {old}"
+                )
+            )
+            .scalars()
+            .all()
+        )
+        current_year = date.today().year
+        for year in sorted(set(years) | {current_year, current_year + 1}):
+            op.execute(
+                f"CREATE TABLE {table}_y{year} PARTITION OF {table} "
+                f"FOR VALUES FROM ('{year}-01-01') TO ('{year + 1}-01-01')"
+            )
+
+    op.execute(f"INSERT INTO {table} SELECT * FROM {old}")
+    op.execute(f"ALTER SEQUENCE {table}_id_seq OWNED BY {table}.id")
+    op.drop_table(old)
+
+
+def upgrade() -> None:
+    # Every report reads a single year, so partitioning by `datetime` year
+    # lets Postgres prune the scan down to one partition and old years can
+    # be detached without rewriting the table. Postgres requires the
+    # partition key to be part of the primary key.
+    for table in TABLES:
+        _replace_table(table, f"{table}_unpartitioned", partitioned=True)
+
+
+def downgrade() -> None:
+    for table in TABLES:
+        _replace_table(table, f"{table}_partitioned", partitioned=False)
@@ -0,0 +1,53 @@
+"""add closed years
+
+Revision ID: 8d2a6f4b1c07
+Revises: c3e81f7a25d9
+Create Date: 2026-10-17 19:27:40.581193
+
+"""
+import sqlalchemy as sa
+import sqlmodel
+
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision = "8d2a6f4b1c07"
+down_revision = "c3e81f7a25d9"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        "closed_year",
+        sa.Column("year", sa.Integer(), autoincrement=False, nullable=False),
+        sa.Column(
+            "closed_at",
+            sa.DateTime(timezone=True),
+            server_default=sa.text("now()"),
+            nullable=True,
+        ),
+        sa.PrimaryKeyConstraint("year"),
+    )
+    op.create_table(
+        "closed_report",
+        sa.Column("key", sqlmodel.sql.sqltypes.AutoString(), nullable=False),
+        sa.Column("year", sa.Integer(), nullable=False),
+        sa.Column("body", sa.LargeBinary(), nullable=False),
+        sa.Column(
+            "created_at",
+            sa.DateTime(timezone=True),
+            server_default=sa.text("now()"),
+            nullable=True,
+        ),
+        sa.PrimaryKeyConstraint("key"),
+    )
+    op.create_index(
+        op.f("ix_closed_report_year"), "closed_report", ["year"], unique=False
+    )
+
+
+def downgrade() -> None:
+    op.drop_index(op.f("ix_closed_report_year"), table_name="closed_report")
+    op.drop_table("closed_report")
+    op.drop_table("closed_year")
@@ -0,0 +1,55 @@
+"""add monthly rollup view
+
+Revision ID: a4f0d2c6e8b1
+Revises: 5e1b7c9d3a20
+Create Date: 2026-10-17 21:52:03.114870
+
+"""
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision = "a4f0d2c6e8b1"
+down_revision = "5e1b7c9d3a20"
+branch_labels = None
+depends_on = None
+
+ROLLUP_CATEGORIES = {
+    "fuel": "fuel_type",
+    "oil": "oil_type",
+    "energy": "location",
+    "roadtrip": "group",
+}
+
+
+def upgrade() -> None:
+    domains = " UNION ALL ".join(
+        f"""
+        SELECT
+            '{domain}'::text AS domain,
+            extract(year FROM datetime AT TIME ZONE 'UTC')::int AS year,
+            extract(month FROM datetime AT TIME ZONE 'UTC')::int AS month,
+            coalesce("{category}"::text, '') AS category,
+            coalesce(emission_type::text, '') AS emission_type,
+            count(*) AS count,
+            sum(quantity)::float AS sum,
+            min(quantity)::float AS min,
+            max(quantity)::float AS max
+        FROM {domain}
+        GROUP BY 2, 3, 4, 5
+        """
+        for domain, category in ROLLUP_CATEGORIES.items()
+    )
+    op.execute(
+        "CREATE MATERIALIZED VIEW monthly_rollup_view AS "
+        "SELECT *, statement_timestamp() AS refreshed_at "
+        f"FROM ({domains}) AS rollup"
+    )
+    # `REFRESH MATERIALIZED VIEW CONCURRENTLY` needs a unique index
+    op.execute(
+        "CREATE UNIQUE INDEX ix_monthly_rollup_view_key ON "
+        "monthly_rollup_view (domain, year, month, category, emission_type)"
+    )
+
+
+def downgrade() -> None:
+    op.execute("DROP MATERIALIZED VIEW monthly_rollup_view")
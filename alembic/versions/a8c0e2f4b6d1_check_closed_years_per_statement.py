@@ -0,0 +1,132 @@
+"""check closed years per statement
+
+Revision ID: a8c0e2f4b6d1
+Revises: f4c6e8a0b2d5
+Create Date: 2026-10-18 18:41:07.215904
+
+"""
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision = "a8c0e2f4b6d1"
+down_revision = "f4c6e8a0b2d5"
+branch_labels = None
+depends_on = None
+
+TABLES = ["fuel", "oil", "energy", "roadtrip"]
+# A trigger can only have the transition tables of a single event
+TRIGGERS = {
+    "reject_closed_year_inserts": ("INSERT", "NEW TABLE AS new_rows"),
+    "reject_closed_year_updates": (
+        "UPDATE",
+        "OLD TABLE AS old_rows NEW TABLE AS new_rows",
+    ),
+    "reject_closed_year_deletes": ("DELETE", "OLD TABLE AS old_rows"),
+}
+UTC_YEAR = "extract(year FROM datetime AT TIME ZONE 'UTC')::int"
+
+
+def upgrade() -> None:
+    # A bulk insert locked and checked the year of every row. The function
+    # now runs once per statement, locks each UTC year written to once, in
+    # year order, and checks them all in one query.
+    for table in TABLES:
+        op.execute(f"DROP TRIGGER reject_closed_year_writes ON {table}")
+    op.execute(
+        f"""
+        CREATE OR REPLACE FUNCTION reject_closed_year_writes()
+        RETURNS trigger
+        LANGUAGE plpgsql AS $$
+        DECLARE
+            changed_years int[];
+            changed_year int;
+            closed int;
+        BEGIN
+            IF current_setting('app.moving_partition_rows', true) = 'on' THEN
+                RETURN NULL;
+            END IF;
+            IF TG_OP = 'INSERT' THEN
+                SELECT array_agg(DISTINCT {UTC_YEAR} ORDER BY {UTC_YEAR})
+                INTO changed_years FROM new_rows;
+            ELSIF TG_OP = 'DELETE' THEN
+                SELECT array_agg(DISTINCT {UTC_YEAR} ORDER BY {UTC_YEAR})
+                INTO changed_years FROM old_rows;
+            ELSE
+                SELECT array_agg(DISTINCT {UTC_YEAR} ORDER BY {UTC_YEAR})
+                INTO changed_years FROM (
+                    SELECT datetime FROM new_rows
+                    UNION ALL
+                    SELECT datetime FROM old_rows
+                ) AS changed_rows;
+            END IF;
+            FOREACH changed_year IN ARRAY coalesce(changed_years, '{{}}')
+            LOOP
+                PERFORM pg_advisory_xact_lock_shared(
+                    hashtext('closed_year'), changed_year
+                );
+            END LOOP;
+            SELECT min(year) INTO closed FROM closed_year
+            WHERE year = ANY(changed_years);
+            IF closed IS NOT NULL THEN
+                RAISE EXCEPTION 'Closed years can not be changed: %', closed
+                    USING ERRCODE = 'check_violation',
+                    CONSTRAINT = 'closed_year';
+            END IF;
+            RETURN NULL;
+        END
+        $$
+        """
+    )
+    for table in TABLES:
+        for name, (event, rows) in TRIGGERS.items():
+            op.execute(
+                f"CREATE TRIGGER {name} AFTER {event} ON {table} "
+                f"REFERENCING {rows} FOR EACH STATEMENT "
+                "EXECUTE FUNCTION reject_closed_year_writes()"
+            )
+
+
+def downgrade() -> None:
+    for table in TABLES:
+        for name in TRIGGERS:
+            op.execute(f"DROP TRIGGER {name} ON {table}")
+    op.execute(
+        """
+        CREATE OR REPLACE FUNCTION reject_closed_year_writes()
+        RETURNS trigger
+        LANGUAGE plpgsql AS $$
+        DECLARE
+            changed_year int;
+        BEGIN
+            IF current_setting('app.moving_partition_rows', true) = 'on' THEN
+                RETURN coalesce(NEW, OLD);
+            END IF;
+            FOR changed_year IN
+                SELECT DISTINCT extract(year FROM moment AT TIME ZONE 'UTC')
+                FROM (VALUES (NEW.datetime), (OLD.datetime)) AS m(moment)
+                WHERE moment IS NOT NULL
+            LOOP
+                PERFORM pg_advisory_xact_lock_shared(
+                    hashtext('closed_year'), changed_year
+                );
+                IF EXISTS (
+                    SELECT 1 FROM closed_year
+                    WHERE closed_year.year = changed_year
+                ) THEN
+                    RAISE EXCEPTION
+                        'Closed years can not be changed: %', changed_year
+                        USING ERRCODE = 'check_violation',
+                        CONSTRAINT = 'closed_year';
+                END IF;
+            END LOOP;
+            RETURN coalesce(NEW, OLD);
+        END
+        $$
+        """
+    )
+    for table in TABLES:
+        op.execute(
+            "CREATE TRIGGER reject_closed_year_writes BEFORE INSERT OR "
+            f"UPDATE OR DELETE ON {table} FOR EACH ROW "
+            "EXECUTE FUNCTION reject_closed_year_writes()"
+        )
@@ -0,0 +1,43 @@
+"""add emission view
+
+Revision ID: b7d3e5f1a9c2
+Revises: a4f0d2c6e8b1
+Create Date: 2026-10-17 23:18:45.527301
+
+"""
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision = "b7d3e5f1a9c2"
+down_revision = "a4f0d2c6e8b1"
+branch_labels = None
+depends_on = None
+
+ROLLUP_CATEGORIES = {
+    "fuel": "fuel_type",
+    "oil": "oil_type",
+    "energy": "location",
+    "roadtrip": "group",
+}
+
+
+def upgrade() -> None:
+    domains = " UNION ALL ".join(
+        f"""
+        SELECT
+            '{domain}'::text AS domain,
+            datetime,
+            quantity::float AS quantity,
+            emission_type::text AS emission_type,
+            "{category}"::text AS category,
+            created_at,
+            updated_at
+        FROM {domain}
+        """
+        for domain, category in ROLLUP_CATEGORIES.items()
+    )
+    op.execute(f"CREATE VIEW emission AS {domains}")
+
+
+def downgrade() -> None:
+    op.execute("DROP VIEW emission")
@@ -0,0 +1,49 @@
+"""include timestamps in datetime indexes
+
+Revision ID: c3e81f7a25d9
+Revises: 2f6b9d0e4c18
+Create Date: 2026-10-17 18:42:51.316204
+
+"""
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision = "c3e81f7a25d9"
+down_revision = "2f6b9d0e4c18"
+branch_labels = None
+depends_on = None
+
+TIMESTAMPS = ["created_at", "updated_at"]
+
+# (table, index name, INCLUDE columns before)
+DATETIME_INDEXES = [
+    ("fuel", "ix_fuel_datetime", ["quantity", "fuel_type", "emission_type"]),
+    (
+        "energy",
+        "ix_energy_datetime",
+        ["quantity", "location", "energy_category"],
+    ),
+    ("oil", "ix_oil_datetime", ["quantity", "oil_type"]),
+    ("roadtrip", "ix_roadtrip_datetime", ["quantity", "group"]),
+]
+
+
+def upgrade() -> None:
+    # The report ETags count the rows of a year and take their last
+    # `created_at`/`updated_at`, covering them keeps that an index-only scan
+    for table, name, include in DATETIME_INDEXES:
+        op.drop_index(name, table_name=table)
+        op.create_index(
+            name,
+            table,
+            ["datetime", "id"],
+            postgresql_include=include + TIMESTAMPS,
+        )
+
+
+def downgrade() -> None:
+    for table, name, include in reversed(DATETIME_INDEXES):
+        op.drop_index(name, table_name=table)
+        op.create_index(
+            name, table, ["datetime", "id"], postgresql_include=include
+        )
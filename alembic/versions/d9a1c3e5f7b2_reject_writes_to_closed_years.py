@@ -0,0 +1,69 @@
+"""reject writes to closed years
+
+Revision ID: d9a1c3e5f7b2
+Revises: b7d3e5f1a9c2
+Create Date: 2026-10-18 10:12:36.804417
+
+"""
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision = "d9a1c3e5f7b2"
+down_revision = "b7d3e5f1a9c2"
+branch_labels = None
+depends_on = None
+
+TABLES = ["fuel", "oil", "energy", "roadtrip"]
+
+
+def upgrade() -> None:
+    # Writers take the shared advisory lock of the year they touch and
+    # `close_year` the exclusive one, so a write either commits before the
+    # year is closed or sees it closed. Rows moved between partitions are
+    # let through, see `app.models.partitioning.MOVING_ROWS`.
+    op.execute(
+        """
+        CREATE OR REPLACE FUNCTION reject_closed_year_writes()
+        RETURNS trigger
+        LANGUAGE plpgsql AS $$
+        DECLARE
+            changed_year int;
+        BEGIN
+            IF current_setting('app.moving_partition_rows', true) = 'on' THEN
+                RETURN coalesce(NEW, OLD);
+            END IF;
+            FOR changed_year IN
+                SELECT DISTINCT extract(year FROM moment AT TIME ZONE 'UTC')
+                FROM (VALUES (NEW.datetime), (OLD.datetime)) AS m(moment)
+                WHERE moment IS NOT NULL
+            LOOP
+                PERFORM pg_advisory_xact_lock_shared(
+                    hashtext('closed_year'), changed_year
+                );
+                IF EXISTS (
+                    SELECT 1 FROM closed_year
+                    WHERE closed_year.year = changed_year
+                ) THEN
+                    RAISE EXCEPTION
+                        'Closed years can not be changed: %', changed_year
+                        USING ERRCODE = 'check_violation',
+                        CONSTRAINT = 'closed_year';
+                END IF;
+            END LOOP;
+            RETURN coalesce(NEW, OLD);
+        END
+        $$
+        """
+    )
+    for table in TABLES:
+        op.execute(
+            "CREATE TRIGGER reject_closed_year_writes BEFORE INSERT OR "
+            f"UPDATE OR DELETE ON {table} FOR EACH ROW "
+            "EXECUTE FUNCTION reject_closed_year_writes()"
+        )
+
+
+def downgrade() -> None:
+    for table in TABLES:
+        op.execute(f"DROP TRIGGER reject_closed_year_writes ON {table}")
+    op.execute("DROP FUNCTION reject_closed_year_writes()")
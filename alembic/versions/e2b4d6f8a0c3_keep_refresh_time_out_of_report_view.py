@@ -0,0 +1,68 @@
+"""keep refresh time out of report view
+
+Revision ID: e2b4d6f8a0c3
+Revises: d9a1c3e5f7b2
+Create Date: 2026-10-18 14:41:09.263518
+
+"""
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision = "e2b4d6f8a0c3"
+down_revision = "d9a1c3e5f7b2"
+branch_labels = None
+depends_on = None
+
+ROLLUP_CATEGORIES = {
+    "fuel": "fuel_type",
+    "oil": "oil_type",
+    "energy": "location",
+    "roadtrip": "group",
+}
+
+
+def _create_view(columns: str) -> None:
+    domains = " UNION ALL ".join(
+        f"""
+        SELECT
+            '{domain}'::text AS domain,
+            extract(year FROM datetime AT TIME ZONE 'UTC')::int AS year,
+            extract(month FROM datetime AT TIME ZONE 'UTC')::int AS month,
+            coalesce("{category}"::text, '') AS category,
+            coalesce(emission_type::text, '') AS emission_type,
+            count(*) AS count,
+            sum(quantity)::float AS sum,
+            min(quantity)::float AS min,
+            max(quantity)::float AS max
+        FROM {domain}
+        GROUP BY 2, 3, 4, 5
+        """
+        for domain, category in ROLLUP_CATEGORIES.items()
+    )
+    op.execute("DROP MATERIALIZED VIEW monthly_rollup_view")
+    op.execute(
+        "CREATE MATERIALIZED VIEW monthly_rollup_view AS "
+        f"SELECT {columns} FROM ({domains}) AS rollup"
+    )
+    op.execute(
+        "CREATE UNIQUE INDEX ix_monthly_rollup_view_key ON "
+        "monthly_rollup_view (domain, year, month, category, emission_type)"
+    )
+
+
+def upgrade() -> None:
+    _create_view("*")
+    op.execute(
+        "CREATE TABLE monthly_rollup_view_refresh ("
+        "id int PRIMARY KEY CHECK (id = 1), "
+        "refreshed_at timestamptz NOT NULL)"
+    )
+    op.execute(
+        "INSERT INTO monthly_rollup_view_refresh "
+        "VALUES (1, statement_timestamp())"
+    )
+
+
+def downgrade() -> None:
+    op.execute("DROP TABLE monthly_rollup_view_refresh")
+    _create_view("*, statement_timestamp() AS refreshed_at")
@@ -0,0 +1,33 @@
+"""add last modified to monthly rollup
+
+Revision ID: f4c6e8a0b2d5
+Revises: e2b4d6f8a0c3
+Create Date: 2026-10-18 16:05:22.918374
+
+"""
+import sqlalchemy as sa
+
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision = "f4c6e8a0b2d5"
+down_revision = "e2b4d6f8a0c3"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    # The cells already there count as changed now
+    op.add_column(
+        "monthly_rollup",
+        sa.Column(
+            "last_modified",
+            sa.DateTime(timezone=True),
+            server_default=sa.text("now()"),
+            nullable=False,
+        ),
+    )
+
+
+def downgrade() -> None:
+    op.drop_column("monthly_rollup", "last_modified")
@@ -1,4 +1,4 @@
-from typing import Any
+from typing import Any, Literal, Optional
 
 from pydantic import SecretStr
 
@@ -11,9 +11,60 @@ class AppConfig(BaseConfig):
     PROJECT_NAME: str = "hacker-the-future-api"
     API_V1_STR: str = "/api"
 
+    # Run the repositories on asyncpg instead of blocking psycopg2 calls
+    DATABASE_ASYNC: bool = False
+    # Run the sync repositories on a thread pool sized to the engine pool
+    DATABASE_THREADPOOL: bool = False
+
+    # SQLAlchemy connection pool
+    DATABASE_POOL_SIZE: int = 5
+    DATABASE_MAX_OVERFLOW: int = 10
+    DATABASE_POOL_TIMEOUT: int = 30
+    DATABASE_POOL_RECYCLE: int = -1
+    DATABASE_POOL_PRE_PING: bool = False
+
+    # In-process report cache, 0 seconds disables it. Writes on other
+    # workers do not reach it, so it is off unless there is a single one
+    REPORT_CACHE_LOCAL_TTL: int = 0
+    REPORT_CACHE_MAXSIZE: int = 1024
+    # Redis URL of a report cache shared by every worker, replaces the
+    # in-process cache when set
+    REPORT_CACHE_URL: Optional[str] = None
+    REPORT_CACHE_TTL: int = 300
+
+    # Compute the reports from the `rollup` table, from its materialized
+    # view `matview` or from the `raw` rows
+    REPORT_SOURCE: Literal["raw", "rollup", "matview"] = "rollup"
+    # Refresh the materialized view this many seconds after a write, and
+    # every interval seconds, 0 disables either
+    REPORT_VIEW_REFRESH_DELAY: float = 5
+    REPORT_VIEW_REFRESH_INTERVAL: float = 0
+
+    # Years before this one are closed, more can be closed through the API
+    CLOSED_YEARS_BEFORE: Optional[int] = None
+    # `X-Admin-Token` of the requests closing a year or to `/internal`, none
+    # can without it
+    ADMIN_TOKEN: Optional[SecretStr] = None
+
     class Config:
         validate_assignment = True
 
     @property
     def fastapi_kwargs(self) -> dict[str, Any]:
         return {"debug": self.debug}
+
+    @property
+    def engine_kwargs(self) -> dict[str, Any]:
+        return {
+            "pool_size": self.DATABASE_POOL_SIZE,
+            "max_overflow": self.DATABASE_MAX_OVERFLOW,
+            "pool_timeout": self.DATABASE_POOL_TIMEOUT,
+            "pool_recycle": self.DATABASE_POOL_RECYCLE,
+            "pool_pre_ping": self.DATABASE_POOL_PRE_PING,
+        }
+
+    @property
+    def async_database_uri(self) -> str:
+        return self.DATABASE_URI.replace(
+            "postgresql://", "postgresql+asyncpg://", 1
+        )
@@ -15,6 +15,10 @@ class DevConfig(AppConfig):
 
     DATABASE_URI: Optional[str] = None
 
+    DATABASE_POOL_SIZE: int = 5
+    DATABASE_MAX_OVERFLOW: int = 5
+    DATABASE_POOL_TIMEOUT: int = 10
+
     @validator("DATABASE_URI", pre=True)
     def assemble_db_connection(
         cls, v: Optional[str], values: dict[str, Any]
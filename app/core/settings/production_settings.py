@@ -14,6 +14,11 @@ class ProdConfig(AppConfig):
 
     DATABASE_URI: Optional[str] = None
 
+    DATABASE_POOL_SIZE: int = 10
+    DATABASE_MAX_OVERFLOW: int = 20
+    DATABASE_POOL_RECYCLE: int = 1800
+    DATABASE_POOL_PRE_PING: bool = True
+
     @validator("DATABASE_URI", pre=True)
     def assemble_db_connection(
         cls, v: Optional[str], values: dict[str, Any]
@@ -1,8 +1,15 @@
 from dotenv import load_dotenv
 from fastapi import FastAPI
+from fastapi.concurrency import run_in_threadpool
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import ORJSONResponse
 
 from app.core import get_app_settings, get_logger
+from app.infrastructure import (
+    create_missing_partitions,
+    db_executor,
+    report_view_refresher,
+)
 from app.routes import api_router
 
 load_dotenv()
@@ -17,6 +24,7 @@ def create_app(**kwargs):
 
     app = FastAPI(
         title=app_settings.PROJECT_NAME,
+        default_response_class=ORJSONResponse,
     )
 
     # CORS Related Code
@@ -37,15 +45,30 @@ def create_app(**kwargs):
         allow_credentials=True,
         allow_methods=["*"],
         allow_headers=["*"],
+        # Browsers only let scripts read these from a cross-origin response
+        expose_headers=[
+            "X-Next-Cursor",
+            "ETag",
+            "Last-Modified",
+            "X-Report-Refreshed-At",
+        ],
     )
 
     @app.on_event("startup")
     async def startup():
         logger.info("Starting up...")
+        if not kwargs.get("test"):
+            created = await run_in_threadpool(create_missing_partitions)
+            if created:
+                logger.info(f"Created partitions: {', '.join(created)}")
+        report_view_refresher.start()
 
     @app.on_event("shutdown")
     async def shutdown():
         logger.info("Shutting down...")
+        await report_view_refresher.stop()
+        if db_executor is not None:
+            db_executor.shutdown()
 
     # API Related Code
     app.include_router(api_router, prefix=app_settings.API_V1_STR)
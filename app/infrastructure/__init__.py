@@ -1 +1,30 @@
-from .db import get_db_session
+from .bulk import insert_rows
+from .db import (
+    create_missing_partitions,
+    get_async_db_session,
+    get_db_session,
+)
+from .executor import db_executor, run_in_session
+from .percentage import percentage_by, percentage_of_total
+from .ranking import month_extremes, monthly_ranking, ranked_months
+from .report_cache import cached_report, report_cache
+from .report_views import (
+    refresh_report_view,
+    report_view_refresher,
+    report_view_version,
+    report_view_version_columns,
+)
+from .rollup import (
+    rollup_average,
+    rollup_category,
+    rollup_category_is,
+    rollup_emission_type,
+    rollup_month,
+    rollup_source,
+    rollup_version,
+    rollup_version_columns,
+    rollup_years,
+)
+from .shared_cache import shared_report, shared_report_cache
+from .timeseries import dense_series, monthly_series
+from .years import in_years, row_year, year_runs
@@ -0,0 +1,107 @@
+import io
+from datetime import date
+from enum import Enum
+from typing import Any, Callable, Iterable, Sequence
+
+from sqlalchemy import Column, Table, exc, insert
+from sqlalchemy.sql import sqltypes
+from sqlmodel import Session
+
+from app.infrastructure.rollup import add_rows
+
+_ESCAPES = str.maketrans({"\\": "\\\\", "\t": "\\t", "\n": "\\n", "\r": "\\r"})
+
+
+def _encode_text(value: Any) -> str:
+    return str(value).translate(_ESCAPES)
+
+
+def _encode_enum(value: Any) -> str:
+    # `sqlalchemy.Enum` columns store the member names, not the values
+    return value.name if isinstance(value, Enum) else _encode_text(value)
+
+
+def _encode_datetime(value: Any) -> str:
+    return value.isoformat() if isinstance(value, date) else str(value)
+
+
+def _encoder(column: Column) -> Callable[[Any], str]:
+    # Picked once per column, numbers and dates never need escaping
+    if isinstance(column.type, sqltypes.Enum):
+        return _encode_enum
+    if isinstance(column.type, (sqltypes.DateTime, sqltypes.Date)):
+        return _encode_datetime
+    if isinstance(column.type, (sqltypes.Integer, sqltypes.Float)):
+        return str
+    return _encode_text
+
+
+def _copy_buffer(
+    rows: Iterable[dict], columns: Sequence[Column]
+) -> io.StringIO:
+    encoders = [(column.key, _encoder(column)) for column in columns]
+    buffer = io.StringIO()
+    for row in rows:
+        buffer.write(
+            "\t".join(
+                "\\N" if row[key] is None else encode(row[key])
+                for key, encode in encoders
+            )
+        )
+        buffer.write("\n")
+    buffer.seek(0)
+    return buffer
+
+
+def insert_rows(session: Session, table: Table, rows: list[dict]) -> int:
+    """
+    Insert `rows` into `table` without going through the unit of work.
+
+    On psycopg2 the rows are sent in a single `COPY FROM STDIN`. Other
+    drivers (asyncpg, through the async session) get one multi-row
+    executemany `INSERT`. Either way the rows are inserted in the session's
+    transaction, along with their monthly rollup, and the caller commits.
+
+    Parameters
+    ----------
+    `session` : Session
+        The repository session
+    `table` : Table
+        Target table
+    `rows` : list[dict]
+        Validated rows keyed by column name, all with the same keys.
+        Columns left out get their server defaults.
+
+    Returns
+    -------
+    `int`
+        The number of rows inserted
+    """
+    if not rows:
+        return 0
+
+    connection = session.connection()
+    # The ORM is skipped, so the rollup is not maintained by the session
+    add_rows(connection, table, rows)
+    if connection.dialect.driver != "psycopg2":
+        connection.execute(insert(table), rows)
+        return len(rows)
+
+    columns = [table.c[key] for key in rows[0]]
+    preparer = connection.dialect.identifier_preparer
+    statement = "COPY {} ({}) FROM STDIN".format(
+        preparer.format_table(table),
+        ", ".join(preparer.quote(column.name) for column in columns),
+    )
+    cursor = connection.connection.cursor()
+    try:
+        cursor.copy_expert(statement, _copy_buffer(rows, columns))
+        return cursor.rowcount
+    except connection.dialect.dbapi.Error as err:
+        # Raw cursor errors are not wrapped by SQLAlchemy, do it here so
+        # `handle_database_error` sees them like any other statement error
+        raise exc.DBAPIError.instance(
+            statement, None, err, connection.dialect.dbapi.Error
+        )
+    finally:
+        cursor.close()
@@ -1,17 +1,81 @@
+from contextlib import contextmanager
+from typing import AsyncIterator, Iterator
+
+from fastapi.concurrency import contextmanager_in_threadpool
+from sqlalchemy.ext.asyncio import create_async_engine
 from sqlmodel import Session, create_engine
+from sqlmodel.ext.asyncio.session import AsyncSession
 
 from app.core.config import get_app_settings
+from app.infrastructure.pool import (
+    InstrumentedAsyncQueuePool,
+    InstrumentedQueuePool,
+)
+from app.models.partitioning import ensure_year_partitions
 
 app_settings = get_app_settings()
 
+# Naive datetimes, partition bounds and `row_year` are read in the session
+# time zone, pinned to UTC so they agree with the rollup months
 engine = create_engine(
-    app_settings.DATABASE_URI, echo=app_settings.ENVIRONMENT == "dev"
+    app_settings.DATABASE_URI,
+    echo=app_settings.ENVIRONMENT == "dev",
+    poolclass=InstrumentedQueuePool,
+    connect_args={"options": "-c timezone=utc"},
+    **app_settings.engine_kwargs,
+)
+
+async_engine = (
+    create_async_engine(
+        app_settings.async_database_uri,
+        echo=app_settings.ENVIRONMENT == "dev",
+        poolclass=InstrumentedAsyncQueuePool,
+        connect_args={"server_settings": {"timezone": "utc"}},
+        **app_settings.engine_kwargs,
+    )
+    if app_settings.DATABASE_ASYNC
+    else None
 )
 
 
-def get_db_session() -> Session:
+@contextmanager
+def _sync_db_session() -> Iterator[Session]:
     with Session(engine) as session:
         try:
             yield session
         finally:
             session.close()
+
+
+async def get_async_db_session() -> AsyncIterator[AsyncSession]:
+    async with AsyncSession(async_engine, expire_on_commit=False) as session:
+        yield session
+
+
+async def get_db_session() -> AsyncIterator[Session]:
+    """
+    Yield the session used by the repositories.
+
+    When `DATABASE_ASYNC` is enabled this is the sync facade of an
+    `AsyncSession`, so every statement is executed by asyncpg and the
+    repository calls must be awaited through
+    `app.infrastructure.executor.run_in_session`.
+    """
+    if async_engine is None:
+        async with contextmanager_in_threadpool(_sync_db_session()) as session:
+            yield session
+        return
+
+    async for async_session in get_async_db_session():
+        yield async_session.sync_session
+
+
+def create_missing_partitions() -> list[str]:
+    """
+    Create this and next year's partitions of the year partitioned tables.
+
+    Run on startup, so the partition for a new year always exists before
+    the first row of that year is inserted.
+    """
+    with engine.begin() as connection:
+        return ensure_year_partitions(connection)
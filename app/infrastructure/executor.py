@@ -0,0 +1,112 @@
+import asyncio
+import threading
+from concurrent.futures import Future, ThreadPoolExecutor
+from functools import partial
+from typing import Callable, Optional, TypeVar
+
+from sqlalchemy.util import greenlet_spawn
+
+from app.core.config import get_app_settings
+from app.infrastructure.db import async_engine
+
+T = TypeVar("T")
+
+app_settings = get_app_settings()
+
+
+class DatabaseExecutor:
+    """
+    Thread pool that runs blocking repository calls off the event loop.
+
+    The pool is sized to the number of connections the engine can hand out,
+    so a worker thread never waits on a connection checkout and the
+    `queued` counter is the real saturation signal.
+    """
+
+    def __init__(self, max_workers: int):
+        self.max_workers = max_workers
+        self._executor = ThreadPoolExecutor(
+            max_workers=max_workers, thread_name_prefix="db-executor"
+        )
+        self._lock = threading.Lock()
+        self._queued = 0
+        self._active = 0
+        self._completed = 0
+        self._max_queued = 0
+
+    async def run(self, func: Callable[..., T], *args, **kwargs) -> T:
+        with self._lock:
+            self._queued += 1
+            self._max_queued = max(self._max_queued, self._queued)
+
+        future = self._executor.submit(
+            self._call, partial(func, *args, **kwargs)
+        )
+        future.add_done_callback(self._on_done)
+        return await asyncio.wrap_future(future)
+
+    def _call(self, func: Callable[[], T]) -> T:
+        with self._lock:
+            self._queued -= 1
+            self._active += 1
+        try:
+            return func()
+        finally:
+            with self._lock:
+                self._active -= 1
+                self._completed += 1
+
+    def _on_done(self, future: Future) -> None:
+        # A call cancelled before a thread picked it up never reaches
+        # `_call`, so it has to leave the queue here.
+        if future.cancelled():
+            with self._lock:
+                self._queued -= 1
+
+    def stats(self) -> dict[str, int]:
+        with self._lock:
+            return {
+                "max_workers": self.max_workers,
+                "active": self._active,
+                "queued": self._queued,
+                "max_queued": self._max_queued,
+                "completed": self._completed,
+            }
+
+    def shutdown(self) -> None:
+        self._executor.shutdown(wait=False)
+
+
+db_executor: Optional[DatabaseExecutor] = (
+    DatabaseExecutor(
+        max_workers=app_settings.DATABASE_POOL_SIZE
+        + app_settings.DATABASE_MAX_OVERFLOW
+    )
+    if app_settings.DATABASE_THREADPOOL and async_engine is None
+    else None
+)
+
+
+async def run_in_session(func: Callable[..., T], *args, **kwargs) -> T:
+    """
+    Await a repository call from a coroutine.
+
+    Depending on the settings the call runs through asyncpg
+    (`DATABASE_ASYNC`), on the bounded `db_executor` thread pool
+    (`DATABASE_THREADPOOL`) or inline on the event loop.
+
+    Parameters
+    ----------
+    `func` : Callable
+        The repository method to run, bound to the request session
+
+    Returns
+    -------
+    `T`
+        Whatever `func` returns
+    """
+    if async_engine is not None:
+        return await greenlet_spawn(func, *args, **kwargs)
+    if db_executor is not None:
+        return await db_executor.run(func, *args, **kwargs)
+    return func(*args, **kwargs)
@@ -0,0 +1,66 @@
+from typing import Optional
+
+from sqlalchemy import func, select
+from sqlalchemy.sql import ColumnElement, Select
+
+
+def percentage_of_total(
+    quantity: ColumnElement, *partition_by: ColumnElement
+) -> ColumnElement:
+    """
+    Share of each group in the total of every group, in percent.
+
+    The total is a window over the grouped rows, so the rows are read once
+    instead of once more for a total subquery. With `partition_by` the
+    total is the one of the groups sharing its values, such as the year.
+    """
+    return (
+        func.sum(quantity)
+        * 100.0
+        / func.sum(func.sum(quantity)).over(partition_by=partition_by or None)
+    )
+
+
+def percentage_by(
+    dimension: ColumnElement,
+    quantity: ColumnElement,
+    *criteria,
+    year: Optional[ColumnElement] = None,
+) -> Select:
+    """
+    Build the share of `quantity` per value of `dimension`, in one scan.
+
+    Parameters
+    ----------
+    `dimension` : ColumnElement
+        The column to group by, selected under its own name
+    `quantity` : ColumnElement
+        The column to sum
+    `criteria` : ColumnElement
+        Filters of the rows, such as the years
+    `year` : ColumnElement, optional
+        The year of a row, selected as `year`, the shares are then taken
+        within each year
+
+    Returns
+    -------
+    `Select`
+        Rows of `dimension` and its `percentage`, and their `year`
+    """
+    if year is None:
+        return (
+            select(
+                dimension, percentage_of_total(quantity).label("percentage")
+            )
+            .where(*criteria)
+            .group_by(dimension)
+        )
+    return (
+        select(
+            year.label("year"),
+            dimension,
+            percentage_of_total(quantity, year).label("percentage"),
+        )
+        .where(*criteria)
+        .group_by(year, dimension)
+    )
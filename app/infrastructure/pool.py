@@ -0,0 +1,71 @@
+import threading
+import time
+from typing import Any
+
+from sqlalchemy import exc
+from sqlalchemy.pool import AsyncAdaptedQueuePool, QueuePool
+
+
+class _WaitTrackingMixin:
+    """
+    Count the callers blocked on a connection checkout.
+
+    `QueuePool` only reports checked in/out connections, so a burst that
+    exhausts `pool_size + max_overflow` is invisible until requests time
+    out. Wrapping `_do_get` tells us how many callers are waiting, for how
+    long, and how many gave up.
+    """
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self._wait_lock = threading.Lock()
+        self._waiting = 0
+        self._waits = 0
+        self._wait_seconds = 0.0
+        self._max_wait_seconds = 0.0
+        self._timeouts = 0
+
+    def _do_get(self):
+        start = time.perf_counter()
+        with self._wait_lock:
+            self._waiting += 1
+        try:
+            return super()._do_get()
+        except exc.TimeoutError:
+            with self._wait_lock:
+                self._timeouts += 1
+            raise
+        finally:
+            elapsed = time.perf_counter() - start
+            with self._wait_lock:
+                self._waiting -= 1
+                self._waits += 1
+                self._wait_seconds += elapsed
+                self._max_wait_seconds = max(self._max_wait_seconds, elapsed)
+
+    def stats(self) -> dict[str, Any]:
+        with self._wait_lock:
+            return {
+                "size": self.size(),
+                "checked_in": self.checkedin(),
+                "checked_out": self.checkedout(),
+                "overflow": self.overflow(),
+                "max_overflow": self._max_overflow,
+                "waiting": self._waiting,
+                "checkouts": self._waits,
+                "avg_checkout_ms": round(
+                    self._wait_seconds * 1000 / self._waits, 3
+                )
+                if self._waits
+                else 0,
+                "max_checkout_ms": round(self._max_wait_seconds * 1000, 3),
+                "timeouts": self._timeouts,
+            }
+
+
+class InstrumentedQueuePool(_WaitTrackingMixin, QueuePool):
+    pass
+
+
+class InstrumentedAsyncQueuePool(_WaitTrackingMixin, AsyncAdaptedQueuePool):
+    pass
@@ -0,0 +1,100 @@
+from typing import Any, Iterable, Optional, Sequence
+
+from sqlalchemy import column, func, select
+from sqlalchemy.engine import Row
+from sqlalchemy.sql import ColumnElement, Select
+
+from app.core.config import get_app_settings
+from app.infrastructure.rollup import (
+    rollup_month,
+    rollup_source,
+    rollup_years,
+)
+from app.infrastructure.years import in_years, row_year
+
+app_settings = get_app_settings()
+
+
+def ranked_months(
+    year: ColumnElement,
+    month: ColumnElement,
+    quantity: ColumnElement,
+    *criteria,
+    group_by: Sequence[Any] = ("year", "month"),
+) -> Select:
+    """
+    Build the month totals of `quantity`, ranked from the highest within
+    each year.
+
+    Both extremes and the whole ranking of every year come from one grouped
+    scan, the rank is a window over the month totals of the year.
+
+    Parameters
+    ----------
+    `year` : ColumnElement
+        The year of a row, selected as `year`
+    `month` : ColumnElement
+        The month of a row, selected as `month`
+    `quantity` : ColumnElement
+        The column to sum
+    `criteria` : ColumnElement
+        Filters of the rows, such as the years
+    `group_by` : Sequence
+        What the year and month are computed from, `year` and `month`
+        themselves by default
+
+    Returns
+    -------
+    `Select`
+        Rows of `year`, `month`, `total_quantity` and `rank`, by year, rank
+        then month
+    """
+    total = func.sum(quantity)
+    return (
+        select(
+            year.label("year"),
+            month.label("month"),
+            total.label("total_quantity"),
+            func.rank()
+            .over(partition_by=year, order_by=total.desc())
+            .label("rank"),
+        )
+        .where(*criteria)
+        .group_by(*group_by)
+        .order_by(column("year"), column("rank"), column("month"))
+    )
+
+
+def monthly_ranking(model: Any, years: Iterable[int]) -> Select:
+    """
+    `ranked_months` of the rows of a domain `model` in `years`, read from
+    the report source.
+    """
+    if app_settings.REPORT_SOURCE != "raw":
+        rollup = rollup_source()
+        return ranked_months(
+            rollup.c.year,
+            rollup_month(),
+            rollup.c.sum,
+            *rollup_years(model.__table__.name, years),
+            group_by=(rollup.c.year, rollup.c.month),
+        )
+    return ranked_months(
+        row_year(model),
+        func.date_trunc("month", model.datetime),
+        model.quantity,
+        in_years(model, years),
+    )
+
+
+def month_extremes(ranking: Sequence[Row]) -> Optional[dict[str, str]]:
+    """
+    Names of the lowest and highest months of a `ranked_months` result,
+    None when there are no months.
+    """
+    if not ranking:
+        return None
+    return {
+        "lowest": ranking[-1].month.strftime("%B"),
+        "highest": ranking[0].month.strftime("%B"),
+    }
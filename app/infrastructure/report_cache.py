@@ -0,0 +1,185 @@
+import inspect
+import threading
+import time
+from collections import OrderedDict
+from functools import wraps
+from typing import Any, Awaitable, Callable, Hashable, Iterable, TypeVar
+
+from app.core.config import get_app_settings
+from app.utils.conditional import report_version
+from app.utils.errors import AppError
+
+T = TypeVar("T")
+Tag = tuple[str, int]
+
+app_settings = get_app_settings()
+
+
+class ReportCache:
+    """
+    TTL + LRU cache of report results, tagged by `(table, year)`.
+
+    Writes invalidate the tags of the years they touch, and every tag has
+    a generation counter, so a report computed while a write to its year
+    was committing is returned to its caller but never stored.
+    """
+
+    def __init__(self, maxsize: int, ttl: float):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._lock = threading.Lock()
+        # key -> (expires at, report, tags), least recently used first
+        self._entries: OrderedDict = OrderedDict()
+        self._generations: dict[Tag, int] = {}
+        self._hits = 0
+        self._misses = 0
+        self._evictions = 0
+        self._invalidations = 0
+
+    @property
+    def enabled(self) -> bool:
+        return self.ttl > 0 and self.maxsize > 0
+
+    def get(self, key: Hashable) -> tuple[bool, Any]:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None or entry[0] < time.monotonic():
+                if entry is not None:
+                    del self._entries[key]
+                self._misses += 1
+                return False, None
+            self._entries.move_to_end(key)
+            self._hits += 1
+            return True, entry[1]
+
+    def generation(self, tags: Iterable[Tag]) -> tuple[int, ...]:
+        with self._lock:
+            return tuple(self._generations.get(tag, 0) for tag in tags)
+
+    def set(
+        self,
+        key: Hashable,
+        value: Any,
+        tags: tuple[Tag, ...],
+        generation: tuple[int, ...],
+    ) -> None:
+        with self._lock:
+            current = tuple(self._generations.get(tag, 0) for tag in tags)
+            if current != generation:
+                return
+            self._entries[key] = (
+                time.monotonic() + self.ttl,
+                value,
+                set(tags),
+            )
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+                self._evictions += 1
+
+    def invalidate(self, table: str, years: Iterable[int]) -> None:
+        """
+        Drop every report computed from `table` for one of `years`.
+        """
+        tags = {(table, year) for year in years}
+        if not tags:
+            return
+        with self._lock:
+            for tag in tags:
+                self._generations[tag] = self._generations.get(tag, 0) + 1
+            stale = [
+                key
+                for key, (_, _, entry_tags) in self._entries.items()
+                if entry_tags & tags
+            ]
+            for key in stale:
+                del self._entries[key]
+            self._invalidations += len(stale)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self) -> dict[str, Any]:
+        with self._lock:
+            return {
+                "enabled": self.enabled,
+                "size": len(self._entries),
+                "maxsize": self.maxsize,
+                "ttl": self.ttl,
+                "hits": self._hits,
+                "misses": self._misses,
+                "evictions": self._evictions,
+                "invalidations": self._invalidations,
+            }
+
+
+# Writes on other workers cannot reach this process, so the shared cache
+# replaces it when configured
+report_cache = ReportCache(
+    maxsize=app_settings.REPORT_CACHE_MAXSIZE,
+    ttl=(
+        0
+        if app_settings.REPORT_CACHE_URL
+        else app_settings.REPORT_CACHE_LOCAL_TTL
+    ),
+)
+
+
+def cached_report(
+    *tables: str,
+) -> Callable[[Callable[..., Awaitable[T]]], Callable[..., Awaitable[T]]]:
+    """
+    Cache a yearly report service method in `report_cache`.
+
+    The key is the method name, its arguments and the `report_version` of
+    the request, if any, and the entry is tagged with `(table, year)` for
+    every table the report reads and every year it covers, so writes only
+    invalidate the years they touch. Errors are not cached.
+
+    Parameters
+    ----------
+    `tables` : str
+        The tables the report is computed from
+
+    Returns
+    -------
+    `Callable`
+        Decorator for an async service method taking a `years` argument
+    """
+
+    def decorator(
+        func: Callable[..., Awaitable[T]]
+    ) -> Callable[..., Awaitable[T]]:
+        signature = inspect.signature(func)
+
+        @wraps(func)
+        async def wrapper(self, *args, **kwargs) -> T:
+            if not report_cache.enabled:
+                return await func(self, *args, **kwargs)
+
+            bound = signature.bind(self, *args, **kwargs)
+            bound.apply_defaults()
+            key = (
+                func.__qualname__,
+                tuple(bound.arguments.items())[1:],
+                report_version.get(),
+            )
+            hit, value = report_cache.get(key)
+            if hit:
+                return value
+
+            tags = tuple(
+                (table, year)
+                for table in tables
+                for year in bound.arguments["years"]
+            )
+            generation = report_cache.generation(tags)
+            value = await func(self, *args, **kwargs)
+            if not isinstance(value, AppError):
+                report_cache.set(key, value, tags, generation)
+            return value
+
+        return wrapper
+
+    return decorator
@@ -0,0 +1,189 @@
+import asyncio
+from datetime import datetime, timezone
+from typing import Any, Iterable, Optional
+
+from fastapi.concurrency import run_in_threadpool
+from sqlalchemy import func, literal_column, select, text, update
+from sqlalchemy.dialects.postgresql import aggregate_order_by
+from sqlalchemy.engine import Connection
+from sqlalchemy.exc import SQLAlchemyError
+from sqlalchemy.sql import ColumnElement, Select
+
+from app.core import get_logger
+from app.core.config import get_app_settings
+from app.infrastructure.db import engine
+from app.models import REPORT_VIEW, report_view, report_view_refresh
+
+logger = get_logger(__name__)
+app_settings = get_app_settings()
+
+
+def refresh_report_view(connection: Connection) -> None:
+    """
+    Recompute the report view without blocking the reports reading it.
+    """
+    connection.execute(
+        text(f"REFRESH MATERIALIZED VIEW CONCURRENTLY {REPORT_VIEW}")
+    )
+    connection.execute(
+        update(report_view_refresh).values(
+            refreshed_at=func.statement_timestamp()
+        )
+    )
+
+
+def report_view_version_columns() -> list[ColumnElement]:
+    """
+    `count, checksum, last_modified` of the view cells grouped over.
+
+    The count and checksum come from the data of the cells, so they only
+    change when a refresh changed the data. The view only changes when it
+    is refreshed, so its refresh time takes the place of the last change
+    of the rows.
+    """
+    cells = report_view.c
+    return [
+        func.sum(cells.count).label("count"),
+        func.md5(
+            func.string_agg(
+                func.concat_ws(
+                    ",",
+                    cells.month,
+                    cells.category,
+                    cells.emission_type,
+                    cells.count,
+                    cells.sum,
+                ),
+                aggregate_order_by(
+                    literal_column("';'"),
+                    cells.month,
+                    cells.category,
+                    cells.emission_type,
+                ),
+            )
+        ).label("checksum"),
+        select(report_view_refresh.c.refreshed_at)
+        .scalar_subquery()
+        .label("last_modified"),
+    ]
+
+
+def report_view_version(domain: str, years: Iterable[int]) -> Select:
+    """
+    `(year, count, checksum, last_modified)` of the view cells of `domain`
+    in each of `years` that has some, see `report_view_version_columns`.
+    """
+    return (
+        select(report_view.c.year, *report_view_version_columns())
+        .where(
+            report_view.c.domain == domain,
+            report_view.c.year.in_(sorted(set(years))),
+        )
+        .group_by(report_view.c.year)
+        .order_by(report_view.c.year)
+    )
+
+
+class ReportViewRefresher:
+    """
+    Refresh the report view `delay` seconds after a write, and every
+    `interval` seconds.
+
+    The writes made while a refresh is waiting are folded into it, so a
+    burst of writes costs one refresh, and steady ingestion one refresh
+    every `delay` seconds. Only used while `REPORT_SOURCE` is `matview`.
+    """
+
+    def __init__(self, delay: float = 0, interval: float = 0):
+        self.delay = delay
+        self.interval = interval
+        self.refreshed_at: Optional[datetime] = None
+        self._pending = False
+        self._scheduled: Optional[asyncio.Task] = None
+        self._periodic: Optional[asyncio.Task] = None
+        self._refreshes = 0
+        self._errors = 0
+
+    @property
+    def enabled(self) -> bool:
+        return app_settings.REPORT_SOURCE == "matview"
+
+    def schedule(self) -> None:
+        """
+        Refresh the view after a write, called by the services.
+        """
+        if not self.enabled or self.delay <= 0:
+            return
+        self._pending = True
+        if self._scheduled is None or self._scheduled.done():
+            self._scheduled = asyncio.get_running_loop().create_task(
+                self._refresh_after_writes()
+            )
+
+    async def _refresh_after_writes(self) -> None:
+        # A write during the refresh may not be part of it, go again
+        while self._pending:
+            await asyncio.sleep(self.delay)
+            self._pending = False
+            await self.refresh()
+
+    async def _refresh_periodically(self) -> None:
+        while True:
+            await asyncio.sleep(self.interval)
+            await self.refresh()
+
+    async def refresh(self) -> bool:
+        """
+        Refresh the view now.
+
+        Returns
+        -------
+        `bool`
+            Whether the view was refreshed, errors are logged
+        """
+        try:
+            await run_in_threadpool(self._refresh)
+        except SQLAlchemyError as err:
+            logger.error(f"Error while refreshing {REPORT_VIEW}, error: {err}")
+            self._errors += 1
+            return False
+
+        self.refreshed_at = datetime.now(timezone.utc)
+        self._refreshes += 1
+        return True
+
+    def _refresh(self) -> None:
+        with engine.begin() as connection:
+            refresh_report_view(connection)
+
+    def start(self) -> None:
+        if self.enabled and self.interval > 0:
+            self._periodic = asyncio.get_running_loop().create_task(
+                self._refresh_periodically()
+            )
+
+    async def stop(self) -> None:
+        self._pending = False
+        for task in (self._scheduled, self._periodic):
+            if task is not None and not task.done():
+                task.cancel()
+        self._scheduled = self._periodic = None
+
+    def stats(self) -> dict[str, Any]:
+        return {
+            "enabled": self.enabled,
+            "delay": self.delay,
+            "interval": self.interval,
+            "pending": self._pending,
+            "refreshed_at": (
+                self.refreshed_at.isoformat() if self.refreshed_at else None
+            ),
+            "refreshes": self._refreshes,
+            "errors": self._errors,
+        }
+
+
+report_view_refresher = ReportViewRefresher(
+    delay=app_settings.REPORT_VIEW_REFRESH_DELAY,
+    interval=app_settings.REPORT_VIEW_REFRESH_INTERVAL,
+)
@@ -0,0 +1,301 @@
+from datetime import datetime, timezone
+from enum import Enum
+from typing import Any, Iterable, Optional, Type
+
+from sqlalchemy import Enum as EnumType
+from sqlalchemy import Table, delete, event, func, inspect, select
+from sqlalchemy.dialects.postgresql import insert
+from sqlalchemy.engine import Connection
+from sqlalchemy.orm import Session
+from sqlalchemy.sql import ColumnElement, Select, type_coerce
+
+from app.core.config import get_app_settings
+from app.models import ROLLUP_CATEGORIES, MonthlyRollup, report_view
+from app.utils.years import to_utc
+
+app_settings = get_app_settings()
+
+ROLLUP = MonthlyRollup.__table__
+KEY_COLUMNS = ("domain", "year", "month", "category", "emission_type")
+
+# (domain, year, month, category, emission_type)
+Cell = tuple[str, int, int, str, str]
+
+
+def _name(value: Any) -> str:
+    # `sqlalchemy.Enum` columns store the member names
+    if value is None:
+        return ""
+    return value.name if isinstance(value, Enum) else str(value)
+
+
+def _cell(domain: str, values: dict) -> Cell:
+    moment = to_utc(values["datetime"])
+    return (
+        domain,
+        moment.year,
+        moment.month,
+        _name(values[ROLLUP_CATEGORIES[domain]]),
+        _name(values["emission_type"]),
+    )
+
+
+def add_rows(connection: Connection, table: Table, rows: list[dict]) -> None:
+    """
+    Add freshly inserted `rows` of `table` to the rollup.
+
+    The rows are totalled per cell first, then every cell is upserted in
+    one statement, in key order so concurrent writers lock cells in the
+    same order.
+    """
+    domain = table.name
+    if domain not in ROLLUP_CATEGORIES or not rows:
+        return
+
+    totals: dict[Cell, list] = {}
+    for row in rows:
+        cell = _cell(domain, row)
+        quantity = row["quantity"]
+        total = totals.get(cell)
+        if total is None:
+            totals[cell] = [1, quantity, quantity, quantity]
+        else:
+            total[0] += 1
+            total[1] += quantity
+            total[2] = min(total[2], quantity)
+            total[3] = max(total[3], quantity)
+
+    statement = insert(ROLLUP).values(
+        [
+            {
+                **dict(zip(KEY_COLUMNS, cell)),
+                "count": count,
+                "sum": total,
+                "min": minimum,
+                "max": maximum,
+            }
+            for cell, (count, total, minimum, maximum) in sorted(
+                totals.items()
+            )
+        ]
+    )
+    excluded = statement.excluded
+    connection.execute(
+        statement.on_conflict_do_update(
+            index_elements=KEY_COLUMNS,
+            set_={
+                "count": ROLLUP.c.count + excluded.count,
+                "sum": ROLLUP.c.sum + excluded.sum,
+                "min": func.least(ROLLUP.c.min, excluded.min),
+                "max": func.greatest(ROLLUP.c.max, excluded.max),
+                "last_modified": func.now(),
+            },
+        )
+    )
+
+
+def _matches(column: ColumnElement, name: str) -> ColumnElement:
+    return column.is_(None) if name == "" else column == name
+
+
+def refresh_cells(connection: Connection, cells: Iterable[Cell]) -> None:
+    """
+    Recompute rollup `cells` from the rows of their month.
+
+    Used after updates and deletes, a minimum or maximum cannot be taken
+    back incrementally. The recomputed cells get a new `last_modified`.
+    A cell is upserted, or deleted once it has no rows left, so writers
+    recomputing the same cell at the same time wait on its row instead of
+    both inserting it.
+    """
+    for domain, year, month, category, emission_type in sorted(cells):
+        table = ROLLUP.metadata.tables[domain]
+        key = dict(
+            zip(KEY_COLUMNS, (domain, year, month, category, emission_type))
+        )
+
+        start = datetime(year, month, 1, tzinfo=timezone.utc)
+        end = datetime(
+            year + month // 12, month % 12 + 1, 1, tzinfo=timezone.utc
+        )
+        quantity = table.c.quantity
+        count, total, minimum, maximum = connection.execute(
+            select(
+                func.count(),
+                func.sum(quantity),
+                func.min(quantity),
+                func.max(quantity),
+            ).where(
+                table.c.datetime >= start,
+                table.c.datetime < end,
+                _matches(table.c[ROLLUP_CATEGORIES[domain]], category),
+                _matches(table.c.emission_type, emission_type),
+            )
+        ).one()
+
+        if not count:
+            connection.execute(
+                delete(ROLLUP).where(
+                    *(
+                        ROLLUP.c[column] == value
+                        for column, value in key.items()
+                    )
+                )
+            )
+            continue
+
+        statement = insert(ROLLUP).values(
+            **key, count=count, sum=total, min=minimum, max=maximum
+        )
+        excluded = statement.excluded
+        connection.execute(
+            statement.on_conflict_do_update(
+                index_elements=KEY_COLUMNS,
+                set_={
+                    "count": excluded.count,
+                    "sum": excluded.sum,
+                    "min": excluded.min,
+                    "max": excluded.max,
+                    "last_modified": func.now(),
+                },
+            )
+        )
+
+
+def _values(obj: Any, domain: str, previous: bool = False) -> dict:
+    columns = ("datetime", "quantity", "emission_type")
+    values = {
+        key: getattr(obj, key) for key in (*columns, ROLLUP_CATEGORIES[domain])
+    }
+    if previous:
+        state = inspect(obj)
+        for key in values:
+            history = state.attrs[key].history
+            if history.deleted:
+                values[key] = history.deleted[0]
+    return values
+
+
+def _domain(obj: Any) -> Optional[str]:
+    table = getattr(type(obj), "__table__", None)
+    if table is None or table.name not in ROLLUP_CATEGORIES:
+        return None
+    return table.name
+
+
+@event.listens_for(Session, "after_flush")
+def _maintain_rollup(session: Session, flush_context: Any) -> None:
+    # Runs inside the flush, so the rollup commits or rolls back with the
+    # rows. The session still lists what was flushed and the old values.
+    # Runs whatever `REPORT_SOURCE` is: the migration is the only backfill
+    # of the rollup, so skipping writes while reports read the raw rows or
+    # the view would leave it wrong once `REPORT_SOURCE` is back to rollup.
+    added: dict[Table, list[dict]] = {}
+    cells: set[Cell] = set()
+    for obj in session.new:
+        domain = _domain(obj)
+        if domain is not None:
+            added.setdefault(type(obj).__table__, []).append(
+                _values(obj, domain)
+            )
+    for obj in session.deleted:
+        domain = _domain(obj)
+        if domain is not None:
+            cells.add(_cell(domain, _values(obj, domain, previous=True)))
+    for obj in session.dirty:
+        domain = _domain(obj)
+        if domain is not None and session.is_modified(obj):
+            cells.add(_cell(domain, _values(obj, domain, previous=True)))
+            cells.add(_cell(domain, _values(obj, domain)))
+
+    if not added and not cells:
+        return
+    connection = session.connection()
+    for table, rows in added.items():
+        add_rows(connection, table, rows)
+    refresh_cells(connection, cells)
+
+
+def rollup_source() -> Table:
+    """
+    The rollup the reports read, the table or its materialized view.
+    """
+    return report_view if app_settings.REPORT_SOURCE == "matview" else ROLLUP
+
+
+def rollup_version_columns() -> list[ColumnElement]:
+    """
+    `count, last_modified` of the rollup cells grouped over.
+
+    Every write upserts or recomputes the cells of its rows, so they
+    change with the rows without a row being read.
+    """
+    return [
+        func.sum(ROLLUP.c.count).label("count"),
+        func.max(ROLLUP.c.last_modified).label("last_modified"),
+    ]
+
+
+def rollup_version(domain: str, years: Iterable[int]) -> Select:
+    """
+    `(year, count, last_modified)` of the rollup cells of `domain` in each
+    of `years` that has some, see `rollup_version_columns`.
+    """
+    return (
+        select(ROLLUP.c.year, *rollup_version_columns())
+        .where(
+            ROLLUP.c.domain == domain,
+            ROLLUP.c.year.in_(sorted(set(years))),
+        )
+        .group_by(ROLLUP.c.year)
+        .order_by(ROLLUP.c.year)
+    )
+
+
+def rollup_years(domain: str, years: Iterable[int]) -> list[ColumnElement]:
+    """
+    Criteria selecting the rollup cells of `domain` in `years`.
+    """
+    rollup = rollup_source()
+    return [rollup.c.domain == domain, rollup.c.year.in_(sorted(set(years)))]
+
+
+def rollup_category_is(value: Optional[Enum]) -> ColumnElement:
+    """
+    Criterion selecting the rollup cells of one category.
+    """
+    return rollup_source().c.category == _name(value)
+
+
+def rollup_category(enum: Type[Enum]) -> ColumnElement:
+    """
+    The `category` column, read back as members of `enum`.
+    """
+    return type_coerce(
+        func.nullif(rollup_source().c.category, ""), EnumType(enum)
+    )
+
+
+def rollup_emission_type(enum: Type[Enum]) -> ColumnElement:
+    """
+    The `emission_type` column, read back as members of `enum`.
+    """
+    return type_coerce(
+        func.nullif(rollup_source().c.emission_type, ""), EnumType(enum)
+    )
+
+
+def rollup_month() -> ColumnElement:
+    """
+    The first day of the cell month, like `date_trunc('month', datetime)`.
+    """
+    rollup = rollup_source()
+    return func.make_date(rollup.c.year, rollup.c.month, 1)
+
+
+def rollup_average() -> ColumnElement:
+    """
+    `avg(quantity)` of the rows behind the grouped cells.
+    """
+    rollup = rollup_source()
+    return func.sum(rollup.c.sum) / func.sum(rollup.c.count)
@@ -0,0 +1,196 @@
+import json
+from enum import Enum
+from functools import wraps
+from typing import Any, Awaitable, Callable, Iterable, Optional
+
+from fastapi import Response
+
+from app.core import get_logger
+from app.core.config import get_app_settings
+from app.utils.conditional import report_version
+from app.utils.years import ReportYears
+
+try:
+    from redis import asyncio as aioredis
+    from redis.exceptions import RedisError
+except ImportError:  # pragma: no cover - the shared cache is optional
+    aioredis = None
+    RedisError = OSError
+
+logger = get_logger(__name__)
+app_settings = get_app_settings()
+
+KEY_PREFIX = "report"
+
+
+def _generation_key(table: str, year: int) -> str:
+    return f"{KEY_PREFIX}:generation:{table}:{year}"
+
+
+class SharedReportCache:
+    """
+    Report responses shared by every worker through a Redis-protocol store.
+
+    Entries hold the encoded response body, prefixed with the generations
+    of the `(table, year)` tags it was computed from. Writes increment those
+    generations in the store, so a write on any worker makes the entries
+    of its years stale everywhere, and reading an entry together with its
+    generations takes a single round trip.
+
+    Store errors are logged and treated as misses, the database stays the
+    source of truth.
+    """
+
+    def __init__(self, client: Any = None, ttl: int = 0):
+        self.client = client
+        self.ttl = ttl
+        self._hits = 0
+        self._misses = 0
+        self._errors = 0
+
+    @property
+    def enabled(self) -> bool:
+        return self.client is not None and self.ttl > 0
+
+    async def get(
+        self, key: str, tags: list[tuple[str, int]]
+    ) -> tuple[Optional[bytes], bytes]:
+        """
+        Return the cached body for `key`, or None, and the current
+        generations of `tags` to store a fresh body with.
+        """
+        try:
+            async with self.client.pipeline(transaction=False) as pipe:
+                pipe.get(key)
+                pipe.mget([_generation_key(*tag) for tag in tags])
+                entry, generations = await pipe.execute()
+        except RedisError as err:
+            logger.error(f"Shared report cache unavailable, error: {err}")
+            self._errors += 1
+            return None, b""
+
+        generation = b",".join(value or b"0" for value in generations)
+        if entry is not None:
+            entry_generation, _, body = entry.partition(b"\n")
+            if entry_generation == generation:
+                self._hits += 1
+                return body, generation
+        self._misses += 1
+        return None, generation
+
+    async def set(self, key: str, generation: bytes, body: bytes) -> None:
+        try:
+            await self.client.set(key, generation + b"\n" + body, ex=self.ttl)
+        except RedisError as err:
+            logger.error(f"Shared report cache unavailable, error: {err}")
+            self._errors += 1
+
+    async def invalidate(self, table: str, years: Iterable[int]) -> None:
+        """
+        Make every report computed from `table` for one of `years` stale.
+        """
+        if not self.enabled:
+            return
+        keys = [_generation_key(table, year) for year in years]
+        if not keys:
+            return
+        try:
+            async with self.client.pipeline(transaction=False) as pipe:
+                for key in keys:
+                    pipe.incr(key)
+                await pipe.execute()
+        except RedisError as err:
+            # Entries of these years are only as stale as the cache TTL
+            logger.error(f"Shared report cache unavailable, error: {err}")
+            self._errors += 1
+
+    def stats(self) -> dict[str, Any]:
+        return {
+            "enabled": self.enabled,
+            "ttl": self.ttl,
+            "hits": self._hits,
+            "misses": self._misses,
+            "errors": self._errors,
+        }
+
+
+def _create_client() -> Any:
+    if not app_settings.REPORT_CACHE_URL:
+        return None
+    if aioredis is None:
+        logger.error("REPORT_CACHE_URL is set but redis is not installed")
+        return None
+    return aioredis.Redis.from_url(app_settings.REPORT_CACHE_URL)
+
+
+shared_report_cache = SharedReportCache(
+    client=_create_client(), ttl=app_settings.REPORT_CACHE_TTL
+)
+
+
+def report_params(kwargs: dict[str, Any]) -> dict[str, Any]:
+    """
+    The query parameters of a report route call, without its dependencies.
+    """
+    params = {}
+    for key, value in kwargs.items():
+        if isinstance(value, ReportYears):
+            params.update(value.params())
+        elif value is None or isinstance(value, (Enum, int, str)):
+            params[key] = value.value if isinstance(value, Enum) else value
+    return params
+
+
+def shared_report(
+    *tables: str,
+) -> Callable[[Callable[..., Awaitable[Response]]], Callable[..., Any]]:
+    """
+    Serve a yearly report route from `shared_report_cache`.
+
+    Successful responses are stored as they were sent, so a hit skips both
+    the database and the JSON encoding. The key is the route, its query
+    parameters and the `report_version` of the request, dependencies such
+    as the services are left out.
+
+    Parameters
+    ----------
+    `tables` : str
+        The tables the report is computed from
+
+    Returns
+    -------
+    `Callable`
+        Decorator for a route taking a `ReportYears` `years` parameter and
+        returning a JSON `Response`
+    """
+
+    def decorator(
+        func: Callable[..., Awaitable[Response]]
+    ) -> Callable[..., Any]:
+        name = f"{func.__module__}.{func.__name__}"
+
+        @wraps(func)
+        async def wrapper(**kwargs) -> Response:
+            if not shared_report_cache.enabled:
+                return await func(**kwargs)
+
+            params = report_params(kwargs)
+            params["version"] = report_version.get()
+            key = f"{KEY_PREFIX}:{name}:{json.dumps(params, sort_keys=True)}"
+            tags = [
+                (table, year)
+                for table in tables
+                for year in kwargs["years"].years
+            ]
+            body, generation = await shared_report_cache.get(key, tags)
+            if body is not None:
+                return Response(content=body, media_type="application/json")
+
+            response = await func(**kwargs)
+            if response.status_code == 200 and generation:
+                await shared_report_cache.set(key, generation, response.body)
+            return response
+
+        return wrapper
+
+    return decorator
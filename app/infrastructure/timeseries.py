@@ -0,0 +1,175 @@
+from typing import Any, Iterable
+
+from sqlalchemy import (
+    Integer,
+    and_,
+    cast,
+    column,
+    extract,
+    func,
+    select,
+    true,
+    values,
+)
+from sqlalchemy.dialects.postgresql import aggregate_order_by
+from sqlalchemy.sql import ColumnElement, Select
+
+from app.core.config import get_app_settings
+from app.infrastructure.rollup import (
+    rollup_category_is,
+    rollup_source,
+    rollup_years,
+)
+from app.infrastructure.years import in_years, row_year
+from app.models import ROLLUP_CATEGORIES
+
+app_settings = get_app_settings()
+
+# Any category, `None` being the category of rows without one
+ANY = object()
+
+# How the rollup cells combine into each aggregate of the rows
+_RAW_AGGREGATES = {
+    "sum": lambda quantity: func.sum(quantity),
+    "count": lambda quantity: func.count(),
+    "min": lambda quantity: func.min(quantity),
+    "max": lambda quantity: func.max(quantity),
+}
+_ROLLUP_AGGREGATES = {
+    "sum": lambda rollup: func.sum(rollup.c.sum),
+    "count": lambda rollup: func.sum(rollup.c.count),
+    "min": lambda rollup: func.min(rollup.c.min),
+    "max": lambda rollup: func.max(rollup.c.max),
+}
+
+
+def dense_series(
+    year: ColumnElement,
+    years: Iterable[int],
+    bucket: ColumnElement,
+    value: ColumnElement,
+    buckets: int,
+    *criteria,
+) -> Select:
+    """
+    Build `value` per bucket of every year of `years`, as one array per
+    year with a slot for every bucket.
+
+    The years and buckets come from a `VALUES` list and `generate_series`
+    left joined to the grouped rows, so empty buckets and years are 0
+    without filling them in Python.
+
+    Parameters
+    ----------
+    `year` : ColumnElement
+        The year of a row
+    `years` : Iterable[int]
+        The years to build an array for
+    `bucket` : ColumnElement
+        The bucket of a row, between 1 and `buckets`
+    `value` : ColumnElement
+        The aggregate of the rows of a bucket, such as `sum(quantity)`
+    `buckets` : int
+        The number of buckets
+    `criteria` : ColumnElement
+        Filters of the rows, such as the years
+
+    Returns
+    -------
+    `Select`
+        Rows of the `year` and the array of its `buckets` values, in order,
+        by year
+    """
+    totals = (
+        select(
+            year.label("year"), bucket.label("bucket"), value.label("value")
+        )
+        .where(*criteria)
+        .group_by("year", "bucket")
+        .subquery()
+    )
+    keys = (
+        values(column("year", Integer), name="years")
+        .data([(key,) for key in sorted(set(years))])
+        .alias("years")
+    )
+    series = (
+        func.generate_series(1, buckets)
+        .table_valued("bucket")
+        .render_derived(name="series")
+    )
+    return (
+        select(
+            keys.c.year,
+            func.array_agg(
+                aggregate_order_by(
+                    func.coalesce(totals.c.value, 0), series.c.bucket
+                )
+            ).label("values"),
+        )
+        .select_from(
+            keys.join(series, true()).outerjoin(
+                totals,
+                and_(
+                    totals.c.year == keys.c.year,
+                    totals.c.bucket == series.c.bucket,
+                ),
+            )
+        )
+        .group_by(keys.c.year)
+        .order_by(keys.c.year)
+    )
+
+
+def monthly_series(
+    model: Any,
+    years: Iterable[int],
+    aggregate: str = "sum",
+    category: Any = ANY,
+) -> Select:
+    """
+    `dense_series` of the 12 months of every year of `years` for the rows
+    of a domain `model`, read from the report source.
+
+    Parameters
+    ----------
+    `model` : SQLModel
+        Fuel, Oil, Energy or Roadtrip
+    `years` : Iterable[int]
+        The years of the series
+    `aggregate` : str
+        `sum`, `count`, `min` or `max` of the quantity
+    `category` : Enum
+        Only the rows of this value of the domain's category column
+
+    Returns
+    -------
+    `Select`
+        One row per year holding its `year` and 12 monthly `values`
+    """
+    domain = model.__table__.name
+    if app_settings.REPORT_SOURCE != "raw":
+        rollup = rollup_source()
+        criteria = rollup_years(domain, years)
+        if category is not ANY:
+            criteria.append(rollup_category_is(category))
+        return dense_series(
+            rollup.c.year,
+            years,
+            rollup.c.month,
+            _ROLLUP_AGGREGATES[aggregate](rollup),
+            12,
+            *criteria,
+        )
+
+    criteria = [in_years(model, years)]
+    if category is not ANY:
+        criteria.append(getattr(model, ROLLUP_CATEGORIES[domain]) == category)
+    return dense_series(
+        row_year(model),
+        years,
+        cast(extract("month", model.datetime), Integer),
+        _RAW_AGGREGATES[aggregate](model.quantity),
+        12,
+        *criteria,
+    )
@@ -0,0 +1,49 @@
+from datetime import datetime as dt
+from itertools import groupby
+from typing import Any, Iterable
+
+from sqlalchemy import Integer, and_, cast, extract, or_
+from sqlalchemy.sql import ColumnElement
+
+
+def row_year(model: Any) -> ColumnElement:
+    """
+    The year of a row of a domain `model`, in the session time zone.
+
+    The engines pin the session to UTC, the time zone of the rollup `year`.
+    """
+    return cast(extract("year", model.datetime), Integer)
+
+
+def year_runs(years: Iterable[int]) -> list[tuple[int, int]]:
+    """
+    `years` as runs of consecutive years, `(first, last)` in order.
+    """
+    ordered = sorted(set(years))
+    return [
+        (run[0][1], run[-1][1])
+        for run in (
+            list(group)
+            for _, group in groupby(
+                enumerate(ordered), lambda pair: pair[1] - pair[0]
+            )
+        )
+    ]
+
+
+def in_years(model: Any, years: Iterable[int]) -> ColumnElement:
+    """
+    Criterion selecting the rows of a domain `model` in `years`.
+
+    Every run of consecutive years is one `datetime` range, so a range of
+    years is a single scan of the `datetime` index.
+    """
+    return or_(
+        *(
+            and_(
+                model.datetime >= dt(first, 1, 1),
+                model.datetime < dt(last + 1, 1, 1),
+            )
+            for first, last in year_runs(years)
+        )
+    )
@@ -1,4 +1,8 @@
+from .closed_period import ClosedReport, ClosedYear
+from .emission import EMISSION_VIEW, emission
 from .energy import Energy
 from .fuel import Fuel
 from .oil import Oil
+from .report_view import REPORT_VIEW, report_view, report_view_refresh
 from .roadtrip import Roadtrip
+from .rollup import ROLLUP_CATEGORIES, MonthlyRollup
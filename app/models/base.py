@@ -9,7 +9,13 @@ from app.utils.entities_utils import model_class_name_to_lower
 
 
 class BaseSQLModel(SQLModel):
-    id: Optional[int] = Field(default=None, primary_key=True)
+    # `autoincrement` has to be explicit because the partitioned tables have
+    # a composite primary key of `id` and `datetime`
+    id: Optional[int] = Field(
+        default=None,
+        primary_key=True,
+        sa_column_kwargs={"autoincrement": True},
+    )
 
     created_at: Optional[dt] = Field(
         sa_column=Column(
@@ -0,0 +1,142 @@
+from datetime import datetime as dt
+from typing import Optional
+
+from sqlalchemy import MetaData, event, func, text
+from sqlalchemy.engine import Connection
+from sqlmodel import Column, DateTime, Field, LargeBinary, SQLModel
+
+from app.models.partitioning import MOVING_ROWS, year_partitioned_tables
+
+CLOSED_YEAR_TRIGGER = "reject_closed_year_writes"
+# Advisory lock of a year, taken shared by every write to the year and
+# exclusive by `close_year`, so no write commits while its year is closed
+CLOSED_YEAR_LOCK = "hashtext('closed_year')"
+# The triggers calling `CLOSED_YEAR_TRIGGER`, with the rows each one sees
+CLOSED_YEAR_TRIGGERS = {
+    "reject_closed_year_inserts": ("INSERT", "NEW TABLE AS new_rows"),
+    "reject_closed_year_updates": (
+        "UPDATE",
+        "OLD TABLE AS old_rows NEW TABLE AS new_rows",
+    ),
+    "reject_closed_year_deletes": ("DELETE", "OLD TABLE AS old_rows"),
+}
+_UTC_YEAR = "extract(year FROM datetime AT TIME ZONE 'UTC')::int"
+
+
+class ClosedYear(SQLModel, table=True):
+    # Years whose readings can no longer change, see `ClosedPeriodService`
+    __tablename__ = "closed_year"
+
+    year: int = Field(
+        primary_key=True, sa_column_kwargs={"autoincrement": False}
+    )
+    closed_at: Optional[dt] = Field(
+        sa_column=Column(
+            DateTime(timezone=True), nullable=True, server_default=func.now()
+        )
+    )
+
+
+class ClosedReport(SQLModel, table=True):
+    # Report responses of closed years, stored once and served forever
+    __tablename__ = "closed_report"
+
+    key: str = Field(primary_key=True)
+    year: int = Field(index=True, nullable=False)
+    body: bytes = Field(sa_column=Column(LargeBinary, nullable=False))
+    created_at: Optional[dt] = Field(
+        sa_column=Column(
+            DateTime(timezone=True), nullable=True, server_default=func.now()
+        )
+    )
+
+
+def closed_year_trigger_function() -> str:
+    """
+    The trigger function rejecting writes to rows of a closed year.
+
+    Run once per statement, it takes the shared lock of every UTC year the
+    statement wrote to, in year order, then checks them all at once. The
+    check runs after the locks are granted, so it sees a `closed_year` row
+    committed while it waited.
+    """
+    return f"""
+        CREATE OR REPLACE FUNCTION {CLOSED_YEAR_TRIGGER}() RETURNS trigger
+        LANGUAGE plpgsql AS $$
+        DECLARE
+            changed_years int[];
+            changed_year int;
+            closed int;
+        BEGIN
+            IF current_setting('{MOVING_ROWS}', true) = 'on' THEN
+                RETURN NULL;
+            END IF;
+            IF TG_OP = 'INSERT' THEN
+                SELECT array_agg(DISTINCT {_UTC_YEAR} ORDER BY {_UTC_YEAR})
+                INTO changed_years FROM new_rows;
+            ELSIF TG_OP = 'DELETE' THEN
+                SELECT array_agg(DISTINCT {_UTC_YEAR} ORDER BY {_UTC_YEAR})
+                INTO changed_years FROM old_rows;
+            ELSE
+                SELECT array_agg(DISTINCT {_UTC_YEAR} ORDER BY {_UTC_YEAR})
+                INTO changed_years FROM (
+                    SELECT datetime FROM new_rows
+                    UNION ALL
+                    SELECT datetime FROM old_rows
+                ) AS changed_rows;
+            END IF;
+            FOREACH changed_year IN ARRAY coalesce(changed_years, '{{}}')
+            LOOP
+                PERFORM pg_advisory_xact_lock_shared(
+                    {CLOSED_YEAR_LOCK}, changed_year
+                );
+            END LOOP;
+            SELECT min(year) INTO closed FROM closed_year
+            WHERE year = ANY(changed_years);
+            IF closed IS NOT NULL THEN
+                RAISE EXCEPTION 'Closed years can not be changed: %', closed
+                    USING ERRCODE = 'check_violation',
+                    CONSTRAINT = 'closed_year';
+            END IF;
+            RETURN NULL;
+        END
+        $$
+    """
+
+
+def create_closed_year_trigger(
+    connection: Connection, table_name: str
+) -> None:
+    """
+    Reject the writes to rows of closed years of `table_name`.
+
+    One statement level trigger per kind of write, a trigger can only have
+    the transition tables of a single event. Set on the partitioned table,
+    they fire for every statement on it, whichever partitions it touches.
+    """
+    for name, (write, rows) in CLOSED_YEAR_TRIGGERS.items():
+        exists = connection.execute(
+            text(
+                "SELECT EXISTS (SELECT 1 FROM pg_trigger "
+                "WHERE tgrelid = to_regclass(:table) AND tgname = :name)"
+            ),
+            {"table": table_name, "name": name},
+        ).scalar()
+        if not exists:
+            connection.execute(
+                text(
+                    f'CREATE TRIGGER {name} AFTER {write} ON "{table_name}" '
+                    f"REFERENCING {rows} FOR EACH STATEMENT "
+                    f"EXECUTE FUNCTION {CLOSED_YEAR_TRIGGER}()"
+                )
+            )
+
+
+@event.listens_for(SQLModel.metadata, "after_create")
+def _create_closed_year_triggers(
+    target: MetaData, connection: Connection, **kw
+):
+    # `create_all` creates the domain tables, the triggers can only follow
+    connection.execute(text(closed_year_trigger_function()))
+    for table in year_partitioned_tables():
+        create_closed_year_trigger(connection, table.name)
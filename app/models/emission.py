@@ -0,0 +1,71 @@
+from sqlalchemy import (
+    Column,
+    DateTime,
+    Float,
+    MetaData,
+    String,
+    Table,
+    event,
+    text,
+)
+from sqlalchemy.engine import Connection
+from sqlmodel import SQLModel
+
+from app.models.rollup import ROLLUP_CATEGORIES
+
+EMISSION_VIEW = "emission"
+
+# The rows of every domain table under common columns, a plain view so
+# cross-domain reports are one grouped query always in step with the rows.
+# Enum columns hold the member names, `category` being the rollup category
+# of the domain. Not part of `SQLModel.metadata`, like the report view.
+emission = Table(
+    EMISSION_VIEW,
+    MetaData(),
+    Column("domain", String),
+    Column("datetime", DateTime(timezone=True)),
+    Column("quantity", Float),
+    Column("emission_type", String),
+    Column("category", String),
+    Column("created_at", DateTime(timezone=True)),
+    Column("updated_at", DateTime(timezone=True)),
+)
+
+
+def emission_view_query() -> str:
+    """
+    The query of the view, every domain table in turn.
+
+    The branches are bare selects, so Postgres pushes the `datetime` and
+    `domain` criteria down into each: the tables are read through their
+    `datetime` index and the domains not asked for are not read at all.
+    """
+    return " UNION ALL ".join(
+        f"""
+        SELECT
+            '{domain}'::text AS domain,
+            datetime,
+            quantity::float AS quantity,
+            emission_type::text AS emission_type,
+            "{category}"::text AS category,
+            created_at,
+            updated_at
+        FROM {domain}
+        """
+        for domain, category in ROLLUP_CATEGORIES.items()
+    )
+
+
+def create_emission_view(connection: Connection) -> None:
+    connection.execute(
+        text(
+            f"CREATE OR REPLACE VIEW {EMISSION_VIEW} AS "
+            f"{emission_view_query()}"
+        )
+    )
+
+
+@event.listens_for(SQLModel.metadata, "after_create")
+def _create_emission_view(target: MetaData, connection: Connection, **kw):
+    # `create_all` creates the domain tables, the view can only follow them
+    create_emission_view(connection)
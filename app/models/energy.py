@@ -1,18 +1,53 @@
 from datetime import datetime as dt
 from typing import Optional
 
-from sqlmodel import Column, DateTime, Enum, Field
+from sqlmodel import Column, DateTime, Enum, Field, Index
 
 from app.definitions import EmissionType, EnergyCategory
 from app.definitions.general import EnergyLocation
 from app.models.base import BaseSQLModel
+from app.models.partitioning import PARTITION_BY_YEAR
 
 
 class Energy(BaseSQLModel, table=True):
+    # Covering indexes for the per-year reports and keyset pagination
+    # indexes for the list filters, on tables partitioned by `datetime` year
+    __table_args__ = (
+        Index(
+            "ix_energy_datetime",
+            "datetime",
+            "id",
+            postgresql_include=[
+                "quantity",
+                "location",
+                "energy_category",
+                "created_at",
+                "updated_at",
+            ],
+        ),
+        Index(
+            "ix_energy_location_datetime",
+            "location",
+            "datetime",
+            "id",
+            postgresql_include=["quantity"],
+        ),
+        Index(
+            "ix_energy_emission_type_datetime",
+            "emission_type",
+            "datetime",
+            "id",
+        ),
+        PARTITION_BY_YEAR,
+    )
+
     quantity: float = Field(default=None, nullable=False)
     description: Optional[str] = Field(default=None, nullable=True)
     datetime: dt = Field(
-        default=None, sa_column=Column(DateTime(timezone=True), nullable=False)
+        default=None,
+        sa_column=Column(
+            DateTime(timezone=True), nullable=False, primary_key=True
+        ),
     )
 
     location: EnergyLocation = Field(
@@ -1,17 +1,51 @@
 from datetime import datetime as dt
 from typing import Optional
 
-from sqlmodel import Column, DateTime, Enum, Field
+from sqlmodel import Column, DateTime, Enum, Field, Index
 
 from app.definitions import EmissionType, FuelType
 from app.models.base import BaseSQLModel
+from app.models.partitioning import PARTITION_BY_YEAR
 
 
 class Fuel(BaseSQLModel, table=True):
+    # Covering indexes for the per-year reports and keyset pagination
+    # indexes for the list filters, on tables partitioned by `datetime` year
+    __table_args__ = (
+        Index(
+            "ix_fuel_datetime",
+            "datetime",
+            "id",
+            postgresql_include=[
+                "quantity",
+                "fuel_type",
+                "emission_type",
+                "created_at",
+                "updated_at",
+            ],
+        ),
+        Index(
+            "ix_fuel_fuel_type_datetime",
+            "fuel_type",
+            "datetime",
+            "id",
+        ),
+        Index(
+            "ix_fuel_emission_type_datetime",
+            "emission_type",
+            "datetime",
+            "id",
+        ),
+        PARTITION_BY_YEAR,
+    )
+
     quantity: float = Field(default=None, nullable=False)
     description: Optional[str] = Field(default=None, nullable=True)
     datetime: dt = Field(
-        default=None, sa_column=Column(DateTime(timezone=True), nullable=False)
+        default=None,
+        sa_column=Column(
+            DateTime(timezone=True), nullable=False, primary_key=True
+        ),
     )
     fuel_type: FuelType = Field(
         sa_column=Column(Enum(FuelType)),
@@ -0,0 +1,212 @@
+from datetime import date
+from typing import Iterable, Optional
+
+from sqlalchemy import Table, event, text
+from sqlalchemy.engine import Connection
+from sqlmodel import SQLModel
+
+# `__table_args__` entry for the tables partitioned by `datetime` year. The
+# partition key has to be part of the primary key, so those models declare
+# `datetime` as a primary key column next to `id`.
+PARTITION_BY_YEAR = {"postgresql_partition_by": "RANGE (datetime)"}
+
+# Set while rows move from the default partition into their own, the rows
+# do not change so the closed year trigger lets them through
+MOVING_ROWS = "app.moving_partition_rows"
+
+
+def is_partitioned_by_year(table: Table) -> bool:
+    partition_by = table.dialect_options["postgresql"].get("partition_by")
+    return partition_by == PARTITION_BY_YEAR["postgresql_partition_by"]
+
+
+def year_partitioned_tables() -> list[Table]:
+    return [
+        table
+        for table in SQLModel.metadata.sorted_tables
+        if is_partitioned_by_year(table)
+    ]
+
+
+def partition_name(table_name: str, year: int) -> str:
+    return f"{table_name}_y{year}"
+
+
+def default_partition_name(table_name: str) -> str:
+    return f"{table_name}_default"
+
+
+def _lock_partitions(connection: Connection) -> None:
+    # Every worker checks and creates the partitions on startup, one at a
+    # time. Held until the transaction ends, so the next one sees them.
+    connection.execute(
+        text("SELECT pg_advisory_xact_lock(hashtext('year_partitions'))")
+    )
+
+
+def _exists(connection: Connection, name: str) -> bool:
+    return connection.execute(
+        text("SELECT to_regclass(:name) IS NOT NULL"), {"name": name}
+    ).scalar()
+
+
+def _is_partition(connection: Connection, table_name: str, name: str) -> bool:
+    return connection.execute(
+        text(
+            "SELECT EXISTS (SELECT 1 FROM pg_inherits "
+            "WHERE inhparent = to_regclass(:table) "
+            "AND inhrelid = to_regclass(:name))"
+        ),
+        {"table": table_name, "name": name},
+    ).scalar()
+
+
+def create_default_partition(connection: Connection, table_name: str) -> None:
+    """
+    Create the partition catching rows of years without their own partition.
+    """
+    name = default_partition_name(table_name)
+    _lock_partitions(connection)
+    connection.execute(
+        text(
+            f'CREATE TABLE IF NOT EXISTS "{name}" '
+            f'PARTITION OF "{table_name}" DEFAULT'
+        )
+    )
+
+
+def create_year_partition(
+    connection: Connection, table_name: str, year: int
+) -> bool:
+    """
+    Create the partition holding one year of `table_name`.
+
+    Rows of that year already sitting in the default partition are moved
+    into the new partition before it is attached, otherwise Postgres would
+    refuse the attach. Concurrent callers wait for each other's
+    transaction, so the partition is created once.
+
+    Parameters
+    ----------
+    `connection` : Connection
+        Connection the DDL runs on, inside the caller's transaction
+    `table_name` : str
+        The partitioned table
+    `year` : int
+        The year the partition covers, `[year-01-01, year+1-01-01)`
+
+    Returns
+    -------
+    `bool`
+        `True` if the partition was created, `False` if it already existed
+    """
+    name = partition_name(table_name, year)
+    _lock_partitions(connection)
+    if _exists(connection, name):
+        return False
+
+    default = default_partition_name(table_name)
+    bounds = f"FROM ('{year}-01-01') TO ('{year + 1}-01-01')"
+    in_year = f"datetime >= '{year}-01-01' AND datetime < '{year + 1}-01-01'"
+
+    connection.execute(
+        text(
+            f'CREATE TABLE "{name}" (LIKE "{table_name}" '
+            "INCLUDING DEFAULTS INCLUDING CONSTRAINTS)"
+        )
+    )
+    if _exists(connection, default):
+        connection.execute(
+            text(
+                f'INSERT INTO "{name}" SELECT * FROM "{default}" '
+                f"WHERE {in_year}"
+            )
+        )
+        connection.execute(
+            text("SELECT set_config(:name, 'on', true)"),
+            {"name": MOVING_ROWS},
+        )
+        connection.execute(text(f'DELETE FROM "{default}" WHERE {in_year}'))
+        connection.execute(
+            text("SELECT set_config(:name, 'off', true)"),
+            {"name": MOVING_ROWS},
+        )
+    connection.execute(
+        text(
+            f'ALTER TABLE "{table_name}" ATTACH PARTITION "{name}" '
+            f"FOR VALUES {bounds}"
+        )
+    )
+    return True
+
+
+def detach_year_partition(
+    connection: Connection, table_name: str, year: int
+) -> bool:
+    """
+    Detach one year of `table_name` into a standalone table.
+
+    This is a catalog change only: the rows stay in `<table>_y<year>`,
+    which can then be archived or dropped without touching the other years.
+
+    Returns
+    -------
+    `bool`
+        `True` if the partition was detached, `False` if it was not attached
+    """
+    name = partition_name(table_name, year)
+    _lock_partitions(connection)
+    if not _is_partition(connection, table_name, name):
+        return False
+
+    connection.execute(
+        text(f'ALTER TABLE "{table_name}" DETACH PARTITION "{name}"')
+    )
+    return True
+
+
+def ensure_year_partitions(
+    connection: Connection, years: Optional[Iterable[int]] = None
+) -> list[str]:
+    """
+    Make sure every year partitioned table has the partitions it needs.
+
+    That is the current and next year (or `years` when given), plus one
+    partition for every year that ended up in the default partition, so
+    reports on those years are pruned to a single partition again.
+
+    Returns
+    -------
+    `list[str]`
+        The names of the partitions created
+    """
+    if years is None:
+        current_year = date.today().year
+        years = (current_year, current_year + 1)
+
+    created = []
+    for table in year_partitioned_tables():
+        create_default_partition(connection, table.name)
+        stray_years = connection.execute(
+            text(
+                "SELECT DISTINCT extract(year FROM datetime)::int FROM "
+                f'"{default_partition_name(table.name)}"'
+            )
+        ).scalars()
+        for year in sorted(set(years) | set(stray_years)):
+            if create_year_partition(connection, table.name, year):
+                created.append(partition_name(table.name, year))
+    return created
+
+
+@event.listens_for(Table, "after_create")
+def _create_initial_partitions(target: Table, connection: Connection, **kw):
+    # A partitioned table cannot hold rows by itself, so `create_all` has to
+    # create at least the default partition along with it.
+    if not is_partitioned_by_year(target):
+        return
+
+    current_year = date.today().year
+    create_default_partition(connection, target.name)
+    for year in (current_year, current_year + 1):
+        create_year_partition(connection, target.name, year)
@@ -0,0 +1,106 @@
+from sqlalchemy import (
+    Column,
+    DateTime,
+    Float,
+    Integer,
+    MetaData,
+    String,
+    Table,
+    event,
+    text,
+)
+from sqlalchemy.engine import Connection
+from sqlmodel import SQLModel
+
+from app.models.rollup import ROLLUP_CATEGORIES
+
+REPORT_VIEW = "monthly_rollup_view"
+REPORT_VIEW_REFRESH = f"{REPORT_VIEW}_refresh"
+
+# The rollup as a materialized view, refreshed by
+# `app.infrastructure.report_views` instead of kept in step with the rows.
+# Not part of `SQLModel.metadata`, `create_all` must not create a table.
+report_view = Table(
+    REPORT_VIEW,
+    MetaData(),
+    Column("domain", String, primary_key=True),
+    Column("year", Integer, primary_key=True),
+    Column("month", Integer, primary_key=True),
+    Column("category", String, primary_key=True),
+    Column("emission_type", String, primary_key=True),
+    Column("count", Integer),
+    Column("sum", Float),
+    Column("min", Float),
+    Column("max", Float),
+)
+
+# The one row saying when the view was last refreshed. Kept out of the view
+# so a refresh only rewrites the cells whose data changed.
+report_view_refresh = Table(
+    REPORT_VIEW_REFRESH,
+    MetaData(),
+    Column("id", Integer, primary_key=True),
+    Column("refreshed_at", DateTime(timezone=True), nullable=False),
+)
+
+
+def report_view_query() -> str:
+    """
+    The query of the view, the rollup of every domain table.
+    """
+    return " UNION ALL ".join(
+        f"""
+        SELECT
+            '{domain}'::text AS domain,
+            extract(year FROM datetime AT TIME ZONE 'UTC')::int AS year,
+            extract(month FROM datetime AT TIME ZONE 'UTC')::int AS month,
+            coalesce("{category}"::text, '') AS category,
+            coalesce(emission_type::text, '') AS emission_type,
+            count(*) AS count,
+            sum(quantity)::float AS sum,
+            min(quantity)::float AS min,
+            max(quantity)::float AS max
+        FROM {domain}
+        GROUP BY 2, 3, 4, 5
+        """
+        for domain, category in ROLLUP_CATEGORIES.items()
+    )
+
+
+def create_report_view(connection: Connection) -> None:
+    """
+    Create the view, the unique index a concurrent refresh needs and the
+    row of its refresh time.
+    """
+    connection.execute(
+        text(
+            f"CREATE MATERIALIZED VIEW IF NOT EXISTS {REPORT_VIEW} AS "
+            f"{report_view_query()}"
+        )
+    )
+    connection.execute(
+        text(
+            f"CREATE UNIQUE INDEX IF NOT EXISTS ix_{REPORT_VIEW}_key ON "
+            f"{REPORT_VIEW} (domain, year, month, category, emission_type)"
+        )
+    )
+    connection.execute(
+        text(
+            f"CREATE TABLE IF NOT EXISTS {REPORT_VIEW_REFRESH} ("
+            "id int PRIMARY KEY CHECK (id = 1), "
+            "refreshed_at timestamptz NOT NULL)"
+        )
+    )
+    # The view is created with its data
+    connection.execute(
+        text(
+            f"INSERT INTO {REPORT_VIEW_REFRESH} "
+            "VALUES (1, statement_timestamp()) ON CONFLICT DO NOTHING"
+        )
+    )
+
+
+@event.listens_for(SQLModel.metadata, "after_create")
+def _create_report_view(target: MetaData, connection: Connection, **kw):
+    # `create_all` creates the domain tables, the view can only follow them
+    create_report_view(connection)
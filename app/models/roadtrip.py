@@ -1,17 +1,50 @@
 from datetime import datetime as dt
 from typing import Optional
 
-from sqlmodel import Column, DateTime, Enum, Field
+from sqlmodel import Column, DateTime, Enum, Field, Index
 
 from app.definitions import EmissionType, RoadtripGroupType
 from app.models.base import BaseSQLModel
+from app.models.partitioning import PARTITION_BY_YEAR
 
 
 class Roadtrip(BaseSQLModel, table=True):
+    # Covering indexes for the per-year reports and keyset pagination
+    # indexes for the list filters, on tables partitioned by `datetime` year
+    __table_args__ = (
+        Index(
+            "ix_roadtrip_datetime",
+            "datetime",
+            "id",
+            postgresql_include=[
+                "quantity",
+                "group",
+                "created_at",
+                "updated_at",
+            ],
+        ),
+        Index(
+            "ix_roadtrip_group_datetime",
+            "group",
+            "datetime",
+            "id",
+        ),
+        Index(
+            "ix_roadtrip_emission_type_datetime",
+            "emission_type",
+            "datetime",
+            "id",
+        ),
+        PARTITION_BY_YEAR,
+    )
+
     quantity: int = Field(default=None, nullable=False)
     description: Optional[str] = Field(default=None, nullable=True)
     datetime: dt = Field(
-        default=None, sa_column=Column(DateTime(timezone=True), nullable=False)
+        default=None,
+        sa_column=Column(
+            DateTime(timezone=True), nullable=False, primary_key=True
+        ),
     )
     group: RoadtripGroupType = Field(
         sa_column=Column(Enum(RoadtripGroupType)),
@@ -0,0 +1,40 @@
+from datetime import datetime as dt
+from typing import Optional
+
+from sqlalchemy import func
+from sqlmodel import Column, DateTime, Field, SQLModel
+
+# Column every domain table is rolled up by, next to `emission_type`
+ROLLUP_CATEGORIES = {
+    "fuel": "fuel_type",
+    "oil": "oil_type",
+    "energy": "location",
+    "roadtrip": "group",
+}
+
+
+class MonthlyRollup(SQLModel, table=True):
+    # Per month totals of every domain table, kept in step with the rows by
+    # `app.infrastructure.rollup`. Months are UTC months and enum columns
+    # hold the member names, an empty string standing for NULL. The last
+    # change of a cell versions the reports read from the rollup.
+    __tablename__ = "monthly_rollup"
+
+    domain: str = Field(primary_key=True)
+    year: int = Field(
+        primary_key=True, sa_column_kwargs={"autoincrement": False}
+    )
+    month: int = Field(
+        primary_key=True, sa_column_kwargs={"autoincrement": False}
+    )
+    category: str = Field(primary_key=True)
+    emission_type: str = Field(primary_key=True)
+    count: int = Field(nullable=False)
+    sum: float = Field(nullable=False)
+    min: float = Field(nullable=False)
+    max: float = Field(nullable=False)
+    last_modified: Optional[dt] = Field(
+        sa_column=Column(
+            DateTime(timezone=True), nullable=False, server_default=func.now()
+        )
+    )
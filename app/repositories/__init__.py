@@ -1,4 +1,6 @@
+from .closed_period_repo import ClosedPeriodRepository
 from .energy_repo import EnergyRepository
 from .fuel_repo import FuelRepository
 from .oil_repo import OilRepository
+from .report_repo import ReportRepository
 from .roadtrip_repo import RoadtripRepository
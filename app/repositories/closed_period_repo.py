@@ -0,0 +1,143 @@
+# Python Imports
+from typing import Optional, Union
+
+# Third Party Imports
+from fastapi import Depends
+from sqlalchemy import text
+from sqlalchemy.dialects.postgresql import insert
+from sqlmodel import Session, select
+
+# Local Imports
+from app.core import get_logger
+from app.core.config import get_app_settings
+from app.infrastructure import get_db_session, refresh_report_view
+from app.models import ClosedReport, ClosedYear
+from app.models.closed_period import CLOSED_YEAR_LOCK
+from app.utils.errors import DatabaseError, handle_database_error
+
+logger = get_logger(__name__)
+app_settings = get_app_settings()
+
+
+class ClosedPeriodRepository:
+    def __init__(self, session: Session = Depends(get_db_session)):
+        self.session = session
+
+    @handle_database_error
+    def get_closed_years(self) -> Union[list[int], DatabaseError]:
+        """
+        Get the years closed with `close_year`.
+
+        Returns
+        -------
+        `Union[list[int], DatabaseError]`
+            The closed years in ascending order, otherwise an DatabaseError
+        """
+        try:
+            statement = select(ClosedYear.year).order_by(ClosedYear.year)
+            return list(self.session.exec(statement).all())
+        except Exception as err:
+            logger.error(f"Error getting closed years, Error: {err}")
+            raise err
+
+    @handle_database_error
+    def close_year(self, year: int) -> Union[bool, DatabaseError]:
+        """
+        Close a year, closing it again does nothing.
+
+        Waits for the writes to the year in progress to commit, the ones
+        coming after are rejected by the domain tables.
+
+        Parameters
+        ----------
+        `year` : int
+            The year to close
+
+        Returns
+        -------
+        `Union[bool, DatabaseError]`
+            True if successful, otherwise an DatabaseError
+        """
+        try:
+            self.session.execute(
+                text(
+                    f"SELECT pg_advisory_xact_lock({CLOSED_YEAR_LOCK}, :year)"
+                ),
+                {"year": year},
+            )
+            if app_settings.REPORT_SOURCE == "matview":
+                # The reports of the year are stored for good once closed,
+                # bring the view up to date in the same transaction
+                refresh_report_view(self.session.connection())
+            statement = (
+                insert(ClosedYear.__table__)
+                .values(year=year)
+                .on_conflict_do_nothing()
+            )
+            self.session.execute(statement)
+            self.session.commit()
+            return True
+        except Exception as err:
+            logger.error(f"Error while closing year, error: {err}")
+            self.session.rollback()
+            raise err
+
+    @handle_database_error
+    def get_report(self, key: str) -> Union[Optional[bytes], DatabaseError]:
+        """
+        Get a stored report response.
+
+        Parameters
+        ----------
+        `key` : str
+            The route and parameters of the report
+
+        Returns
+        -------
+        `Union[Optional[bytes], DatabaseError]`
+            The response body, None if it was not stored yet, otherwise an
+            DatabaseError
+        """
+        try:
+            statement = select(ClosedReport.body).where(
+                ClosedReport.key == key
+            )
+            return self.session.exec(statement).first()
+        except Exception as err:
+            logger.error(f"Error getting closed report, Error: {err}")
+            raise err
+
+    @handle_database_error
+    def save_report(
+        self, key: str, year: int, body: bytes
+    ) -> Union[bool, DatabaseError]:
+        """
+        Store a report response, the first one stored for `key` is kept.
+
+        Parameters
+        ----------
+        `key` : str
+            The route and parameters of the report
+        `year` : int
+            The last closed year the report is about
+        `body` : bytes
+            The response body
+
+        Returns
+        -------
+        `Union[bool, DatabaseError]`
+            True if successful, otherwise an DatabaseError
+        """
+        try:
+            statement = (
+                insert(ClosedReport.__table__)
+                .values(key=key, year=year, body=body)
+                .on_conflict_do_nothing()
+            )
+            self.session.execute(statement)
+            self.session.commit()
+            return True
+        except Exception as err:
+            logger.error(f"Error while saving closed report, error: {err}")
+            self.session.rollback()
+            raise err
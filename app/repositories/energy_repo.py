@@ -1,19 +1,36 @@
 # Python Imports
-from typing import Optional, Union
+from datetime import datetime as dt
+from typing import Iterable, Iterator, Optional, Union
 
 # Third Party Imports
 from fastapi import Depends
-from sqlalchemy import func
+from sqlalchemy import Integer, cast, exc, extract, func, tuple_
+from sqlalchemy.engine import Row
 from sqlmodel import Session, select
 
 # Local Imports
 from app.core import get_logger
+from app.core.config import get_app_settings
 from app.definitions.general import EnergyLocation
-from app.infrastructure import get_db_session
+from app.infrastructure import (
+    get_db_session,
+    in_years,
+    insert_rows,
+    report_view_version,
+    rollup_average,
+    rollup_category_is,
+    rollup_source,
+    rollup_version,
+    rollup_years,
+    row_year,
+)
 from app.models import Energy
+from app.schemas.energy_schema import EnergyFilterSchema
 from app.utils.errors import DatabaseError, handle_database_error
+from app.utils.pagination import paginate
 
 logger = get_logger(__name__)
+app_settings = get_app_settings()
 
 
 class EnergyRepository:
@@ -21,7 +38,7 @@ class EnergyRepository:
         self.session = session
 
     @handle_database_error
-    def get(self, id: str) -> Union[Energy, DatabaseError]:
+    def get(self, id: int) -> Union[Energy, DatabaseError]:
         """
         Get an Energy by id.
 
@@ -43,9 +60,23 @@ class EnergyRepository:
             raise err
 
     @handle_database_error
-    def get_all(self) -> Union[list[Energy], DatabaseError]:
+    def get_all(
+        self,
+        filters: Optional[EnergyFilterSchema] = None,
+        limit: Optional[int] = None,
+        after: Optional[tuple[dt, int]] = None,
+    ) -> Union[list[Energy], DatabaseError]:
         """
-        Get all Energys.
+        Get Energys, ordered by `datetime` and `id`.
+
+        Parameters
+        ----------
+        `filters` : EnergyFilterSchema, optional
+            Date range and enum filters
+        `limit` : int, optional
+            Maximum number of energys to return
+        `after` : tuple[datetime, int], optional
+            Keyset `(datetime, id)` of the last energy of the previous page
 
         Returns
         -------
@@ -53,12 +84,68 @@ class EnergyRepository:
             A list of energys if found, otherwise an DatabaseError
         """
         statement = select(Energy)
+        if filters is not None:
+            statement = self._filter(statement, filters)
+        statement = paginate(statement, Energy, limit, after)
         try:
             return self.session.exec(statement).fetchall()
         except Exception as err:
             logger.error(f"Error while fetching all Energys, error: {err}")
             raise err
 
+    def _filter(self, statement, filters: EnergyFilterSchema):
+        if filters.start_date is not None:
+            statement = statement.where(Energy.datetime >= filters.start_date)
+        if filters.end_date is not None:
+            statement = statement.where(Energy.datetime < filters.end_date)
+        if filters.location is not None:
+            statement = statement.where(Energy.location == filters.location)
+        if filters.emission_type is not None:
+            statement = statement.where(
+                Energy.emission_type == filters.emission_type
+            )
+        return statement
+
+    def stream_all(
+        self, filters: EnergyFilterSchema, chunk_size: int
+    ) -> Iterator[list[Row]]:
+        """
+        Stream Energys through a server-side cursor, `chunk_size` at a time.
+
+        Only one chunk is held in memory. `handle_database_error` would
+        only wrap the creation of the generator, so the errors raised while
+        iterating are converted here.
+
+        Parameters
+        ----------
+        `filters` : EnergyFilterSchema
+            Date range and enum filters
+        `chunk_size` : int
+            Number of rows fetched from the cursor at a time
+
+        Yields
+        ------
+        `list[Row]`
+            Up to `chunk_size` energy rows
+        """
+        statement = self._filter(Energy.__table__.select(), filters)
+        result = None
+        try:
+            result = self.session.execute(
+                statement,
+                execution_options={
+                    "stream_results": True,
+                    "max_row_buffer": chunk_size,
+                },
+            )
+            yield from result.partitions(chunk_size)
+        except exc.SQLAlchemyError as err:
+            logger.error(f"Error while streaming Energys, error: {err}")
+            raise DatabaseError(str(err), err)
+        finally:
+            if result is not None:
+                result.close()
+
     @handle_database_error
     def create(self, energy: Energy) -> Union[Energy, DatabaseError]:
         """
@@ -110,6 +197,31 @@ class EnergyRepository:
             self.session.rollback()
             raise err
 
+    @handle_database_error
+    def bulk_insert(self, rows: list[dict]) -> Union[int, DatabaseError]:
+        """
+        Insert validated energy rows with `COPY`, skipping the ORM.
+
+        Parameters
+        ----------
+        `rows` : list[dict]
+            The Energys to create, keyed by column name
+
+        Returns
+        -------
+        `Union[int, DatabaseError]`
+            The number of energys inserted, otherwise an DatabaseError
+        """
+
+        try:
+            inserted = insert_rows(self.session, Energy.__table__, rows)
+            self.session.commit()
+            return inserted
+        except Exception as err:
+            logger.error(f"Error while inserting Energys, error: {err}")
+            self.session.rollback()
+            raise err
+
     @handle_database_error
     def update(self, energy: Energy) -> Union[Energy, DatabaseError]:
         try:
@@ -133,74 +245,162 @@ class EnergyRepository:
             self.session.rollback()
             raise err
 
+    @handle_database_error
+    def get_version(
+        self, years: Iterable[int]
+    ) -> Union[list[Row], DatabaseError]:
+        """
+        Get the row count and the last change of the Energys of each year.
+
+        Together they change on every insert, update and delete in a
+        year. They are read from the rollup cells of the years, kept in
+        step with the rows, or from the `datetime` index alone when the
+        reports read the rows.
+
+        Parameters
+        ----------
+        `years` : Iterable[int]
+            The years to get the version of
+
+        Returns
+        -------
+        `Union[list[Row], DatabaseError]`
+            `(year, count, last_modified)` of each of `years` that has
+            Energys, in order, with the checksum of the view cells before
+            `last_modified` when the reports read the view
+        """
+        try:
+            if app_settings.REPORT_SOURCE == "matview":
+                # The reports only change when the view is refreshed
+                statement = report_view_version("energy", years)
+            elif app_settings.REPORT_SOURCE == "rollup":
+                statement = rollup_version("energy", years)
+            else:
+                year = row_year(Energy)
+                statement = (
+                    select(
+                        year.label("year"),
+                        func.count().label("count"),
+                        func.max(
+                            func.greatest(Energy.created_at, Energy.updated_at)
+                        ).label("last_modified"),
+                    )
+                    .where(in_years(Energy, years))
+                    .group_by(year)
+                    .order_by(year)
+                )
+            return self.session.exec(statement).all()
+        except Exception as err:
+            logger.error(f"Error getting Energy version, Error: {err}")
+            raise err
+
     @handle_database_error
     def get_average_monthly_by_location_and_year(
         self,
-        year: int,
+        years: Iterable[int],
         location: EnergyLocation,
-    ) -> Union[list[Energy], DatabaseError]:
+    ) -> Union[dict[int, Optional[float]], DatabaseError]:
         """
-        Get the average monthly energy consumption for a location and year.
+        Get the average monthly energy consumption for a location and years.
 
         Parameters
         ----------
+        `years` : Iterable[int]
+            The years to get the average monthly energy consumption for
         `location` : str
             The location to get the average monthly energy consumption for
-        `year` : int
-            The year to get the average monthly energy consumption for
 
         Returns
         -------
-        `Union[list[Energy], DatabaseError]`
-            A list of energys if found, otherwise an DatabaseError
+        `Union[dict[int, Optional[float]], DatabaseError]`
+            The average by year, None for a year without energys, otherwise
+            an DatabaseError
         """
-        statement = select(
-            func.avg(Energy.quantity).label("avg_monthly_consumption"),
-        ).where(
-            Energy.location == location,
-            Energy.datetime >= f"{year}-01-01 00:00:00",
-            Energy.datetime <= f"{year}-12-31 23:59:59",
-        )
+        if app_settings.REPORT_SOURCE != "raw":
+            rollup = rollup_source()
+            statement = (
+                select(
+                    rollup.c.year,
+                    rollup_average().label("avg_monthly_consumption"),
+                )
+                .where(
+                    *rollup_years("energy", years),
+                    rollup_category_is(location),
+                )
+                .group_by(rollup.c.year)
+            )
+        else:
+            statement = (
+                select(
+                    row_year(Energy).label("year"),
+                    func.avg(Energy.quantity).label("avg_monthly_consumption"),
+                )
+                .where(Energy.location == location, in_years(Energy, years))
+                .group_by("year")
+            )
 
         try:
-            result = self.session.exec(statement).first()
+            result = self.session.exec(statement).fetchall()
         except Exception as err:
             logger.error(
                 f"Error while fetching consumed energy by year and energy type, error: {err}"
             )
             raise err
 
-        return result
+        response = dict.fromkeys(years)
+        for row in result:
+            response[row.year] = row.avg_monthly_consumption
+        return response
 
     @handle_database_error
-    def get_energy_sum_by_year(
-        self, year: int
-    ) -> Union[Optional[float], DatabaseError]:
+    def get_average_monthly_of_locations_by_year(
+        self, years: Iterable[int]
+    ) -> Union[list[Row], DatabaseError]:
         """
-        Get the total energy consumption for a year.
+        Get the average energy consumption of every location in each year,
+        overall and by month and energy category.
+
+        Both come from one scan through grouping sets, the rows of a
+        location overall have `month` and `energy_category` None. The
+        rollup does not hold energy categories, so the rows are read
+        whatever `REPORT_SOURCE` is, from the covering `datetime` index.
 
         Parameters
         ----------
-        `year` : int
-            The year to get the total energy consumption for
+        `years` : Iterable[int]
+            The years to get the averages for
 
         Returns
         -------
-        `Union[list[Energy], DatabaseError]`
-            A list of energys if found, otherwise an DatabaseError
+        `Union[list[Row], DatabaseError]`
+            Rows of `year`, `location`, `month`, `energy_category` and
+            `average`, otherwise an DatabaseError
         """
-        statement = select(
-            func.sum(Energy.quantity).label("total_consumption"),
-        ).where(
-            Energy.datetime >= f"{year}-01-01 00:00:00",
-            Energy.datetime <= f"{year}-12-31 23:59:59",
+        year = row_year(Energy)
+        month = cast(extract("month", Energy.datetime), Integer)
+        statement = (
+            select(
+                year.label("year"),
+                Energy.location,
+                month.label("month"),
+                Energy.energy_category,
+                func.avg(Energy.quantity).label("average"),
+            )
+            .where(in_years(Energy, years))
+            .group_by(
+                func.grouping_sets(
+                    tuple_(year, Energy.location),
+                    tuple_(
+                        year, Energy.location, month, Energy.energy_category
+                    ),
+                )
+            )
         )
 
         try:
-            result = self.session.exec(statement).first()
+            return self.session.exec(statement).all()
         except Exception as err:
             logger.error(
-                f"Error while fetching consumed energy by year and energy type, error: {err}"
+                f"Error while fetching average energy of locations, error: {err}"
             )
             raise err
-        return result
@@ -1,20 +1,42 @@
 # Python Imports
-from typing import Optional, Union
+from datetime import datetime as dt
+from itertools import groupby
+from typing import Iterable, Iterator, Optional, Union
 
 # Third Party Imports
 from fastapi import Depends
-from sqlalchemy import func
-from sqlmodel import Session, column, select
+from sqlalchemy import exc, func
+from sqlalchemy.engine import Row
+from sqlmodel import Session, select
 
 # Local Imports
 from app.core import get_logger
+from app.core.config import get_app_settings
 from app.definitions.general import EmissionType, FuelType
-from app.infrastructure import get_db_session
+from app.infrastructure import (
+    get_db_session,
+    in_years,
+    insert_rows,
+    month_extremes,
+    monthly_ranking,
+    percentage_by,
+    percentage_of_total,
+    report_view_version,
+    rollup_average,
+    rollup_category,
+    rollup_emission_type,
+    rollup_source,
+    rollup_version,
+    rollup_years,
+    row_year,
+)
 from app.models import Fuel
-from app.schemas.fuel_schema import FuelPercentageDB
+from app.schemas.fuel_schema import FuelFilterSchema, FuelPercentageDB
 from app.utils.errors import DatabaseError, handle_database_error
+from app.utils.pagination import paginate
 
 logger = get_logger(__name__)
+app_settings = get_app_settings()
 
 
 class FuelRepository:
@@ -22,7 +44,7 @@ class FuelRepository:
         self.session = session
 
     @handle_database_error
-    def get(self, id: str) -> Union[Fuel, DatabaseError]:
+    def get(self, id: int) -> Union[Fuel, DatabaseError]:
         """
         Get an Fuel by id.
 
@@ -44,9 +66,23 @@ class FuelRepository:
             raise err
 
     @handle_database_error
-    def get_all(self) -> Union[list[Fuel], DatabaseError]:
+    def get_all(
+        self,
+        filters: Optional[FuelFilterSchema] = None,
+        limit: Optional[int] = None,
+        after: Optional[tuple[dt, int]] = None,
+    ) -> Union[list[Fuel], DatabaseError]:
         """
-        Get all Fuels.
+        Get Fuels, ordered by `datetime` and `id`.
+
+        Parameters
+        ----------
+        `filters` : FuelFilterSchema, optional
+            Date range and enum filters
+        `limit` : int, optional
+            Maximum number of fuels to return
+        `after` : tuple[datetime, int], optional
+            Keyset `(datetime, id)` of the last fuel of the previous page
 
         Returns
         -------
@@ -54,12 +90,68 @@ class FuelRepository:
             A list of fuels if found, otherwise an DatabaseError
         """
         statement = select(Fuel)
+        if filters is not None:
+            statement = self._filter(statement, filters)
+        statement = paginate(statement, Fuel, limit, after)
         try:
             return self.session.exec(statement).fetchall()
         except Exception as err:
             logger.error(f"Error while fetching all Fuels, error: {err}")
             raise err
 
+    def _filter(self, statement, filters: FuelFilterSchema):
+        if filters.start_date is not None:
+            statement = statement.where(Fuel.datetime >= filters.start_date)
+        if filters.end_date is not None:
+            statement = statement.where(Fuel.datetime < filters.end_date)
+        if filters.fuel_type is not None:
+            statement = statement.where(Fuel.fuel_type == filters.fuel_type)
+        if filters.emission_type is not None:
+            statement = statement.where(
+                Fuel.emission_type == filters.emission_type
+            )
+        return statement
+
+    def stream_all(
+        self, filters: FuelFilterSchema, chunk_size: int
+    ) -> Iterator[list[Row]]:
+        """
+        Stream Fuels through a server-side cursor, `chunk_size` at a time.
+
+        Only one chunk is held in memory. `handle_database_error` would
+        only wrap the creation of the generator, so the errors raised while
+        iterating are converted here.
+
+        Parameters
+        ----------
+        `filters` : FuelFilterSchema
+            Date range and enum filters
+        `chunk_size` : int
+            Number of rows fetched from the cursor at a time
+
+        Yields
+        ------
+        `list[Row]`
+            Up to `chunk_size` fuel rows
+        """
+        statement = self._filter(Fuel.__table__.select(), filters)
+        result = None
+        try:
+            result = self.session.execute(
+                statement,
+                execution_options={
+                    "stream_results": True,
+                    "max_row_buffer": chunk_size,
+                },
+            )
+            yield from result.partitions(chunk_size)
+        except exc.SQLAlchemyError as err:
+            logger.error(f"Error while streaming Fuels, error: {err}")
+            raise DatabaseError(str(err), err)
+        finally:
+            if result is not None:
+                result.close()
+
     @handle_database_error
     def create(self, fuel: Fuel) -> Union[Fuel, DatabaseError]:
         """
@@ -111,6 +203,31 @@ class FuelRepository:
             self.session.rollback()
             raise err
 
+    @handle_database_error
+    def bulk_insert(self, rows: list[dict]) -> Union[int, DatabaseError]:
+        """
+        Insert validated fuel rows with `COPY`, skipping the ORM.
+
+        Parameters
+        ----------
+        `rows` : list[dict]
+            The Fuels to create, keyed by column name
+
+        Returns
+        -------
+        `Union[int, DatabaseError]`
+            The number of fuels inserted, otherwise an DatabaseError
+        """
+
+        try:
+            inserted = insert_rows(self.session, Fuel.__table__, rows)
+            self.session.commit()
+            return inserted
+        except Exception as err:
+            logger.error(f"Error while inserting Fuels, error: {err}")
+            self.session.rollback()
+            raise err
+
     @handle_database_error
     def update(self, fuel: Fuel) -> Union[Fuel, DatabaseError]:
         try:
@@ -134,33 +251,93 @@ class FuelRepository:
             self.session.rollback()
             raise err
 
+    @handle_database_error
+    def get_version(
+        self, years: Iterable[int]
+    ) -> Union[list[Row], DatabaseError]:
+        """
+        Get the row count and the last change of the Fuels of each year.
+
+        Together they change on every insert, update and delete in a
+        year. They are read from the rollup cells of the years, kept in
+        step with the rows, or from the `datetime` index alone when the
+        reports read the rows.
+
+        Parameters
+        ----------
+        `years` : Iterable[int]
+            The years to get the version of
+
+        Returns
+        -------
+        `Union[list[Row], DatabaseError]`
+            `(year, count, last_modified)` of each of `years` that has
+            Fuels, in order, with the checksum of the view cells before
+            `last_modified` when the reports read the view
+        """
+        try:
+            if app_settings.REPORT_SOURCE == "matview":
+                # The reports only change when the view is refreshed
+                statement = report_view_version("fuel", years)
+            elif app_settings.REPORT_SOURCE == "rollup":
+                statement = rollup_version("fuel", years)
+            else:
+                year = row_year(Fuel)
+                statement = (
+                    select(
+                        year.label("year"),
+                        func.count().label("count"),
+                        func.max(
+                            func.greatest(Fuel.created_at, Fuel.updated_at)
+                        ).label("last_modified"),
+                    )
+                    .where(in_years(Fuel, years))
+                    .group_by(year)
+                    .order_by(year)
+                )
+            return self.session.exec(statement).all()
+        except Exception as err:
+            logger.error(f"Error getting Fuel version, Error: {err}")
+            raise err
+
     @handle_database_error
     def get_consumed_fuel_percentage_by_year(
-        self, year: int
-    ) -> Union[int, DatabaseError]:
-        subquery = (
-            select(func.sum(Fuel.quantity).label("total"))
-            .where(
-                Fuel.datetime >= f"{year}-01-01 00:00:00",
-                Fuel.datetime <= f"{year}-12-31 23:59:59",
-            )
-            .subquery()
-        )
+        self, years: Iterable[int]
+    ) -> Union[dict[int, dict], DatabaseError]:
+        """
+        Get the share of each fuel type in the consumption of each year.
 
-        statement = (
-            select(
-                Fuel.fuel_type,
-                (func.sum(Fuel.quantity) * 100.0 / subquery.c.total).label(
-                    "percentage"
-                ),
+        Parameters
+        ----------
+        `years` : Iterable[int]
+            The years to get the shares of, computed in one scan
+
+        Returns
+        -------
+        `Union[dict[int, dict], DatabaseError]`
+            The share of each fuel type by year, every type at 0 for a year
+            without Fuels, otherwise an DatabaseError
+        """
+        if app_settings.REPORT_SOURCE != "raw":
+            rollup = rollup_source()
+            statement = (
+                select(
+                    rollup.c.year,
+                    rollup_category(FuelType).label("fuel_type"),
+                    percentage_of_total(rollup.c.sum, rollup.c.year).label(
+                        "percentage"
+                    ),
+                )
+                .where(*rollup_years("fuel", years))
+                .group_by(rollup.c.year, rollup.c.category)
             )
-            .join(subquery, True)
-            .where(
-                Fuel.datetime >= f"{year}-01-01 00:00:00",
-                Fuel.datetime <= f"{year}-12-31 23:59:59",
+        else:
+            statement = percentage_by(
+                Fuel.fuel_type,
+                Fuel.quantity,
+                in_years(Fuel, years),
+                year=row_year(Fuel),
             )
-            .group_by(Fuel.fuel_type, subquery.c.total)
-        )
 
         try:
             result: list[FuelPercentageDB] = self.session.exec(
@@ -172,64 +349,59 @@ class FuelRepository:
             )
             raise err
 
-        if not result:
-            return {
-                FuelType.COMBUSTIBLE_ADMINISTRATIVO: 0,
-                FuelType.COMBUSTIBLE_INDIRECTO_DE_PROVEEDOR: 0,
-                FuelType.COMBUSTIBLE_DE_LOGISTICA: 0,
-            }
-
-        response = {}
+        response = {year: {} for year in years}
         for row in result:
-            response[row.fuel_type] = round((row.percentage / 100), 2)
+            response[row.year][row.fuel_type] = round(
+                (row.percentage / 100), 2
+            )
+
+        for year, percentages in response.items():
+            if not percentages:
+                response[year] = {
+                    FuelType.COMBUSTIBLE_ADMINISTRATIVO: 0,
+                    FuelType.COMBUSTIBLE_INDIRECTO_DE_PROVEEDOR: 0,
+                    FuelType.COMBUSTIBLE_DE_LOGISTICA: 0,
+                }
 
         return response
 
     @handle_database_error
     def get_average_monthly_consumption(
-        self, year: int
-    ) -> Union[int, DatabaseError]:
-        statement = select(
-            func.avg(Fuel.quantity).label("avg_monthly_consumption"),
-        ).where(
-            Fuel.datetime >= f"{year}-01-01 00:00:00",
-            Fuel.datetime <= f"{year}-12-31 23:59:59",
-        )
-
-        try:
-            result = self.session.exec(statement).first()
-        except Exception as err:
-            logger.error(
-                f"Error while fetching consumed fuel by year and fuel type, error: {err}"
-            )
-            raise err
-        return result
+        self, years: Iterable[int]
+    ) -> Union[dict[int, Optional[float]], DatabaseError]:
+        """
+        Get the average Fuel quantity of each year.
 
-    @handle_database_error
-    def get_most_impactful_emission_type(self, year: int):
-        subquery = (
-            select(func.sum(Fuel.quantity).label("total"))
-            .where(
-                Fuel.datetime >= f"{year}-01-01 00:00:00",
-                Fuel.datetime <= f"{year}-12-31 23:59:59",
-            )
-            .subquery()
-        )
+        Parameters
+        ----------
+        `years` : Iterable[int]
+            The years to get the average of, computed in one scan
 
-        statement = (
-            select(
-                Fuel.emission_type,
-                (func.sum(Fuel.quantity) * 100.0 / subquery.c.total).label(
-                    "percentage"
-                ),
+        Returns
+        -------
+        `Union[dict[int, Optional[float]], DatabaseError]`
+            The average by year, None for a year without Fuels, otherwise
+            an DatabaseError
+        """
+        if app_settings.REPORT_SOURCE != "raw":
+            rollup = rollup_source()
+            statement = (
+                select(
+                    rollup.c.year,
+                    rollup_average().label("avg_monthly_consumption"),
+                )
+                .where(*rollup_years("fuel", years))
+                .group_by(rollup.c.year)
             )
-            .join(subquery, True)
-            .where(
-                Fuel.datetime >= f"{year}-01-01 00:00:00",
-                Fuel.datetime <= f"{year}-12-31 23:59:59",
+        else:
+            statement = (
+                select(
+                    row_year(Fuel).label("year"),
+                    func.avg(Fuel.quantity).label("avg_monthly_consumption"),
+                )
+                .where(in_years(Fuel, years))
+                .group_by("year")
             )
-            .group_by(Fuel.emission_type, subquery.c.total)
-        )
 
         try:
             result = self.session.exec(statement).fetchall()
@@ -239,92 +411,114 @@ class FuelRepository:
             )
             raise err
 
-        if not result:
-            return {
-                EmissionType.EMISIONES_DIRECTAS: 0,
-                EmissionType.EMISIONES_INDIRECTAS: 0,
-                EmissionType.OTRAS_EMISIONES_INDIRECTAS: 0,
-            }
-
-        response = {}
+        response = dict.fromkeys(years)
         for row in result:
-            response[row.emission_type] = round((row.percentage / 100), 2)
-
+            response[row.year] = row.avg_monthly_consumption
         return response
 
     @handle_database_error
-    def get_fuel_sum_by_year(
-        self, year: int
-    ) -> Union[Optional[float], DatabaseError]:
-        statement = select(
-            func.sum(Fuel.quantity).label("total"),
-        ).where(
-            Fuel.datetime >= f"{year}-01-01 00:00:00",
-            Fuel.datetime <= f"{year}-12-31 23:59:59",
-        )
-
-        try:
-            result = self.session.exec(statement).first()
-        except Exception as err:
-            logger.error(
-                f"Error while fetching consumed fuel by year and fuel type, error: {err}"
-            )
-            raise err
+    def get_most_impactful_emission_type(
+        self, years: Iterable[int]
+    ) -> Union[dict[int, dict], DatabaseError]:
+        """
+        Get the share of each emission type in the consumption of each
+        year.
 
-        return result
+        Parameters
+        ----------
+        `years` : Iterable[int]
+            The years to get the shares of, computed in one scan
 
-    @handle_database_error
-    def get_min_and_max_fuel_by_year(
-        self, year: int
-    ) -> Union[dict[str, float], DatabaseError]:
-        # Get the moth with the lowest consumption
-        lowest_fuel_month = (
-            select(
-                func.date_trunc("month", Fuel.datetime).label("month"),
-                func.sum(Fuel.quantity).label("total_quantity"),
+        Returns
+        -------
+        `Union[dict[int, dict], DatabaseError]`
+            The share of each emission type by year, every type at 0 for a
+            year without Fuels, otherwise an DatabaseError
+        """
+        if app_settings.REPORT_SOURCE != "raw":
+            rollup = rollup_source()
+            statement = (
+                select(
+                    rollup.c.year,
+                    rollup_emission_type(EmissionType).label("emission_type"),
+                    percentage_of_total(rollup.c.sum, rollup.c.year).label(
+                        "percentage"
+                    ),
+                )
+                .where(*rollup_years("fuel", years))
+                .group_by(rollup.c.year, rollup.c.emission_type)
             )
-            .where(
-                Fuel.datetime >= f"{year}-01-01 00:00:00",
-                Fuel.datetime <= f"{year}-12-31 23:59:59",
+        else:
+            statement = percentage_by(
+                Fuel.emission_type,
+                Fuel.quantity,
+                in_years(Fuel, years),
+                year=row_year(Fuel),
             )
-            .group_by("month")
-            .order_by(column("total_quantity"))
-            .limit(1)
-        )
 
         try:
-            lowest_result = self.session.exec(lowest_fuel_month).first()
+            result = self.session.exec(statement).fetchall()
         except Exception as err:
             logger.error(
                 f"Error while fetching consumed fuel by year and fuel type, error: {err}"
             )
             raise err
 
-        highest_fuel_month = (
-            select(
-                func.date_trunc("month", Fuel.datetime).label("month"),
-                func.sum(Fuel.quantity).label("total_quantity"),
-            )
-            .where(
-                Fuel.datetime >= f"{year}-01-01 00:00:00",
-                Fuel.datetime <= f"{year}-12-31 23:59:59",
+        response = {year: {} for year in years}
+        for row in result:
+            response[row.year][row.emission_type] = round(
+                (row.percentage / 100), 2
             )
-            .group_by("month")
-            .order_by(column("total_quantity").desc())
-            .limit(1)
-        )
 
+        for year, percentages in response.items():
+            if not percentages:
+                response[year] = {
+                    EmissionType.EMISIONES_DIRECTAS: 0,
+                    EmissionType.EMISIONES_INDIRECTAS: 0,
+                    EmissionType.OTRAS_EMISIONES_INDIRECTAS: 0,
+                }
+
+        return response
+
+    @handle_database_error
+    def get_min_and_max_fuel_by_year(
+        self, years: Iterable[int]
+    ) -> Union[dict[int, Optional[dict]], DatabaseError]:
+        """
+        Get the months of the lowest and highest consumption of each year
+
+        Parameters
+        ----------
+        `years` : Iterable[int]
+            The years to rank the months of, ranked in one scan
+
+        Returns
+        -------
+        `Union[dict[int, Optional[dict]], DatabaseError]`
+            The `lowest` and `highest` month names and the `ranking` of the
+            months by year, None for a year without Fuels, otherwise an
+            DatabaseError
+        """
         try:
-            highest_result = self.session.exec(highest_fuel_month).first()
+            ranking = self.session.exec(monthly_ranking(Fuel, years)).all()
         except Exception as err:
             logger.error(
                 f"Error while fetching consumed fuel by year and fuel type, error: {err}"
             )
             raise err
 
-        if not lowest_result or not highest_result:
-            return None
-        return {
-            "lowest": lowest_result.month.strftime("%B"),
-            "highest": highest_result.month.strftime("%B"),
-        }
+        response = dict.fromkeys(years)
+        for year, rows in groupby(ranking, lambda row: row.year):
+            rows = list(rows)
+            response[year] = {
+                **month_extremes(rows),
+                "ranking": [
+                    {
+                        "month": row.month.strftime("%B"),
+                        "total_quantity": row.total_quantity,
+                        "rank": row.rank,
+                    }
+                    for row in rows
+                ],
+            }
+        return response
@@ -1,19 +1,37 @@
 # Python Imports
-from typing import Union
+from datetime import datetime as dt
+from typing import Iterable, Iterator, Optional, Union
 
 # Third Party Imports
 from fastapi import Depends
-from sqlalchemy import func
+from sqlalchemy import exc, func
+from sqlalchemy.engine import Row
 from sqlmodel import Session, select
 
 # Local Imports
 from app.core import get_logger
+from app.core.config import get_app_settings
 from app.definitions import OilType
-from app.infrastructure import get_db_session
+from app.infrastructure import (
+    get_db_session,
+    in_years,
+    insert_rows,
+    monthly_series,
+    report_view_version,
+    rollup_category_is,
+    rollup_month,
+    rollup_source,
+    rollup_version,
+    rollup_years,
+    row_year,
+)
 from app.models import Oil
+from app.schemas.oil_schema import OilFilterSchema
 from app.utils.errors import DatabaseError, handle_database_error
+from app.utils.pagination import paginate
 
 logger = get_logger(__name__)
+app_settings = get_app_settings()
 
 
 class OilRepository:
@@ -21,7 +39,7 @@ class OilRepository:
         self.session = session
 
     @handle_database_error
-    def get(self, id: str) -> Union[Oil, DatabaseError]:
+    def get(self, id: int) -> Union[Oil, DatabaseError]:
         """
         Get an Oil by id.
 
@@ -43,9 +61,23 @@ class OilRepository:
             raise err
 
     @handle_database_error
-    def get_all(self) -> Union[list[Oil], DatabaseError]:
+    def get_all(
+        self,
+        filters: Optional[OilFilterSchema] = None,
+        limit: Optional[int] = None,
+        after: Optional[tuple[dt, int]] = None,
+    ) -> Union[list[Oil], DatabaseError]:
         """
-        Get all Oils.
+        Get Oils, ordered by `datetime` and `id`.
+
+        Parameters
+        ----------
+        `filters` : OilFilterSchema, optional
+            Date range and enum filters
+        `limit` : int, optional
+            Maximum number of oils to return
+        `after` : tuple[datetime, int], optional
+            Keyset `(datetime, id)` of the last oil of the previous page
 
         Returns
         -------
@@ -53,12 +85,68 @@ class OilRepository:
             A list of oils if found, otherwise an DatabaseError
         """
         statement = select(Oil)
+        if filters is not None:
+            statement = self._filter(statement, filters)
+        statement = paginate(statement, Oil, limit, after)
         try:
             return self.session.exec(statement).fetchall()
         except Exception as err:
             logger.error(f"Error while fetching all Oils, error: {err}")
             raise err
 
+    def _filter(self, statement, filters: OilFilterSchema):
+        if filters.start_date is not None:
+            statement = statement.where(Oil.datetime >= filters.start_date)
+        if filters.end_date is not None:
+            statement = statement.where(Oil.datetime < filters.end_date)
+        if filters.oil_type is not None:
+            statement = statement.where(Oil.oil_type == filters.oil_type)
+        if filters.emission_type is not None:
+            statement = statement.where(
+                Oil.emission_type == filters.emission_type
+            )
+        return statement
+
+    def stream_all(
+        self, filters: OilFilterSchema, chunk_size: int
+    ) -> Iterator[list[Row]]:
+        """
+        Stream Oils through a server-side cursor, `chunk_size` at a time.
+
+        Only one chunk is held in memory. `handle_database_error` would
+        only wrap the creation of the generator, so the errors raised while
+        iterating are converted here.
+
+        Parameters
+        ----------
+        `filters` : OilFilterSchema
+            Date range and enum filters
+        `chunk_size` : int
+            Number of rows fetched from the cursor at a time
+
+        Yields
+        ------
+        `list[Row]`
+            Up to `chunk_size` oil rows
+        """
+        statement = self._filter(Oil.__table__.select(), filters)
+        result = None
+        try:
+            result = self.session.execute(
+                statement,
+                execution_options={
+                    "stream_results": True,
+                    "max_row_buffer": chunk_size,
+                },
+            )
+            yield from result.partitions(chunk_size)
+        except exc.SQLAlchemyError as err:
+            logger.error(f"Error while streaming Oils, error: {err}")
+            raise DatabaseError(str(err), err)
+        finally:
+            if result is not None:
+                result.close()
+
     @handle_database_error
     def create(self, oil: Oil) -> Union[Oil, DatabaseError]:
         """
@@ -110,6 +198,31 @@ class OilRepository:
             self.session.rollback()
             raise err
 
+    @handle_database_error
+    def bulk_insert(self, rows: list[dict]) -> Union[int, DatabaseError]:
+        """
+        Insert validated oil rows with `COPY`, skipping the ORM.
+
+        Parameters
+        ----------
+        `rows` : list[dict]
+            The Oils to create, keyed by column name
+
+        Returns
+        -------
+        `Union[int, DatabaseError]`
+            The number of oils inserted, otherwise an DatabaseError
+        """
+
+        try:
+            inserted = insert_rows(self.session, Oil.__table__, rows)
+            self.session.commit()
+            return inserted
+        except Exception as err:
+            logger.error(f"Error while inserting Oils, error: {err}")
+            self.session.rollback()
+            raise err
+
     @handle_database_error
     def update(self, oil: Oil) -> Union[Oil, DatabaseError]:
         try:
@@ -134,144 +247,135 @@ class OilRepository:
             raise err
 
     @handle_database_error
-    def get_monthly_consumption_by_type_and_year(
-        self, year: int, oil_type: OilType
-    ) -> Union[int, DatabaseError]:
+    def get_version(
+        self, years: Iterable[int]
+    ) -> Union[list[Row], DatabaseError]:
         """
-        Get the monthly consumption of a oil type for a given year
+        Get the row count and the last change of the Oils of each year.
+
+        Together they change on every insert, update and delete in a
+        year. They are read from the rollup cells of the years, kept in
+        step with the rows, or from the `datetime` index alone when the
+        reports read the rows.
 
         Parameters
         ----------
-        `year` : int
-            The year to get the monthly consumption for
-        `oil_type` : OilType
-            The type of oil to get the monthly consumption for
+        `years` : Iterable[int]
+            The years to get the version of
 
         Returns
         -------
-        `Union[int, DatabaseError]`
-            The monthly consumption if found, otherwise an DatabaseError
+        `Union[list[Row], DatabaseError]`
+            `(year, count, last_modified)` of each of `years` that has
+            Oils, in order, with the checksum of the view cells before
+            `last_modified` when the reports read the view
         """
         try:
-            statement = (
-                select(
-                    func.date_trunc("month", Oil.datetime).label("month"),
-                    func.sum(Oil.quantity).label("quantity"),
-                )
-                .where(
-                    Oil.oil_type == oil_type,
-                    Oil.datetime >= f"{year}-01-01 00:00:00",
-                    Oil.datetime <= f"{year}-12-31 23:59:59",
+            if app_settings.REPORT_SOURCE == "matview":
+                # The reports only change when the view is refreshed
+                statement = report_view_version("oil", years)
+            elif app_settings.REPORT_SOURCE == "rollup":
+                statement = rollup_version("oil", years)
+            else:
+                year = row_year(Oil)
+                statement = (
+                    select(
+                        year.label("year"),
+                        func.count().label("count"),
+                        func.max(
+                            func.greatest(Oil.created_at, Oil.updated_at)
+                        ).label("last_modified"),
+                    )
+                    .where(in_years(Oil, years))
+                    .group_by(year)
+                    .order_by(year)
                 )
-                .group_by("month")
-                .order_by("month")
-            )
-            result = self.session.exec(statement).fetchall()
-            result = [dict(row) for row in result]
+            return self.session.exec(statement).all()
         except Exception as err:
-            logger.error(f"Error getting monthly consumption, Error: {err}")
+            logger.error(f"Error getting Oil version, Error: {err}")
             raise err
 
-        if not result:
-            return {str(i): 0 for i in range(1, 13)}
-
-        response = {}
-        for row in result:
-            response[int(row["month"].strftime("%m"))] = row["quantity"]
-
-        # Fill in missing months
-        for i in range(1, 13):
-            if i not in response:
-                response[i] = 0
-
-        return response
-
     @handle_database_error
-    def get_min_loss_by_type_and_year(
-        self, year: int, oil_type: OilType
-    ) -> Union[str, DatabaseError]:
+    def get_monthly_consumption_by_type_and_year(
+        self, years: Iterable[int], oil_type: OilType
+    ) -> Union[dict[int, list[float]], DatabaseError]:
         """
-        Get the minimum loss of a oil type for a given year
+        Get the monthly consumption of a oil type for the given years
 
         Parameters
         ----------
-        `year` : int
-            The year to get the minimum loss for
+        `years` : Iterable[int]
+            The years to get the monthly consumption for
         `oil_type` : OilType
-            The type of oil to get the minimum loss for
+            The type of oil to get the monthly consumption for
 
         Returns
         -------
-        `Union[str, DatabaseError]`
-            The minimum loss if found, otherwise an DatabaseError
+        `Union[dict[int, list[float]], DatabaseError]`
+            The consumption of each month by year, January first, otherwise
+            an DatabaseError
         """
         try:
-            statement = (
-                select(
-                    func.date_trunc("month", Oil.datetime).label("month"),
-                    func.min(Oil.quantity).label("quantity"),
-                )
-                .where(
-                    Oil.oil_type == oil_type,
-                    Oil.datetime >= f"{year}-01-01 00:00:00",
-                    Oil.datetime <= f"{year}-12-31 23:59:59",
-                )
-                .group_by("month")
-                .order_by("month")
-            )
-            result = self.session.exec(statement).first()
+            statement = monthly_series(Oil, years, category=oil_type)
+            return {
+                row.year: row.values
+                for row in self.session.exec(statement).all()
+            }
         except Exception as err:
-            logger.error(f"Error getting minimum loss, Error: {err}")
+            logger.error(f"Error getting monthly consumption, Error: {err}")
             raise err
 
-        if not result:
-            return None
-
-        return result.month.strftime("%B")
-
     @handle_database_error
-    def get_average_compsution_for_every_type(
-        self, year: int
-    ) -> Union[dict[str, int], DatabaseError]:
+    def get_min_loss_by_type_and_year(
+        self, years: Iterable[int], oil_type: OilType
+    ) -> Union[dict[int, Optional[str]], DatabaseError]:
         """
-        Get the average monthly consumption for every oil type for a given year
+        Get the minimum loss of a oil type for the given years
 
         Parameters
         ----------
-        `year` : int
-            The year to get the average monthly consumption for
+        `years` : Iterable[int]
+            The years to get the minimum loss for
+        `oil_type` : OilType
+            The type of oil to get the minimum loss for
 
         Returns
         -------
-        `Union[dict[str, int], DatabaseError]`
-            The average monthly consumption for every oil type if found, otherwise an DatabaseError
+        `Union[dict[int, Optional[str]], DatabaseError]`
+            The month of the minimum loss by year, None for a year without
+            Oils of the type, otherwise an DatabaseError
         """
-
-        statement = (
-            select(
-                Oil.oil_type,
-                func.avg(Oil.quantity).label("avg_monthly_consumption"),
-            ).where(
-                Oil.datetime >= f"{year}-01-01 00:00:00",
-                Oil.datetime <= f"{year}-12-31 23:59:59",
-            )
-        ).group_by(Oil.oil_type)
-
         try:
+            if app_settings.REPORT_SOURCE != "raw":
+                rollup = rollup_source()
+                statement = (
+                    select(
+                        rollup.c.year,
+                        func.min(rollup_month()).label("month"),
+                    )
+                    .where(
+                        *rollup_years("oil", years),
+                        rollup_category_is(oil_type),
+                    )
+                    .group_by(rollup.c.year)
+                )
+            else:
+                statement = (
+                    select(
+                        row_year(Oil).label("year"),
+                        func.min(func.date_trunc("month", Oil.datetime)).label(
+                            "month"
+                        ),
+                    )
+                    .where(Oil.oil_type == oil_type, in_years(Oil, years))
+                    .group_by("year")
+                )
             result = self.session.exec(statement).fetchall()
         except Exception as err:
-            logger.error(
-                f"Error while fetching consumed fuel by year and fuel type, error: {err}"
-            )
+            logger.error(f"Error getting minimum loss, Error: {err}")
             raise err
 
-        if not result:
-            return {
-                OilType.ACEITE: 0,
-                OilType.REFRIGERANTE: 0,
-            }
-
-        return {
-            row.oil_type: round(row.avg_monthly_consumption, 2)
-            for row in result
-        }
+        response = dict.fromkeys(years)
+        for row in result:
+            response[row.year] = row.month.strftime("%B")
+        return response
@@ -0,0 +1,310 @@
+# Python Imports
+from enum import Enum
+from typing import Any, Iterable, Optional, Type, Union
+
+# Third Party Imports
+from fastapi import Depends
+from sqlalchemy import case, func, null
+from sqlalchemy.engine import Row
+from sqlmodel import Session, select
+
+# Local Imports
+from app.core import get_logger
+from app.core.config import get_app_settings
+from app.definitions.general import EmissionType
+from app.infrastructure import (
+    get_db_session,
+    in_years,
+    report_view_version_columns,
+    rollup_source,
+    rollup_version_columns,
+    row_year,
+)
+from app.models import emission, report_view
+from app.utils.errors import DatabaseError, handle_database_error
+
+logger = get_logger(__name__)
+app_settings = get_app_settings()
+
+
+def _source():
+    # The rollup keeps the same columns as the view, a cell for each month
+    if app_settings.REPORT_SOURCE != "raw":
+        rollup = rollup_source()
+        return rollup, rollup.c.year, rollup.c.sum, rollup.c.count
+    return emission, row_year(emission.c), emission.c.quantity, None
+
+
+def _criteria(domains: Iterable[str], years: Iterable[int]) -> list:
+    if app_settings.REPORT_SOURCE != "raw":
+        rollup = rollup_source()
+        return [
+            rollup.c.domain.in_(sorted(set(domains))),
+            rollup.c.year.in_(sorted(set(years))),
+        ]
+    return [
+        emission.c.domain.in_(sorted(set(domains))),
+        in_years(emission.c, years),
+    ]
+
+
+class ReportRepository:
+    """
+    Reports across domains, read from the `emission` view or the rollup in
+    one grouped query instead of one query per domain repository.
+    """
+
+    def __init__(self, session: Session = Depends(get_db_session)):
+        self.session = session
+
+    @handle_database_error
+    def get_version(
+        self, domains: Iterable[str], years: Iterable[int]
+    ) -> Union[list[Row], DatabaseError]:
+        """
+        Get the row count and the last change of each domain in each year.
+
+        Parameters
+        ----------
+        `domains` : Iterable[str]
+            The domains to get the version of
+        `years` : Iterable[int]
+            The years to get the version of
+
+        Returns
+        -------
+        `Union[list[Row], DatabaseError]`
+            `(domain, year, count, last_modified)` of each domain and year
+            that has rows, in order, with the checksum of the view cells
+            before `last_modified` when the reports read the view
+        """
+        if app_settings.REPORT_SOURCE == "matview":
+            # The reports only change when the view is refreshed
+            statement = (
+                select(
+                    report_view.c.domain,
+                    report_view.c.year,
+                    *report_view_version_columns(),
+                )
+                .where(
+                    report_view.c.domain.in_(sorted(set(domains))),
+                    report_view.c.year.in_(sorted(set(years))),
+                )
+                .group_by(report_view.c.domain, report_view.c.year)
+                .order_by(report_view.c.domain, report_view.c.year)
+            )
+        elif app_settings.REPORT_SOURCE == "rollup":
+            # The cells change with the rows, the rows are not read
+            rollup = rollup_source()
+            statement = (
+                select(
+                    rollup.c.domain,
+                    rollup.c.year,
+                    *rollup_version_columns(),
+                )
+                .where(*_criteria(domains, years))
+                .group_by(rollup.c.domain, rollup.c.year)
+                .order_by(rollup.c.domain, rollup.c.year)
+            )
+        else:
+            year = row_year(emission.c)
+            statement = (
+                select(
+                    emission.c.domain,
+                    year.label("year"),
+                    func.count().label("count"),
+                    func.max(
+                        func.greatest(
+                            emission.c.created_at, emission.c.updated_at
+                        )
+                    ).label("last_modified"),
+                )
+                .where(
+                    emission.c.domain.in_(sorted(set(domains))),
+                    in_years(emission.c, years),
+                )
+                .group_by(emission.c.domain, year)
+                .order_by(emission.c.domain, year)
+            )
+
+        try:
+            return self.session.exec(statement).all()
+        except Exception as err:
+            logger.error(f"Error getting report version, Error: {err}")
+            raise err
+
+    @handle_database_error
+    def get_sum_by_domain(
+        self, domains: Iterable[str], years: Iterable[int]
+    ) -> Union[dict[int, dict[str, Optional[float]]], DatabaseError]:
+        """
+        Get the total quantity of each domain in each year.
+
+        Parameters
+        ----------
+        `domains` : Iterable[str]
+            The domains to get the total of
+        `years` : Iterable[int]
+            The years to get the total of
+
+        Returns
+        -------
+        `Union[dict[int, dict[str, Optional[float]]], DatabaseError]`
+            The total of every domain by year, None for a domain without
+            rows in the year, otherwise an DatabaseError
+        """
+        source, year, quantity, _ = _source()
+        statement = (
+            select(
+                year.label("year"),
+                source.c.domain,
+                func.sum(quantity).label("total"),
+            )
+            .where(*_criteria(domains, years))
+            .group_by(year, source.c.domain)
+        )
+
+        try:
+            result = self.session.exec(statement).fetchall()
+        except Exception as err:
+            logger.error(
+                f"Error while fetching the total by domain, error: {err}"
+            )
+            raise err
+
+        response = {year: dict.fromkeys(domains) for year in years}
+        for row in result:
+            response[row.year][row.domain] = row.total
+        return response
+
+    @handle_database_error
+    def get_average_by_domain(
+        self,
+        domains: dict[str, Optional[Type[Enum]]],
+        years: Iterable[int],
+    ) -> Union[dict[int, dict[str, Any]], DatabaseError]:
+        """
+        Get the average quantity of each domain in each year.
+
+        Parameters
+        ----------
+        `domains` : dict[str, Optional[Type[Enum]]]
+            The domains to get the average of, with the enum of the category
+            to break the average of the domain down by, or None
+        `years` : Iterable[int]
+            The years to get the average of
+
+        Returns
+        -------
+        `Union[dict[int, dict[str, Any]], DatabaseError]`
+            The average of every domain by year, None for a domain without
+            rows in the year, or the average of each of its categories,
+            otherwise an DatabaseError
+        """
+        source, year, quantity, count = _source()
+        by_category = sorted(
+            domain for domain, enum in domains.items() if enum is not None
+        )
+        category = (
+            case(
+                (source.c.domain.in_(by_category), source.c.category),
+                else_=null(),
+            )
+            if by_category
+            else null()
+        ).label("category")
+        average = (
+            func.avg(quantity)
+            if count is None
+            else func.sum(quantity) / func.sum(count)
+        )
+        statement = (
+            select(
+                year.label("year"),
+                source.c.domain,
+                category,
+                average.label("average"),
+            )
+            .where(*_criteria(domains, years))
+            .group_by(year, source.c.domain, category)
+        )
+
+        try:
+            result = self.session.exec(statement).fetchall()
+        except Exception as err:
+            logger.error(
+                f"Error while fetching the average by domain, error: {err}"
+            )
+            raise err
+
+        response = {
+            year: {
+                domain: None if enum is None else {}
+                for domain, enum in domains.items()
+            }
+            for year in years
+        }
+        for row in result:
+            enum = domains[row.domain]
+            if enum is None:
+                response[row.year][row.domain] = row.average
+            elif row.category:
+                response[row.year][row.domain][
+                    enum[row.category]
+                ] = row.average
+        return response
+
+    @handle_database_error
+    def get_sum_by_emission_type(
+        self, domains: Iterable[str], years: Iterable[int]
+    ) -> Union[dict[int, dict[EmissionType, dict[str, float]]], DatabaseError]:
+        """
+        Get the total quantity of each domain by emission type in each
+        year.
+
+        Parameters
+        ----------
+        `domains` : Iterable[str]
+            The domains to get the totals of
+        `years` : Iterable[int]
+            The years to get the totals of
+
+        Returns
+        -------
+        `Union[dict[int, dict[EmissionType, dict[str, float]]], DatabaseError]`
+            The total of every domain by emission type and year, 0 without
+            rows, otherwise an DatabaseError
+        """
+        source, year, quantity, _ = _source()
+        statement = (
+            select(
+                year.label("year"),
+                source.c.emission_type,
+                source.c.domain,
+                func.sum(quantity).label("total"),
+            )
+            .where(*_criteria(domains, years))
+            .group_by(year, source.c.emission_type, source.c.domain)
+        )
+
+        try:
+            result = self.session.exec(statement).fetchall()
+        except Exception as err:
+            logger.error(
+                f"Error while fetching the total by emission type, error: {err}"
+            )
+            raise err
+
+        response = {
+            year: {
+                emission_type: dict.fromkeys(domains, 0)
+                for emission_type in EmissionType
+            }
+            for year in years
+        }
+        for row in result:
+            # A row without emission type has no total to be part of
+            if row.emission_type:
+                emission_type = EmissionType[row.emission_type]
+                response[row.year][emission_type][row.domain] = row.total
+        return response
@@ -1,20 +1,38 @@
 # Python Imports
-from typing import Union
+from datetime import datetime as dt
+from typing import Iterable, Iterator, Optional, Union
 
 # Third Party Imports
 from fastapi import Depends
-from sqlalchemy import func
+from sqlalchemy import BigInteger, cast, exc, func
+from sqlalchemy.engine import Row
 from sqlmodel import Session, select
 
 # Local Imports
 from app.core import get_logger
+from app.core.config import get_app_settings
 from app.definitions import RoadtripGroupType
-from app.infrastructure import get_db_session
+from app.infrastructure import (
+    get_db_session,
+    in_years,
+    insert_rows,
+    report_view_version,
+    rollup_category,
+    rollup_source,
+    rollup_version,
+    rollup_years,
+    row_year,
+)
 from app.models import Roadtrip
-from app.schemas.roadtrip_schema import RoadtripPercentageDB
+from app.schemas.roadtrip_schema import (
+    RoadtripFilterSchema,
+    RoadtripPercentageDB,
+)
 from app.utils.errors import DatabaseError, handle_database_error
+from app.utils.pagination import paginate
 
 logger = get_logger(__name__)
+app_settings = get_app_settings()
 
 
 class RoadtripRepository:
@@ -22,7 +40,7 @@ class RoadtripRepository:
         self.session = session
 
     @handle_database_error
-    def get(self, id: str) -> Union[Roadtrip, DatabaseError]:
+    def get(self, id: int) -> Union[Roadtrip, DatabaseError]:
         """
         Get an Roadtrip by id.
 
@@ -44,9 +62,23 @@ class RoadtripRepository:
             raise err
 
     @handle_database_error
-    def get_all(self) -> Union[list[Roadtrip], DatabaseError]:
+    def get_all(
+        self,
+        filters: Optional[RoadtripFilterSchema] = None,
+        limit: Optional[int] = None,
+        after: Optional[tuple[dt, int]] = None,
+    ) -> Union[list[Roadtrip], DatabaseError]:
         """
-        Get all Roadtrips.
+        Get Roadtrips, ordered by `datetime` and `id`.
+
+        Parameters
+        ----------
+        `filters` : RoadtripFilterSchema, optional
+            Date range and enum filters
+        `limit` : int, optional
+            Maximum number of roadtrips to return
+        `after` : tuple[datetime, int], optional
+            Keyset `(datetime, id)` of the last roadtrip of the previous page
 
         Returns
         -------
@@ -54,12 +86,70 @@ class RoadtripRepository:
             A list of roadtrips if found, otherwise an DatabaseError
         """
         statement = select(Roadtrip)
+        if filters is not None:
+            statement = self._filter(statement, filters)
+        statement = paginate(statement, Roadtrip, limit, after)
         try:
             return self.session.exec(statement).fetchall()
         except Exception as err:
             logger.error(f"Error while fetching all Roadtrips, error: {err}")
             raise err
 
+    def _filter(self, statement, filters: RoadtripFilterSchema):
+        if filters.start_date is not None:
+            statement = statement.where(
+                Roadtrip.datetime >= filters.start_date
+            )
+        if filters.end_date is not None:
+            statement = statement.where(Roadtrip.datetime < filters.end_date)
+        if filters.group is not None:
+            statement = statement.where(Roadtrip.group == filters.group)
+        if filters.emission_type is not None:
+            statement = statement.where(
+                Roadtrip.emission_type == filters.emission_type
+            )
+        return statement
+
+    def stream_all(
+        self, filters: RoadtripFilterSchema, chunk_size: int
+    ) -> Iterator[list[Row]]:
+        """
+        Stream Roadtrips through a server-side cursor, `chunk_size` at a time.
+
+        Only one chunk is held in memory. `handle_database_error` would
+        only wrap the creation of the generator, so the errors raised while
+        iterating are converted here.
+
+        Parameters
+        ----------
+        `filters` : RoadtripFilterSchema
+            Date range and enum filters
+        `chunk_size` : int
+            Number of rows fetched from the cursor at a time
+
+        Yields
+        ------
+        `list[Row]`
+            Up to `chunk_size` roadtrip rows
+        """
+        statement = self._filter(Roadtrip.__table__.select(), filters)
+        result = None
+        try:
+            result = self.session.execute(
+                statement,
+                execution_options={
+                    "stream_results": True,
+                    "max_row_buffer": chunk_size,
+                },
+            )
+            yield from result.partitions(chunk_size)
+        except exc.SQLAlchemyError as err:
+            logger.error(f"Error while streaming Roadtrips, error: {err}")
+            raise DatabaseError(str(err), err)
+        finally:
+            if result is not None:
+                result.close()
+
     @handle_database_error
     def create(self, roadtrip: Roadtrip) -> Union[Roadtrip, DatabaseError]:
         """
@@ -113,6 +203,31 @@ class RoadtripRepository:
             self.session.rollback()
             raise err
 
+    @handle_database_error
+    def bulk_insert(self, rows: list[dict]) -> Union[int, DatabaseError]:
+        """
+        Insert validated roadtrip rows with `COPY`, skipping the ORM.
+
+        Parameters
+        ----------
+        `rows` : list[dict]
+            The Roadtrips to create, keyed by column name
+
+        Returns
+        -------
+        `Union[int, DatabaseError]`
+            The number of roadtrips inserted, otherwise an DatabaseError
+        """
+
+        try:
+            inserted = insert_rows(self.session, Roadtrip.__table__, rows)
+            self.session.commit()
+            return inserted
+        except Exception as err:
+            logger.error(f"Error while inserting Roadtrips, error: {err}")
+            self.session.rollback()
+            raise err
+
     @handle_database_error
     def update(self, roadtrip: Roadtrip) -> Union[Roadtrip, DatabaseError]:
         try:
@@ -136,31 +251,102 @@ class RoadtripRepository:
             self.session.rollback()
             raise err
 
+    @handle_database_error
+    def get_version(
+        self, years: Iterable[int]
+    ) -> Union[list[Row], DatabaseError]:
+        """
+        Get the row count and the last change of the Roadtrips of each year.
+
+        Together they change on every insert, update and delete in a
+        year. They are read from the rollup cells of the years, kept in
+        step with the rows, or from the `datetime` index alone when the
+        reports read the rows.
+
+        Parameters
+        ----------
+        `years` : Iterable[int]
+            The years to get the version of
+
+        Returns
+        -------
+        `Union[list[Row], DatabaseError]`
+            `(year, count, last_modified)` of each of `years` that has
+            Roadtrips, in order, with the checksum of the view cells before
+            `last_modified` when the reports read the view
+        """
+        try:
+            if app_settings.REPORT_SOURCE == "matview":
+                # The reports only change when the view is refreshed
+                statement = report_view_version("roadtrip", years)
+            elif app_settings.REPORT_SOURCE == "rollup":
+                statement = rollup_version("roadtrip", years)
+            else:
+                year = row_year(Roadtrip)
+                statement = (
+                    select(
+                        year.label("year"),
+                        func.count().label("count"),
+                        func.max(
+                            func.greatest(
+                                Roadtrip.created_at, Roadtrip.updated_at
+                            )
+                        ).label("last_modified"),
+                    )
+                    .where(in_years(Roadtrip, years))
+                    .group_by(year)
+                    .order_by(year)
+                )
+            return self.session.exec(statement).all()
+        except Exception as err:
+            logger.error(f"Error getting Roadtrip version, Error: {err}")
+            raise err
+
     @handle_database_error
     def get_average_monthly_comparative_percentage(
-        self, year: int
-    ) -> Union[float, DatabaseError]:
+        self, years: Iterable[int]
+    ) -> Union[dict[int, dict], DatabaseError]:
         """
-        Get the average monthly comparative percentage for a location
+        Get the average monthly comparative percentage of every group for
+        each year
 
         Parameters
         ----------
-        `location` : str
-            The location to get the average monthly comparative percentage for
+        `years` : Iterable[int]
+            The years to get the average monthly comparative percentage for
 
         Returns
         -------
-        `Union[float, DatabaseError]`
-            The average monthly comparative percentage if successful, otherwise an DatabaseError
+        `Union[dict[int, dict], DatabaseError]`
+            The average monthly comparative percentage of every group by
+            year, every group at 0 for a year without roadtrips, otherwise
+            an DatabaseError
         """
-        statement = (
-            select(
-                Roadtrip.group, (func.sum(Roadtrip.quantity) / 12).label("sum")
+        if app_settings.REPORT_SOURCE != "raw":
+            rollup = rollup_source()
+            statement = (
+                select(
+                    rollup.c.year,
+                    rollup_category(RoadtripGroupType).label("group"),
+                    # Integer quantities, divided like the raw `sum`
+                    (cast(func.sum(rollup.c.sum), BigInteger) / 12).label(
+                        "sum"
+                    ),
+                )
+                .where(*rollup_years("roadtrip", years))
+                .group_by(rollup.c.year, rollup.c.category)
+            )
+        else:
+            year = row_year(Roadtrip)
+            statement = (
+                select(
+                    year.label("year"),
+                    Roadtrip.group,
+                    (func.sum(Roadtrip.quantity) / 12).label("sum"),
+                )
+                .where(in_years(Roadtrip, years))
+                .group_by(year, Roadtrip.group)
             )
-            .where(Roadtrip.datetime >= f"{year}-01-01")
-            .where(Roadtrip.datetime <= f"{year}-12-31")
-            .group_by(Roadtrip.group)
-        )
 
         try:
             result: list[RoadtripPercentageDB] = self.session.exec(
@@ -172,14 +358,15 @@ class RoadtripRepository:
             )
             raise err
 
-        if not result:
-            return {
-                RoadtripGroupType.EQUIPO_ADMINISTRATIVO: 0,
-                RoadtripGroupType.EQUIPO_DE_VENTAS: 0,
-            }
-
-        response = {}
+        response = {year: {} for year in years}
         for row in result:
-            response[row.group] = row.sum
+            response[row.year][row.group] = row.sum
+
+        for year, sums in response.items():
+            if not sums:
+                response[year] = {
+                    RoadtripGroupType.EQUIPO_ADMINISTRATIVO: 0,
+                    RoadtripGroupType.EQUIPO_DE_VENTAS: 0,
+                }
 
         return response
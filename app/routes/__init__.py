@@ -1,7 +1,10 @@
 from fastapi import APIRouter
 
+from .batch_routes import batch_router
+from .closed_period_routes import closed_period_router
 from .energy_routes import energy_router
 from .fuel_routes import fuel_router
+from .internal_routes import internal_router
 from .oil_routes import oil_router
 from .report_routes import report_router
 from .roadtrip_routes import roadtrip_router
@@ -14,3 +17,10 @@ api_router.include_router(
     roadtrip_router, prefix="/roadtrip", tags=["roadtrip"]
 )
 api_router.include_router(report_router, tags=["report"])
+api_router.include_router(batch_router, prefix="/reports", tags=["report"])
+api_router.include_router(
+    closed_period_router, prefix="/closed_years", tags=["closed_years"]
+)
+api_router.include_router(
+    internal_router, prefix="/internal", tags=["internal"]
+)
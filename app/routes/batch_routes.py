@@ -0,0 +1,226 @@
+# isort: skip_file
+import inspect
+import json
+from typing import Any, Awaitable, Callable
+
+import orjson
+from fastapi import APIRouter, Body, Depends, HTTPException, Request, Response
+from fastapi.responses import ORJSONResponse
+from pydantic import ValidationError, parse_obj_as
+from sqlalchemy.exc import SQLAlchemyError
+from sqlmodel import Session
+
+from app.core import get_logger
+from app.infrastructure import get_db_session, run_in_session
+from app.schemas import BatchReportSchema
+from app.services import (
+    EnergyService,
+    FuelService,
+    OilService,
+    ReportService,
+    RoadtripService,
+)
+from app.services.closed_period import ClosedPeriodService
+from app.utils.conditional import REQUEST_PARAMETER
+from app.utils.errors import DatabaseError
+from app.utils.years import report_years
+
+from . import (
+    energy_routes,
+    fuel_routes,
+    oil_routes,
+    report_routes,
+    roadtrip_routes,
+)
+
+
+logger = get_logger(__name__)
+batch_router = APIRouter()
+
+MAX_BATCH_REPORTS = 50
+YEAR_PARAMETERS = inspect.signature(report_years).parameters
+
+# The report routes a batch can run, by their path under `/api`
+REPORTS: dict[str, Callable[..., Awaitable[Response]]] = {
+    "fuel/consumo_anual_por_categoria": (
+        fuel_routes.consumo_anual_por_categoria
+    ),
+    "fuel/consumo_promedio_mensual": fuel_routes.consumo_promedio_mensual,
+    "fuel/porcentaje_por_segmento_anual": (
+        fuel_routes.porcentaje_por_segmento_anual
+    ),
+    "fuel/min_max_consumo_meses": fuel_routes.min_max_consumo_meses,
+    "oil/consumo_mensual_aceite": oil_routes.consumo_mensual_aceite,
+    "oil/mes_menos_perdida_refrigerante": (
+        oil_routes.mes_menos_perdida_refrigerante
+    ),
+    "energy/consumo_promedio_mensual": energy_routes.consumo_promedio_mensual,
+    "energy/consumo_promedio_mensual_por_ubicacion": (
+        energy_routes.consumo_promedio_mensual_por_ubicacion
+    ),
+    "roadtrip/comparativa_promedio_mensual": (
+        roadtrip_routes.comparativa_promedio_mensual
+    ),
+    "comparativa_energia_combustible": (
+        report_routes.comparativa_energia_combustible
+    ),
+    "promedio_mensual_petroleo": report_routes.promedio_mensual_petroleo,
+    "consumo_por_tipo_de_emision": report_routes.consumo_por_tipo_de_emision,
+}
+
+
+class _SharedVersions:
+    """
+    A report service whose versions are read once per batch, every report
+    of the service over the same years shares them.
+    """
+
+    def __init__(self, service: Any):
+        self._service = service
+        self._versions: dict[tuple, Any] = {}
+
+    def __getattr__(self, name: str) -> Any:
+        return getattr(self._service, name)
+
+    async def get_report_version(
+        self, years: tuple[int, ...], *domains: str
+    ) -> Any:
+        key = (years, domains)
+        if key not in self._versions:
+            self._versions[key] = await self._service.get_report_version(
+                years, *domains
+            )
+        return self._versions[key]
+
+
+def _error(status_code: int, detail: Any) -> dict[str, Any]:
+    return {"status_code": status_code, "detail": detail}
+
+
+def _report_kwargs(
+    route: Callable[..., Awaitable[Response]],
+    params: dict[str, Any],
+    services: dict[type, Any],
+) -> dict[str, Any]:
+    """
+    The arguments of a report route, as FastAPI would have resolved them.
+
+    Raises
+    ------
+    `HTTPException`
+        400 if `params` does not fit the route
+    `ValidationError`
+        If a parameter does not have the type of the route's
+    """
+    params = dict(params)
+    # The route's own years dependency, some have their own first year
+    read_years = inspect.signature(route).parameters["years"].default
+    kwargs: dict[str, Any] = {
+        "years": read_years.dependency(
+            **{
+                name: parse_obj_as(
+                    parameter.annotation, params.pop(name, None)
+                )
+                for name, parameter in YEAR_PARAMETERS.items()
+            }
+        )
+    }
+    for name, parameter in inspect.signature(route).parameters.items():
+        if name in kwargs or name == REQUEST_PARAMETER:
+            continue
+        if parameter.annotation in services:
+            kwargs[name] = services[parameter.annotation]
+        elif name in params:
+            kwargs[name] = parse_obj_as(parameter.annotation, params.pop(name))
+    if params:
+        raise HTTPException(
+            status_code=400,
+            detail=f"Unknown parameters: {', '.join(sorted(params))}",
+        )
+    # No validators, a report of the batch is never answered with 304
+    kwargs[REQUEST_PARAMETER] = Request({"type": "http", "headers": []})
+    return kwargs
+
+
+async def _run_report(
+    item: BatchReportSchema, services: dict[type, Any], session: Session
+) -> dict[str, Any]:
+    route = REPORTS.get(item.report.strip("/"))
+    if route is None:
+        return _error(404, f"Unknown report: {item.report}")
+
+    try:
+        response = await route(**_report_kwargs(route, item.params, services))
+    except HTTPException as err:
+        return _error(err.status_code, err.detail)
+    except ValidationError as err:
+        return _error(422, err.errors())
+    except (DatabaseError, SQLAlchemyError) as err:
+        logger.error(f"DB Error while running report {item.report}: {err}")
+        # The reports after it share the session, it has to be usable again
+        await run_in_session(session.rollback)
+        return _error(500, f"Error while running report {item.report}")
+
+    return {
+        "status_code": response.status_code,
+        "data": orjson.loads(response.body)["data"],
+    }
+
+
+@batch_router.post("/batch")
+async def run_report_batch(
+    reports: list[BatchReportSchema] = Body(..., max_items=MAX_BATCH_REPORTS),
+    fuel_service: FuelService = Depends(),
+    oil_service: OilService = Depends(),
+    energy_service: EnergyService = Depends(),
+    roadtrip_service: RoadtripService = Depends(),
+    report_service: ReportService = Depends(),
+    closed_period_service: ClosedPeriodService = Depends(),
+    session: Session = Depends(get_db_session),
+) -> Response:
+    """
+    Run many reports in one request.
+
+    Every report goes through its route, so it is validated, cached and
+    stored for closed years exactly as when requested on its own. The
+    services, and so the database session and its connection, are the ones
+    of the batch; only a report another request is already running is
+    awaited on that request's session instead. A session runs one statement
+    at a time, so the reports run one after the other on it, not
+    concurrently; a report asked for twice runs once and the versions of a
+    service's years are read once. A report failing on the database is
+    answered with a 500 of its own, the session is rolled back for the
+    reports after it.
+
+    Returns
+    -------
+    `Response`
+        `{"data": [...]}`, for every report in order its `status_code` and
+        its `data`, or the `detail` of its error
+    """
+    services: dict[type, Any] = {
+        type(service): _SharedVersions(service)
+        for service in (
+            fuel_service,
+            oil_service,
+            energy_service,
+            roadtrip_service,
+            report_service,
+        )
+    }
+    services[ClosedPeriodService] = closed_period_service
+
+    results: dict[str, dict[str, Any]] = {}
+    for item in reports:
+        key = json.dumps([item.report, item.params], sort_keys=True)
+        if key not in results:
+            results[key] = await _run_report(item, services, session)
+
+    return ORJSONResponse(
+        content={
+            "data": [
+                results[json.dumps([item.report, item.params], sort_keys=True)]
+                for item in reports
+            ]
+        }
+    )
@@ -0,0 +1,49 @@
+# isort: skip_file
+from fastapi import APIRouter, Depends, HTTPException, Response, status
+from fastapi.responses import ORJSONResponse
+
+from app.core import get_logger
+from app.services import ClosedPeriodService
+from app.utils.admin import require_admin
+from app.utils.errors import AppError
+
+
+logger = get_logger(__name__)
+closed_period_router = APIRouter()
+
+
+@closed_period_router.get("/")
+async def list_closed_years(
+    closed_period_service: ClosedPeriodService = Depends(),
+) -> Response:
+    result = await closed_period_service.get_closed_years()
+    if isinstance(result, AppError):
+        raise HTTPException(
+            status_code=result.error_type,
+            detail=result.message,
+        )
+
+    return ORJSONResponse(content={"data": result})
+
+
+@closed_period_router.post("/{year}", dependencies=[Depends(require_admin)])
+async def close_year(
+    year: int,
+    confirm: int,
+    closed_period_service: ClosedPeriodService = Depends(),
+) -> Response:
+    # Closed years never reopen, the year has to be given twice
+    if confirm != year:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"Closing a year is permanent, confirm with confirm={year}",
+        )
+
+    result = await closed_period_service.close_year(year)
+    if isinstance(result, AppError):
+        raise HTTPException(
+            status_code=result.error_type,
+            detail=result.message,
+        )
+
+    return ORJSONResponse(content={"data": result})
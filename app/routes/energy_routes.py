@@ -1,19 +1,34 @@
 # isort: skip_file
-import json
-from typing import Union
-from datetime import datetime as dt
-
-from fastapi import APIRouter, Depends, HTTPException, Response, status
+from typing import Optional, Union
+
+from fastapi import (
+    APIRouter,
+    Depends,
+    HTTPException,
+    Query,
+    Request,
+    Response,
+    status,
+)
+from fastapi.responses import ORJSONResponse, StreamingResponse
 
 from app.core import get_logger
+from app.infrastructure import shared_report
 from app.definitions.general import EnergyLocation
 from app.models import Energy
 from app.schemas.energy_schema import (
     EnergyCreateSchema,
+    EnergyFilterSchema,
     EnergyUpdateSchema,
 )
 from app.services.energy import EnergyService
+from app.services.closed_period import closed_report
+from app.utils.conditional import conditional_report
 from app.utils.errors import AppError
+from app.utils.export import models_to_json
+from app.utils.pagination import DEFAULT_PAGE_SIZE, MAX_PAGE_SIZE
+from app.utils.upload import read_records
+from app.utils.years import ReportYears, report_years
 
 
 logger = get_logger(__name__)
@@ -22,56 +37,83 @@ energy_router = APIRouter()
 
 @energy_router.get("/", response_model=list[Energy])
 async def list_energies(
+    filters: EnergyFilterSchema = Depends(),
+    limit: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE),
+    cursor: Optional[str] = None,
     energy_service: EnergyService = Depends(),
-) -> list[Energy]:
-    result = energy_service.get_all()
+) -> Response:
+    result = await energy_service.get_all(filters, limit, cursor)
     if isinstance(result, AppError):
         raise HTTPException(
             status_code=result.error_type,
             detail=result.message,
         )
-    return result
+
+    energys, next_page = result
+    headers = {} if next_page is None else {"X-Next-Cursor": next_page}
+    # Serialized straight from the rows, they need no validation
+    return Response(
+        content=models_to_json(energys),
+        media_type="application/json",
+        headers=headers,
+    )
+
+
+@energy_router.get("/export")
+async def export_energys(
+    filters: EnergyFilterSchema = Depends(),
+    energy_service: EnergyService = Depends(),
+) -> StreamingResponse:
+    return StreamingResponse(
+        energy_service.export(filters), media_type="application/x-ndjson"
+    )
 
 
 @energy_router.get("/consumo_promedio_mensual")
+@closed_report
+@conditional_report("energy_service")
+@shared_report("energy")
 async def consumo_promedio_mensual(
-    year: int,
+    years: ReportYears = Depends(report_years),
     location: Union[EnergyLocation, None] = EnergyLocation.PLANTA_DE_ENVASADO,
     energy_service: EnergyService = Depends(),
 ) -> Response:
-    if year is None:
+    result = await energy_service.get_average_monthly_by_location_and_year(
+        years.years, location
+    )
+    if isinstance(result, AppError):
         raise HTTPException(
-            status_code=status.HTTP_400_BAD_REQUEST,
-            detail="Year is required",
+            status_code=result.error_type,
+            detail=result.message,
         )
+    return ORJSONResponse(content={"data": years.data(result)})
 
-    if year < 1900 or year > dt.now().year:
-        raise HTTPException(
-            status_code=status.HTTP_400_BAD_REQUEST,
-            detail=f"Year must be between 1900 and {dt.now().year}",
-        )
 
-    result = energy_service.get_average_monthly_by_location_and_year(
-        year, location
+@energy_router.get("/consumo_promedio_mensual_por_ubicacion")
+@closed_report
+@conditional_report("energy_service")
+@shared_report("energy")
+async def consumo_promedio_mensual_por_ubicacion(
+    years: ReportYears = Depends(report_years),
+    energy_service: EnergyService = Depends(),
+) -> Response:
+    result = await energy_service.get_average_monthly_of_locations_by_year(
+        years.years
     )
     if isinstance(result, AppError):
         raise HTTPException(
             status_code=result.error_type,
             detail=result.message,
         )
-    return Response(
-        content=json.dumps({"data": result}),
-        status_code=200,
-        headers={"Content-Type": "application/json"},
-    )
+    return ORJSONResponse(content={"data": years.data(result)})
 
 
 @energy_router.get("/{id}", response_model=Energy)
 async def retrieve_energy(
-    id: str,
+    id: int,
     energy_service: EnergyService = Depends(),
 ) -> Energy:
-    energy = energy_service.get(id)
+    energy = await energy_service.get(id)
     if energy:
         return energy
     else:
@@ -85,7 +127,7 @@ async def create_event(
     energy: EnergyCreateSchema,
     energy_service: EnergyService = Depends(),
 ) -> Energy:
-    result = energy_service.create(energy)
+    result = await energy_service.create(energy)
     if isinstance(result, AppError):
         raise HTTPException(
             detail=result.message, status_code=result.error_type
@@ -99,26 +141,42 @@ async def bulk_create_energies(
     energies: list[EnergyCreateSchema],
     energy_service: EnergyService = Depends(),
 ) -> Response:
-    result = energy_service.bulk_create(energies)
+    result = await energy_service.bulk_create(energies)
     if isinstance(result, AppError):
         raise HTTPException(
             detail=result.message, status_code=result.error_type
         )
 
-    return Response(
-        content=json.dumps({"data": "Energys created succesfully"}),
-        status_code=200,
-        headers={"Content-Type": "application/json"},
-    )
+    return ORJSONResponse(content={"data": result})
+
+
+@energy_router.post("/upload")
+async def upload_energies(
+    request: Request,
+    energy_service: EnergyService = Depends(),
+) -> Response:
+    try:
+        records = read_records(
+            request.headers.get("content-type", ""), request.stream()
+        )
+    except ValueError as err:
+        raise HTTPException(
+            status_code=status.HTTP_415_UNSUPPORTED_MEDIA_TYPE,
+            detail=str(err),
+        )
+
+    result = await energy_service.upload(records)
+
+    return ORJSONResponse(content={"data": result})
 
 
 @energy_router.put("/{id}", response_model=Energy)
 async def update_energy(
-    id: str,
+    id: int,
     energy: EnergyUpdateSchema,
     energy_service: EnergyService = Depends(),
 ) -> Energy:
-    result = energy_service.update(id, energy)
+    result = await energy_service.update(id, energy)
 
     if isinstance(result, AppError):
         raise HTTPException(
@@ -130,18 +188,14 @@ async def update_energy(
 
 @energy_router.delete("/{id}")
 async def delete_event(
-    id: str,
+    id: int,
     energy_service: EnergyService = Depends(),
 ) -> Energy:
-    result = energy_service.delete(id)
+    result = await energy_service.delete(id)
 
     if isinstance(result, AppError):
         raise HTTPException(
             detail=result.message, status_code=result.error_type
         )
 
-    return Response(
-        content=json.dumps({"data": "Energy deleted succesfully"}),
-        status_code=200,
-        headers={"Content-Type": "application/json"},
-    )
+    return ORJSONResponse(content={"data": "Energy deleted succesfully"})
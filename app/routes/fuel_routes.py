@@ -1,17 +1,33 @@
 # isort: skip_file
-import json
-from datetime import datetime as dt
-
-from fastapi import APIRouter, Depends, HTTPException, Response, status
+from typing import Optional
+
+from fastapi import (
+    APIRouter,
+    Depends,
+    HTTPException,
+    Query,
+    Request,
+    Response,
+    status,
+)
+from fastapi.responses import ORJSONResponse, StreamingResponse
 
 from app.core import get_logger
+from app.infrastructure import shared_report
 from app.models import Fuel
 from app.schemas.fuel_schema import (
     FuelCreateSchema,
+    FuelFilterSchema,
     FuelUpdateSchema,
 )
 from app.services.fuel import FuelService
+from app.services.closed_period import closed_report
+from app.utils.conditional import conditional_report
 from app.utils.errors import AppError
+from app.utils.export import models_to_json
+from app.utils.pagination import DEFAULT_PAGE_SIZE, MAX_PAGE_SIZE
+from app.utils.upload import read_records
+from app.utils.years import ReportYears, report_years
 
 
 logger = get_logger(__name__)
@@ -20,147 +36,118 @@ fuel_router = APIRouter()
 
 @fuel_router.get("/", response_model=list[Fuel])
 async def list_fuels(
+    filters: FuelFilterSchema = Depends(),
+    limit: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE),
+    cursor: Optional[str] = None,
     fuel_service: FuelService = Depends(),
-) -> list[Fuel]:
-    result = fuel_service.get_all()
+) -> Response:
+    result = await fuel_service.get_all(filters, limit, cursor)
     if isinstance(result, AppError):
         raise HTTPException(
             status_code=result.error_type,
             detail=result.message,
         )
-    return result
 
+    fuels, next_page = result
+    headers = {} if next_page is None else {"X-Next-Cursor": next_page}
+    # Serialized straight from the rows, they need no validation
+    return Response(
+        content=models_to_json(fuels),
+        media_type="application/json",
+        headers=headers,
+    )
 
-@fuel_router.get("/consumo_anual_por_categoria/")
-async def consumo_anual_por_categoria(
-    year: int,
+
+@fuel_router.get("/export")
+async def export_fuels(
+    filters: FuelFilterSchema = Depends(),
     fuel_service: FuelService = Depends(),
-) -> list[Fuel]:
-    if year is None:
-        raise HTTPException(
-            status_code=status.HTTP_400_BAD_REQUEST,
-            detail="Year is required",
-        )
+) -> StreamingResponse:
+    return StreamingResponse(
+        fuel_service.export(filters), media_type="application/x-ndjson"
+    )
 
-    if year < 1900 or year > dt.now().year:
-        raise HTTPException(
-            status_code=status.HTTP_400_BAD_REQUEST,
-            detail=f"Year must be between 1900 and {dt.now().year}",
-        )
 
-    result = fuel_service.get_consumed_fuel_percentage_by_year(year)
+@fuel_router.get("/consumo_anual_por_categoria/")
+@closed_report
+@conditional_report("fuel_service")
+@shared_report("fuel")
+async def consumo_anual_por_categoria(
+    years: ReportYears = Depends(report_years),
+    fuel_service: FuelService = Depends(),
+) -> Response:
+    result = await fuel_service.get_consumed_fuel_percentage_by_year(
+        years.years
+    )
     if isinstance(result, AppError):
         raise HTTPException(
             status_code=result.error_type,
             detail=result.message,
         )
 
-    return Response(
-        content=json.dumps({"data": result}),
-        status_code=200,
-        headers={"Content-Type": "application/json"},
-    )
+    return ORJSONResponse(content={"data": years.data(result)})
 
 
 @fuel_router.get("/consumo_promedio_mensual")
+@closed_report
+@conditional_report("fuel_service")
+@shared_report("fuel")
 async def consumo_promedio_mensual(
-    year: int,
+    years: ReportYears = Depends(report_years),
     fuel_service: FuelService = Depends(),
 ) -> Response:
-    if year is None:
-        raise HTTPException(
-            status_code=status.HTTP_400_BAD_REQUEST,
-            detail="Year is required",
-        )
-
-    if year < 1900 or year > dt.now().year:
-        raise HTTPException(
-            status_code=status.HTTP_400_BAD_REQUEST,
-            detail=f"Year must be between 1900 and {dt.now().year}",
-        )
-
-    result = fuel_service.get_average_monthly_consumption(year)
+    result = await fuel_service.get_average_monthly_consumption(years.years)
     if isinstance(result, AppError):
         raise HTTPException(
             status_code=result.error_type,
             detail=result.message,
         )
 
-    return Response(
-        content=json.dumps({"data": result}),
-        status_code=200,
-        headers={"Content-Type": "application/json"},
-    )
+    return ORJSONResponse(content={"data": years.data(result)})
 
 
 @fuel_router.get("/porcentaje_por_segmento_anual")
+@closed_report
+@conditional_report("fuel_service")
+@shared_report("fuel")
 async def porcentaje_por_segmento_anual(
-    year: int,
+    years: ReportYears = Depends(report_years),
     fuel_service: FuelService = Depends(),
 ) -> Response:
-    if year is None:
-        raise HTTPException(
-            status_code=status.HTTP_400_BAD_REQUEST,
-            detail="Year is required",
-        )
-
-    if year < 1900 or year > dt.now().year:
-        raise HTTPException(
-            status_code=status.HTTP_400_BAD_REQUEST,
-            detail=f"Year must be between 1900 and {dt.now().year}",
-        )
-
-    result = fuel_service.get_most_impactful_emission_type(year)
+    result = await fuel_service.get_most_impactful_emission_type(years.years)
     if isinstance(result, AppError):
         raise HTTPException(
             status_code=result.error_type,
             detail=result.message,
         )
 
-    return Response(
-        content=json.dumps({"data": result}),
-        status_code=200,
-        headers={"Content-Type": "application/json"},
-    )
+    return ORJSONResponse(content={"data": years.data(result)})
 
 
 @fuel_router.get("/min_max_consumo_meses")
+@closed_report
+@conditional_report("fuel_service")
+@shared_report("fuel")
 async def min_max_consumo_meses(
-    year: int,
+    years: ReportYears = Depends(report_years),
     fuel_service: FuelService = Depends(),
 ) -> Response:
-    if year is None:
-        raise HTTPException(
-            status_code=status.HTTP_400_BAD_REQUEST,
-            detail="Year is required",
-        )
-
-    if year < 1900 or year > dt.now().year:
-        raise HTTPException(
-            status_code=status.HTTP_400_BAD_REQUEST,
-            detail=f"Year must be between 1900 and {dt.now().year}",
-        )
-
-    result = fuel_service.get_min_and_max_fuel_by_year(year)
+    result = await fuel_service.get_min_and_max_fuel_by_year(years.years)
     if isinstance(result, AppError):
         raise HTTPException(
             status_code=result.error_type,
             detail=result.message,
         )
 
-    return Response(
-        content=json.dumps({"data": result}),
-        status_code=200,
-        headers={"Content-Type": "application/json"},
-    )
+    return ORJSONResponse(content={"data": years.data(result)})
 
 
 @fuel_router.get("/{id}", response_model=Fuel)
 async def retrieve_fuel(
-    id: str,
+    id: int,
     fuel_service: FuelService = Depends(),
 ) -> Fuel:
-    fuel = fuel_service.get(id)
+    fuel = await fuel_service.get(id)
     if fuel:
         return fuel
     else:
@@ -174,7 +161,7 @@ async def create_event(
     fuel: FuelCreateSchema,
     fuel_service: FuelService = Depends(),
 ) -> Fuel:
-    result = fuel_service.create(fuel)
+    result = await fuel_service.create(fuel)
     if isinstance(result, AppError):
         raise HTTPException(
             detail=result.message, status_code=result.error_type
@@ -188,26 +175,42 @@ async def bulk_create_fuels(
     fuels: list[FuelCreateSchema],
     fuel_service: FuelService = Depends(),
 ) -> Response:
-    result = fuel_service.bulk_create(fuels)
+    result = await fuel_service.bulk_create(fuels)
     if isinstance(result, AppError):
         raise HTTPException(
             detail=result.message, status_code=result.error_type
         )
 
-    return Response(
-        content=json.dumps({"data": "Fuels created succesfully"}),
-        status_code=200,
-        headers={"Content-Type": "application/json"},
-    )
+    return ORJSONResponse(content={"data": result})
+
+
+@fuel_router.post("/upload")
+async def upload_fuels(
+    request: Request,
+    fuel_service: FuelService = Depends(),
+) -> Response:
+    try:
+        records = read_records(
+            request.headers.get("content-type", ""), request.stream()
+        )
+    except ValueError as err:
+        raise HTTPException(
+            status_code=status.HTTP_415_UNSUPPORTED_MEDIA_TYPE,
+            detail=str(err),
+        )
+
+    result = await fuel_service.upload(records)
+
+    return ORJSONResponse(content={"data": result})
 
 
 @fuel_router.put("/{id}", response_model=Fuel)
 async def update_fuel(
-    id: str,
+    id: int,
     fuel: FuelUpdateSchema,
     fuel_service: FuelService = Depends(),
 ) -> Fuel:
-    result = fuel_service.update(id, fuel)
+    result = await fuel_service.update(id, fuel)
 
     if isinstance(result, AppError):
         raise HTTPException(
@@ -219,18 +222,14 @@ async def update_fuel(
 
 @fuel_router.delete("/{id}")
 async def delete_event(
-    id: str,
+    id: int,
     fuel_service: FuelService = Depends(),
 ) -> Fuel:
-    result = fuel_service.delete(id)
+    result = await fuel_service.delete(id)
 
     if isinstance(result, AppError):
         raise HTTPException(
             detail=result.message, status_code=result.error_type
         )
 
-    return Response(
-        content=json.dumps({"data": "Fuel deleted succesfully"}),
-        status_code=200,
-        headers={"Content-Type": "application/json"},
-    )
+    return ORJSONResponse(content={"data": "Fuel deleted succesfully"})
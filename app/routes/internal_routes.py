@@ -0,0 +1,70 @@
+# isort: skip_file
+from fastapi import APIRouter, Depends, HTTPException, Response, status
+from fastapi.responses import ORJSONResponse
+
+from app.core import get_logger
+from app.infrastructure import (
+    db_executor,
+    report_cache,
+    report_view_refresher,
+    shared_report_cache,
+)
+from app.infrastructure.db import async_engine, engine
+from app.utils.admin import require_admin
+
+
+logger = get_logger(__name__)
+# Every route shows how the service is loaded, or acts on it
+internal_router = APIRouter(dependencies=[Depends(require_admin)])
+
+
+@internal_router.get("/db_executor")
+async def db_executor_stats() -> Response:
+    if db_executor is None:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Database thread pool is disabled",
+        )
+
+    return ORJSONResponse(content={"data": db_executor.stats()})
+
+
+@internal_router.get("/db_pool")
+async def db_pool_stats() -> Response:
+    pools = {"sync": engine.pool.stats()}
+    if async_engine is not None:
+        pools["async"] = async_engine.pool.stats()
+
+    return ORJSONResponse(content={"data": pools})
+
+
+@internal_router.get("/report_cache")
+async def report_cache_stats() -> Response:
+    return ORJSONResponse(content={"data": report_cache.stats()})
+
+
+@internal_router.get("/shared_report_cache")
+async def shared_report_cache_stats() -> Response:
+    return ORJSONResponse(content={"data": shared_report_cache.stats()})
+
+
+@internal_router.get("/report_view")
+async def report_view_stats() -> Response:
+    return ORJSONResponse(content={"data": report_view_refresher.stats()})
+
+
+@internal_router.post("/report_view/refresh")
+async def refresh_report_view() -> Response:
+    if not report_view_refresher.enabled:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Reports are not read from the materialized view",
+        )
+
+    if not await report_view_refresher.refresh():
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail="Error while refreshing the materialized view",
+        )
+
+    return ORJSONResponse(content={"data": report_view_refresher.stats()})
@@ -1,17 +1,33 @@
 # isort: skip_file
-import json
-from datetime import datetime as dt
-
-from fastapi import APIRouter, Depends, HTTPException, Response, status
+from typing import Optional
+
+from fastapi import (
+    APIRouter,
+    Depends,
+    HTTPException,
+    Query,
+    Request,
+    Response,
+    status,
+)
+from fastapi.responses import ORJSONResponse, StreamingResponse
 
 from app.core import get_logger
+from app.infrastructure import shared_report
 from app.models import Oil
 from app.schemas.oil_schema import (
     OilCreateSchema,
+    OilFilterSchema,
     OilUpdateSchema,
 )
 from app.services.oil import OilService
+from app.services.closed_period import closed_report
+from app.utils.conditional import conditional_report
 from app.utils.errors import AppError
+from app.utils.export import models_to_json
+from app.utils.pagination import DEFAULT_PAGE_SIZE, MAX_PAGE_SIZE
+from app.utils.upload import read_records
+from app.utils.years import ReportYears, report_years
 
 
 logger = get_logger(__name__)
@@ -20,83 +36,82 @@ oil_router = APIRouter()
 
 @oil_router.get("/", response_model=list[Oil])
 async def list_energies(
+    filters: OilFilterSchema = Depends(),
+    limit: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE),
+    cursor: Optional[str] = None,
     oil_service: OilService = Depends(),
-) -> list[Oil]:
-    result = oil_service.get_all()
+) -> Response:
+    result = await oil_service.get_all(filters, limit, cursor)
     if isinstance(result, AppError):
         raise HTTPException(
             status_code=result.error_type,
             detail=result.message,
         )
-    return result
+
+    oils, next_page = result
+    headers = {} if next_page is None else {"X-Next-Cursor": next_page}
+    # Serialized straight from the rows, they need no validation
+    return Response(
+        content=models_to_json(oils),
+        media_type="application/json",
+        headers=headers,
+    )
+
+
+@oil_router.get("/export")
+async def export_oils(
+    filters: OilFilterSchema = Depends(),
+    oil_service: OilService = Depends(),
+) -> StreamingResponse:
+    return StreamingResponse(
+        oil_service.export(filters), media_type="application/x-ndjson"
+    )
 
 
 @oil_router.get("/consumo_mensual_aceite")
+@closed_report
+@conditional_report("oil_service")
+@shared_report("oil")
 async def consumo_mensual_aceite(
-    year: int, oil_service: OilService = Depends()
+    years: ReportYears = Depends(report_years),
+    oil_service: OilService = Depends(),
 ) -> Response:
-    if year is None:
-        raise HTTPException(
-            status_code=status.HTTP_400_BAD_REQUEST,
-            detail="Year is required",
-        )
-
-    if year < 1900 or year > dt.now().year:
-        raise HTTPException(
-            status_code=status.HTTP_400_BAD_REQUEST,
-            detail=f"Year must be between 1900 and {dt.now().year}",
-        )
-
-    result = oil_service.get_monthly_consumption_by_type_and_year(year)
+    result = await oil_service.get_monthly_consumption_by_type_and_year(
+        years.years
+    )
     if isinstance(result, AppError):
         raise HTTPException(
             status_code=result.error_type,
             detail=result.message,
         )
 
-    return Response(
-        content=json.dumps({"data": result}),
-        status_code=200,
-        headers={"Content-Type": "application/json"},
-    )
+    return ORJSONResponse(content={"data": years.data(result)})
 
 
 @oil_router.get("/mes_menos_perdida_refrigerante")
+@closed_report
+@conditional_report("oil_service")
+@shared_report("oil")
 async def mes_menos_perdida_refrigerante(
-    year: int, oil_service: OilService = Depends()
+    years: ReportYears = Depends(report_years),
+    oil_service: OilService = Depends(),
 ) -> Response:
-    if year is None:
-        raise HTTPException(
-            status_code=status.HTTP_400_BAD_REQUEST,
-            detail="Year is required",
-        )
-
-    if year < 1900 or year > dt.now().year:
-        raise HTTPException(
-            status_code=status.HTTP_400_BAD_REQUEST,
-            detail=f"Year must be between 1900 and {dt.now().year}",
-        )
-
-    result = oil_service.get_min_loss_by_type_and_year(year)
+    result = await oil_service.get_min_loss_by_type_and_year(years.years)
     if isinstance(result, AppError):
         raise HTTPException(
             status_code=result.error_type,
             detail=result.message,
         )
 
-    return Response(
-        content=json.dumps({"data": result}),
-        status_code=200,
-        headers={"Content-Type": "application/json"},
-    )
+    return ORJSONResponse(content={"data": years.data(result)})
 
 
 @oil_router.get("/{id}", response_model=Oil)
 async def retrieve_oil(
-    id: str,
+    id: int,
     oil_service: OilService = Depends(),
 ) -> Oil:
-    oil = oil_service.get(id)
+    oil = await oil_service.get(id)
     if oil:
         return oil
     else:
@@ -110,7 +125,7 @@ async def create_event(
     oil: OilCreateSchema,
     oil_service: OilService = Depends(),
 ) -> Oil:
-    result = oil_service.create(oil)
+    result = await oil_service.create(oil)
     if isinstance(result, AppError):
         raise HTTPException(
             detail=result.message, status_code=result.error_type
@@ -124,26 +139,42 @@ async def bulk_create_energies(
     energies: list[OilCreateSchema],
     oil_service: OilService = Depends(),
 ) -> Response:
-    result = oil_service.bulk_create(energies)
+    result = await oil_service.bulk_create(energies)
     if isinstance(result, AppError):
         raise HTTPException(
             detail=result.message, status_code=result.error_type
         )
 
-    return Response(
-        content=json.dumps({"data": "Oils created succesfully"}),
-        status_code=200,
-        headers={"Content-Type": "application/json"},
-    )
+    return ORJSONResponse(content={"data": result})
+
+
+@oil_router.post("/upload")
+async def upload_oils(
+    request: Request,
+    oil_service: OilService = Depends(),
+) -> Response:
+    try:
+        records = read_records(
+            request.headers.get("content-type", ""), request.stream()
+        )
+    except ValueError as err:
+        raise HTTPException(
+            status_code=status.HTTP_415_UNSUPPORTED_MEDIA_TYPE,
+            detail=str(err),
+        )
+
+    result = await oil_service.upload(records)
+
+    return ORJSONResponse(content={"data": result})
 
 
 @oil_router.put("/{id}", response_model=Oil)
 async def update_oil(
-    id: str,
+    id: int,
     oil: OilUpdateSchema,
     oil_service: OilService = Depends(),
 ) -> Oil:
-    result = oil_service.update(id, oil)
+    result = await oil_service.update(id, oil)
 
     if isinstance(result, AppError):
         raise HTTPException(
@@ -155,18 +186,14 @@ async def update_oil(
 
 @oil_router.delete("/{id}")
 async def delete_event(
-    id: str,
+    id: int,
     oil_service: OilService = Depends(),
 ) -> Oil:
-    result = oil_service.delete(id)
+    result = await oil_service.delete(id)
 
     if isinstance(result, AppError):
         raise HTTPException(
             detail=result.message, status_code=result.error_type
         )
 
-    return Response(
-        content=json.dumps({"data": "Oil deleted succesfully"}),
-        status_code=200,
-        headers={"Content-Type": "application/json"},
-    )
+    return ORJSONResponse(content={"data": "Oil deleted succesfully"})
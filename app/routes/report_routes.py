@@ -1,31 +1,37 @@
 # isort: skip_file
-import json
-from datetime import datetime as dt
-
-from fastapi import APIRouter, Depends, HTTPException, Response, status
+from fastapi import APIRouter, Depends, HTTPException, Response
+from fastapi.responses import ORJSONResponse
 
 from app.core import get_logger
+from app.infrastructure import shared_report
 from app.services import ReportService
+from app.services.closed_period import closed_report
+from app.utils.conditional import conditional_report
 from app.utils.errors import AppError
+from app.utils.years import ReportYears, report_years, report_years_from
 
 
 logger = get_logger(__name__)
 report_router = APIRouter()
 
+comparative_years = report_years_from(
+    2000, "El año debe ser mayor a 2000 y menor al año actual"
+)
+oil_average_years = report_years_from(
+    1900, "El año debe ser mayor a 1900 y menor al año actual"
+)
+
 
 @report_router.get("/comparativa_energia_combustible", response_model=dict)
+@closed_report
+@conditional_report("report_service", "fuel", "energy")
+@shared_report("fuel", "energy")
 async def comparativa_energia_combustible(
-    year: int,
+    years: ReportYears = Depends(comparative_years),
     report_service: ReportService = Depends(),
 ) -> Response:
-    if year < 2000 or year > dt.now().year:
-        raise HTTPException(
-            status_code=status.HTTP_400_BAD_REQUEST,
-            detail="El año debe ser mayor a 2000 y menor al año actual",
-        )
-
     comparative_energy_fuel = (
-        report_service.get_comparative_energy_fuel_by_year(year)
+        await report_service.get_comparative_energy_fuel_by_year(years.years)
     )
 
     if isinstance(comparative_energy_fuel, AppError):
@@ -34,24 +40,22 @@ async def comparativa_energia_combustible(
             detail=comparative_energy_fuel.message,
         )
 
-    return Response(
-        content=json.dumps({"data": comparative_energy_fuel}),
-        media_type="application/json",
+    return ORJSONResponse(
+        content={"data": years.data(comparative_energy_fuel)}
     )
 
 
 @report_router.get("/promedio_mensual_petroleo")
+@closed_report
+@conditional_report("report_service", "fuel", "oil")
+@shared_report("fuel", "oil")
 async def promedio_mensual_petroleo(
-    year: int,
+    years: ReportYears = Depends(oil_average_years),
     report_service: ReportService = Depends(),
 ) -> Response:
-    if year < 1900 or year > dt.now().year:
-        raise HTTPException(
-            status_code=status.HTTP_400_BAD_REQUEST,
-            detail="El año debe ser mayor a 1900 y menor al año actual",
-        )
-
-    monthly_average_oil = report_service.get_average_consumption_by_year(year)
+    monthly_average_oil = await report_service.get_average_consumption_by_year(
+        years.years
+    )
 
     if isinstance(monthly_average_oil, AppError):
         raise HTTPException(
@@ -59,7 +63,29 @@ async def promedio_mensual_petroleo(
             detail=monthly_average_oil.message,
         )
 
-    return Response(
-        content=json.dumps({"data": monthly_average_oil}),
-        media_type="application/json",
+    return ORJSONResponse(content={"data": years.data(monthly_average_oil)})
+
+
+@report_router.get("/consumo_por_tipo_de_emision")
+@closed_report
+@conditional_report("report_service", "fuel", "oil", "energy", "roadtrip")
+@shared_report("fuel", "oil", "energy", "roadtrip")
+async def consumo_por_tipo_de_emision(
+    years: ReportYears = Depends(report_years),
+    report_service: ReportService = Depends(),
+) -> Response:
+    """
+    Total consumption of every domain by emission type, read from every
+    domain table in one grouped query.
+    """
+    consumption = await report_service.get_consumption_by_emission_type(
+        years.years
     )
+
+    if isinstance(consumption, AppError):
+        raise HTTPException(
+            status_code=consumption.error_type,
+            detail=consumption.message,
+        )
+
+    return ORJSONResponse(content={"data": years.data(consumption)})
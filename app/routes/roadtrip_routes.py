@@ -1,17 +1,33 @@
 # isort: skip_file
-import json
-from datetime import datetime as dt
-
-from fastapi import APIRouter, Depends, HTTPException, Response, status
+from typing import Optional
+
+from fastapi import (
+    APIRouter,
+    Depends,
+    HTTPException,
+    Query,
+    Request,
+    Response,
+    status,
+)
+from fastapi.responses import ORJSONResponse, StreamingResponse
 
 from app.core import get_logger
+from app.infrastructure import shared_report
 from app.models import Roadtrip
 from app.schemas.roadtrip_schema import (
     RoadtripCreateSchema,
+    RoadtripFilterSchema,
     RoadtripUpdateSchema,
 )
 from app.services.roadtrip import RoadtripService
+from app.services.closed_period import closed_report
+from app.utils.conditional import conditional_report
 from app.utils.errors import AppError
+from app.utils.export import models_to_json
+from app.utils.pagination import DEFAULT_PAGE_SIZE, MAX_PAGE_SIZE
+from app.utils.upload import read_records
+from app.utils.years import ReportYears, report_years
 
 
 logger = get_logger(__name__)
@@ -20,53 +36,63 @@ roadtrip_router = APIRouter()
 
 @roadtrip_router.get("/", response_model=list[Roadtrip])
 async def list_energies(
+    filters: RoadtripFilterSchema = Depends(),
+    limit: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE),
+    cursor: Optional[str] = None,
     roadtrip_service: RoadtripService = Depends(),
-) -> list[Roadtrip]:
-    result = roadtrip_service.get_all()
+) -> Response:
+    result = await roadtrip_service.get_all(filters, limit, cursor)
     if isinstance(result, AppError):
         raise HTTPException(
             status_code=result.error_type,
             detail=result.message,
         )
-    return result
+
+    roadtrips, next_page = result
+    headers = {} if next_page is None else {"X-Next-Cursor": next_page}
+    # Serialized straight from the rows, they need no validation
+    return Response(
+        content=models_to_json(roadtrips),
+        media_type="application/json",
+        headers=headers,
+    )
+
+
+@roadtrip_router.get("/export")
+async def export_roadtrips(
+    filters: RoadtripFilterSchema = Depends(),
+    roadtrip_service: RoadtripService = Depends(),
+) -> StreamingResponse:
+    return StreamingResponse(
+        roadtrip_service.export(filters), media_type="application/x-ndjson"
+    )
 
 
 @roadtrip_router.get("/comparativa_promedio_mensual")
+@closed_report
+@conditional_report("roadtrip_service")
+@shared_report("roadtrip")
 async def comparativa_promedio_mensual(
-    year: int,
+    years: ReportYears = Depends(report_years),
     roadtrip_service: RoadtripService = Depends(),
 ) -> Response:
-    if year is None:
-        raise HTTPException(
-            status_code=status.HTTP_400_BAD_REQUEST,
-            detail="Year is required",
-        )
-
-    if year < 1900 or year > dt.now().year:
-        raise HTTPException(
-            status_code=status.HTTP_400_BAD_REQUEST,
-            detail=f"Year must be between 1900 and {dt.now().year}",
-        )
-
-    result = roadtrip_service.get_average_monthly_comparative_percentage(year)
+    result = await roadtrip_service.get_average_monthly_comparative_percentage(
+        years.years
+    )
     if isinstance(result, AppError):
         raise HTTPException(
             status_code=result.error_type,
             detail=result.message,
         )
-    return Response(
-        content=json.dumps({"data": result}),
-        status_code=200,
-        headers={"Content-Type": "application/json"},
-    )
+    return ORJSONResponse(content={"data": years.data(result)})
 
 
 @roadtrip_router.get("/{id}", response_model=Roadtrip)
 async def retrieve_roadtrip(
-    id: str,
+    id: int,
     roadtrip_service: RoadtripService = Depends(),
 ) -> Roadtrip:
-    roadtrip = roadtrip_service.get(id)
+    roadtrip = await roadtrip_service.get(id)
     if roadtrip:
         return roadtrip
     else:
@@ -80,7 +106,7 @@ async def create_roadtrip(
     roadtrip: RoadtripCreateSchema,
     roadtrip_service: RoadtripService = Depends(),
 ) -> Roadtrip:
-    result = roadtrip_service.create(roadtrip)
+    result = await roadtrip_service.create(roadtrip)
     if isinstance(result, AppError):
         raise HTTPException(
             detail=result.message, status_code=result.error_type
@@ -94,26 +120,42 @@ async def bulk_create_energies(
     energies: list[RoadtripCreateSchema],
     roadtrip_service: RoadtripService = Depends(),
 ) -> Response:
-    result = roadtrip_service.bulk_create(energies)
+    result = await roadtrip_service.bulk_create(energies)
     if isinstance(result, AppError):
         raise HTTPException(
             detail=result.message, status_code=result.error_type
         )
 
-    return Response(
-        content=json.dumps({"data": "Roadtrips created succesfully"}),
-        status_code=200,
-        headers={"Content-Type": "application/json"},
-    )
+    return ORJSONResponse(content={"data": result})
+
+
+@roadtrip_router.post("/upload")
+async def upload_roadtrips(
+    request: Request,
+    roadtrip_service: RoadtripService = Depends(),
+) -> Response:
+    try:
+        records = read_records(
+            request.headers.get("content-type", ""), request.stream()
+        )
+    except ValueError as err:
+        raise HTTPException(
+            status_code=status.HTTP_415_UNSUPPORTED_MEDIA_TYPE,
+            detail=str(err),
+        )
+
+    result = await roadtrip_service.upload(records)
+
+    return ORJSONResponse(content={"data": result})
 
 
 @roadtrip_router.put("/{id}", response_model=Roadtrip)
 async def update_roadtrip(
-    id: str,
+    id: int,
     roadtrip: RoadtripUpdateSchema,
     roadtrip_service: RoadtripService = Depends(),
 ) -> Roadtrip:
-    result = roadtrip_service.update(id, roadtrip)
+    result = await roadtrip_service.update(id, roadtrip)
 
     if isinstance(result, AppError):
         raise HTTPException(
@@ -125,18 +167,14 @@ async def update_roadtrip(
 
 @roadtrip_router.delete("/{id}")
 async def delete_event(
-    id: str,
+    id: int,
     roadtrip_service: RoadtripService = Depends(),
 ) -> Roadtrip:
-    result = roadtrip_service.delete(id)
+    result = await roadtrip_service.delete(id)
 
     if isinstance(result, AppError):
         raise HTTPException(
             detail=result.message, status_code=result.error_type
         )
 
-    return Response(
-        content=json.dumps({"data": "Roadtrip deleted succesfully"}),
-        status_code=200,
-        headers={"Content-Type": "application/json"},
-    )
+    return ORJSONResponse(content={"data": "Roadtrip deleted succesfully"})
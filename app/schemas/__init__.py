@@ -1,4 +1,21 @@
-from .energy_schema import EnergyCreateSchema, EnergyUpdateSchema
-from .fuel_schema import FuelCreateSchema, FuelUpdateSchema
-from .oil_schema import OilCreateSchema, OilUpdateSchema
-from .roadtrip_schema import RoadtripCreateSchema, RoadtripUpdateSchema
+from .energy_schema import (
+    EnergyCreateSchema,
+    EnergyFilterSchema,
+    EnergyUpdateSchema,
+)
+from .fuel_schema import (
+    FuelCreateSchema,
+    FuelFilterSchema,
+    FuelUpdateSchema,
+)
+from .oil_schema import (
+    OilCreateSchema,
+    OilFilterSchema,
+    OilUpdateSchema,
+)
+from .report_schema import BatchReportSchema
+from .roadtrip_schema import (
+    RoadtripCreateSchema,
+    RoadtripFilterSchema,
+    RoadtripUpdateSchema,
+)
@@ -25,3 +25,15 @@ class EnergyCreateSchema(EnergyBaseSchema):
 
 class EnergyUpdateSchema(EnergyBaseSchema):
     pass
+
+
+class EnergyFilterSchema(BaseModel):
+    """
+    Query filters of the energy list, `start_date` inclusive and `end_date`
+    exclusive.
+    """
+
+    start_date: Optional[dt]
+    end_date: Optional[dt]
+    location: Optional[EnergyLocation]
+    emission_type: Optional[EmissionType]
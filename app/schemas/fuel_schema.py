@@ -25,6 +25,18 @@ class FuelUpdateSchema(FuelBaseSchema):
     pass
 
 
+class FuelFilterSchema(BaseModel):
+    """
+    Query filters of the fuel list, `start_date` inclusive and `end_date`
+    exclusive.
+    """
+
+    start_date: Optional[dt]
+    end_date: Optional[dt]
+    fuel_type: Optional[FuelType]
+    emission_type: Optional[EmissionType]
+
+
 class FuelPercentageByYearResponseSchema(BaseModel):
     combustible_administrativo: float
     combustible_indirecto_de_proveedor: float
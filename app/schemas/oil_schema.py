@@ -25,3 +25,15 @@ class OilCreateSchema(OilBaseSchema):
 
 class OilUpdateSchema(OilBaseSchema):
     pass
+
+
+class OilFilterSchema(BaseModel):
+    """
+    Query filters of the oil list, `start_date` inclusive and `end_date`
+    exclusive.
+    """
+
+    start_date: Optional[dt]
+    end_date: Optional[dt]
+    oil_type: Optional[OilType]
+    emission_type: Optional[EmissionType]
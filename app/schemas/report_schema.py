@@ -0,0 +1,13 @@
+from typing import Any
+
+from pydantic import BaseModel
+
+
+class BatchReportSchema(BaseModel):
+    """
+    One report of a batch, `report` being its path under `/api` such as
+    `fuel/consumo_promedio_mensual`, and `params` its query parameters.
+    """
+
+    report: str
+    params: dict[str, Any] = {}
@@ -25,6 +25,18 @@ class RoadtripUpdateSchema(RoadtripBaseSchema):
     pass
 
 
+class RoadtripFilterSchema(BaseModel):
+    """
+    Query filters of the roadtrip list, `start_date` inclusive and `end_date`
+    exclusive.
+    """
+
+    start_date: Optional[dt]
+    end_date: Optional[dt]
+    group: Optional[RoadtripGroupType]
+    emission_type: Optional[EmissionType]
+
+
 class RoadtripPercentageDB(BaseModel):
     group: RoadtripGroupType
     sum: float
@@ -1,3 +1,4 @@
+from .closed_period import ClosedPeriodService
 from .energy import EnergyService
 from .fuel import FuelService
 from .oil import OilService
@@ -0,0 +1,223 @@
+# isort:skip_file
+import inspect
+import json
+import time
+from datetime import datetime as dt
+from functools import wraps
+from typing import Any, Awaitable, Callable, Optional, Union
+
+from fastapi import Depends, Response
+
+from app.core import get_logger
+from app.core.config import get_app_settings
+from app.infrastructure import run_in_session
+from app.infrastructure.shared_cache import report_params
+from app.repositories import ClosedPeriodRepository
+from app.utils.errors import (
+    AppError,
+    ClosedPeriodError,
+    DatabaseError,
+    ErrorType,
+)
+from app.utils.years import utc_years
+
+logger = get_logger(__name__)
+app_settings = get_app_settings()
+
+IMMUTABLE = "public, max-age=31536000, immutable"
+SERVICE_PARAMETER = "closed_period_service"
+
+# Years are never reopened, so a year seen closed once stays closed
+_closed_years: set[int] = set()
+# Years closed by another worker are seen after this many seconds at most.
+# The domain tables reject writes to a closed year on their own, until then
+# its reports are only computed instead of read back.
+CLOSED_YEARS_REFRESH = 60
+_closed_years_read_at: Optional[float] = None
+
+
+def _remember_closed(years: list[int]) -> None:
+    global _closed_years_read_at
+    _closed_years.update(years)
+    _closed_years_read_at = time.monotonic()
+
+
+def forget_closed_years() -> None:
+    global _closed_years_read_at
+    _closed_years.clear()
+    _closed_years_read_at = None
+
+
+class ClosedPeriodService:
+    def __init__(
+        self,
+        closed_period_repository: ClosedPeriodRepository = Depends(),
+    ):
+        self.closed_period_repository = closed_period_repository
+
+    def _known_closed(self, year: int) -> bool:
+        cutoff = app_settings.CLOSED_YEARS_BEFORE
+        return year in _closed_years or (cutoff is not None and year < cutoff)
+
+    async def get_closed(self, years: set[int]) -> set[int]:
+        """
+        Get which of `years` are closed.
+
+        Raises
+        ------
+        `DatabaseError`
+            If the closed years could not be read
+        """
+        # Only past years can be closed
+        past = {year for year in years if year < dt.now().year}
+        if not all(self._known_closed(year) for year in past) and (
+            _closed_years_read_at is None
+            or time.monotonic() - _closed_years_read_at > CLOSED_YEARS_REFRESH
+        ):
+            # Another worker may have closed it since
+            _remember_closed(
+                await run_in_session(
+                    self.closed_period_repository.get_closed_years
+                )
+            )
+        return {year for year in past if self._known_closed(year)}
+
+    async def ensure_open(self, *datetimes: Optional[dt]) -> None:
+        """
+        Check that a write touching `datetimes` is allowed.
+
+        Raises
+        ------
+        `ClosedPeriodError`
+            If one of `datetimes` falls in a closed year, in UTC
+        `DatabaseError`
+            If the closed years could not be read
+        """
+        closed = await self.get_closed(utc_years(datetimes))
+        if closed:
+            raise ClosedPeriodError(closed)
+
+    async def get_closed_years(self) -> Union[dict, AppError]:
+        try:
+            years = await run_in_session(
+                self.closed_period_repository.get_closed_years
+            )
+        except DatabaseError as err:
+            logger.error(f"DB Error while fetching closed years: {err}")
+            return AppError(
+                error_type=ErrorType.DATASOURCE_ERROR,
+                message="Error while fetching closed years",
+            )
+
+        _remember_closed(years)
+        return {
+            "closed_before": app_settings.CLOSED_YEARS_BEFORE,
+            "years": years,
+        }
+
+    async def close_year(self, year: int) -> Union[dict, AppError]:
+        if year >= dt.now().year:
+            return AppError(
+                error_type=ErrorType.BAD_REQUEST,
+                message="Only past years can be closed",
+            )
+
+        try:
+            await run_in_session(
+                self.closed_period_repository.close_year, year
+            )
+        except DatabaseError as err:
+            logger.error(f"DB Error while closing year {year}: {err}")
+            return AppError(
+                error_type=ErrorType.DATASOURCE_ERROR,
+                message="Error while closing year",
+            )
+
+        _closed_years.add(year)
+        return await self.get_closed_years()
+
+    async def get_report(self, key: str) -> Optional[bytes]:
+        try:
+            return await run_in_session(
+                self.closed_period_repository.get_report, key
+            )
+        except DatabaseError as err:
+            logger.error(f"DB Error while fetching closed report: {err}")
+            return None
+
+    async def save_report(self, key: str, year: int, body: bytes) -> None:
+        try:
+            await run_in_session(
+                self.closed_period_repository.save_report, key, year, body
+            )
+        except DatabaseError as err:
+            logger.error(f"DB Error while saving closed report: {err}")
+
+
+def closed_report(
+    func: Callable[..., Awaitable[Response]]
+) -> Callable[..., Any]:
+    """
+    Serve the reports of closed years from the `closed_report` table.
+
+    The first request for closed years runs the report and stores the
+    response, every later one reads it back. Either way the response is
+    marked immutable so browsers and CDNs keep it for a year. Reports
+    covering an open year go straight to the route.
+
+    Parameters
+    ----------
+    `func` : Callable
+        A report route taking a `ReportYears` `years` parameter and
+        returning a JSON `Response`
+
+    Returns
+    -------
+    `Callable`
+        The route, with a `ClosedPeriodService` dependency added
+    """
+    name = f"{func.__module__}.{func.__name__}"
+    signature = inspect.signature(func)
+
+    @wraps(func)
+    async def wrapper(**kwargs) -> Response:
+        service: ClosedPeriodService = kwargs.pop(SERVICE_PARAMETER)
+        years = set(kwargs["years"].years)
+        try:
+            closed = await service.get_closed(years) == years
+        except DatabaseError as err:
+            logger.error(f"DB Error while checking years {years}: {err}")
+            closed = False
+        if not closed:
+            return await func(**kwargs)
+
+        key = f"{name}:{json.dumps(report_params(kwargs), sort_keys=True)}"
+        body = await service.get_report(key)
+        if body is None:
+            response = await func(**kwargs)
+            if response.status_code != 200:
+                if response.status_code == 304:
+                    response.headers["Cache-Control"] = IMMUTABLE
+                return response
+            body = response.body
+            await service.save_report(key, max(years), body)
+
+        return Response(
+            content=body,
+            media_type="application/json",
+            headers={"Cache-Control": IMMUTABLE},
+        )
+
+    # FastAPI reads the parameters from the signature, add the service
+    wrapper.__signature__ = signature.replace(
+        parameters=[
+            *signature.parameters.values(),
+            inspect.Parameter(
+                SERVICE_PARAMETER,
+                inspect.Parameter.KEYWORD_ONLY,
+                annotation=ClosedPeriodService,
+                default=Depends(),
+            ),
+        ]
+    )
+    return wrapper
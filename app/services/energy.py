@@ -1,33 +1,76 @@
 # isort:skip_file
-from typing import Optional, Union
+import time
+from datetime import datetime as dt
+from typing import AsyncIterator, Optional, Union
 
 from fastapi import Depends
 from fastapi.encoders import jsonable_encoder
 
 from app.core import get_logger
+from app.infrastructure import (
+    cached_report,
+    report_cache,
+    report_view_refresher,
+    run_in_session,
+    shared_report_cache,
+)
 from app.definitions.general import EnergyLocation
 from app.models import Energy
 from app.repositories import EnergyRepository
-from app.schemas import EnergyCreateSchema, EnergyUpdateSchema
-from app.utils.errors import AppError, DatabaseError, ErrorType
+from app.services.closed_period import ClosedPeriodService
+from app.schemas import (
+    EnergyCreateSchema,
+    EnergyFilterSchema,
+    EnergyUpdateSchema,
+)
+from app.utils.errors import (
+    AppError,
+    ClosedPeriodError,
+    DatabaseError,
+    ErrorType,
+)
+from app.utils.export import EXPORT_CHUNK_SIZE, rows_to_ndjson
+from app.utils.pagination import decode_cursor, next_cursor
+from app.utils.single_flight import single_flight
+from app.utils.upload import ingest
+from app.utils.years import utc_years
 
 logger = get_logger(__name__)
 
 
 class EnergyService:
-    def __init__(self, energy_repository: EnergyRepository = Depends()):
+    def __init__(
+        self,
+        energy_repository: EnergyRepository = Depends(),
+        closed_period_service: ClosedPeriodService = Depends(),
+    ):
         self.energy_repository = energy_repository
+        self.closed_period_service = closed_period_service
 
-    def get(self, id: int) -> Union[Energy, AppError]:
-        event = self.energy_repository.get(id)
+    async def get(self, id: int) -> Union[Energy, AppError]:
+        event = await run_in_session(self.energy_repository.get, id)
         if not event:
             logger.error(f"Energy not found with id: {id}")
             return None
         return event
 
-    def get_all(self) -> Union[list[Energy], AppError]:
+    async def get_all(
+        self,
+        filters: EnergyFilterSchema,
+        limit: int,
+        cursor: Optional[str] = None,
+    ) -> Union[tuple[list[Energy], Optional[str]], AppError]:
         try:
-            return self.energy_repository.get_all()
+            after = decode_cursor(cursor) if cursor else None
+        except ValueError:
+            return AppError(
+                error_type=ErrorType.BAD_REQUEST, message="Invalid cursor"
+            )
+
+        try:
+            energys = await run_in_session(
+                self.energy_repository.get_all, filters, limit + 1, after
+            )
         except DatabaseError as err:
             logger.error(f"Error while fetching all Energys, error: {err}")
             return AppError(
@@ -35,10 +78,34 @@ class EnergyService:
                 message="DB Error while fetching all Energys",
             )
 
-    def create(self, energy: EnergyCreateSchema) -> Union[Energy, AppError]:
+        return energys[:limit], next_cursor(energys, limit)
+
+    async def export(
+        self, filters: EnergyFilterSchema
+    ) -> AsyncIterator[bytes]:
+        chunks = self.energy_repository.stream_all(filters, EXPORT_CHUNK_SIZE)
+        try:
+            while True:
+                chunk = await run_in_session(next, chunks, None)
+                if chunk is None:
+                    return
+                yield rows_to_ndjson(chunk)
+        finally:
+            # Also runs when the client disconnects mid-stream, so the
+            # server-side cursor is not left open until the session closes.
+            await run_in_session(chunks.close)
+
+    async def create(
+        self, energy: EnergyCreateSchema
+    ) -> Union[Energy, AppError]:
         energy = Energy(**energy.dict())
         try:
-            return self.energy_repository.create(energy)
+            await self.closed_period_service.ensure_open(energy.datetime)
+            result = await run_in_session(
+                self.energy_repository.create, energy
+            )
+        except ClosedPeriodError as err:
+            return AppError(error_type=ErrorType.CONFLICT, message=str(err))
         except DatabaseError as err:
             logger.error(f"DB Error while creating Energy, error: {err}")
             return AppError(
@@ -46,17 +113,40 @@ class EnergyService:
                 message="Error while creating Energy",
             )
 
-    def bulk_create(self, energys: list[EnergyCreateSchema]) -> bool:
-        energys = [Energy(**event.dict()) for event in energys]
+        await self._invalidate_reports(energy.datetime)
+        return result
+
+    async def bulk_create(
+        self, energys: list[EnergyCreateSchema]
+    ) -> Union[dict, AppError]:
+        rows = [energy.dict() for energy in energys]
+        start = time.perf_counter()
         try:
-            return self.energy_repository.bulk_create(energys)
+            inserted = await self._insert_rows(rows)
+        except ClosedPeriodError as err:
+            return AppError(error_type=ErrorType.CONFLICT, message=str(err))
         except DatabaseError as err:
-            logger.error(f"DB Error while creating Events, error: {err}")
-            return False
+            logger.error(f"DB Error while creating Energys, error: {err}")
+            return AppError(
+                error_type=ErrorType.DATASOURCE_ERROR,
+                message="Error while creating Energys",
+            )
+
+        return {
+            "inserted": inserted,
+            "elapsed_ms": round((time.perf_counter() - start) * 1000, 3),
+        }
 
-    def update(self, id: int, energy: EnergyUpdateSchema) -> Energy:
+    async def upload(self, records: AsyncIterator[tuple[int, object]]) -> dict:
+        return await ingest(
+            records,
+            EnergyCreateSchema,
+            self._insert_rows,
+        )
+
+    async def update(self, id: int, energy: EnergyUpdateSchema) -> Energy:
         try:
-            energy_in_db = self.energy_repository.get(id)
+            energy_in_db = await run_in_session(self.energy_repository.get, id)
         except DatabaseError as err:
             logger.error(f"DB Error while fetching Energy, error: {err}")
             return AppError(
@@ -69,18 +159,35 @@ class EnergyService:
                 error_type=ErrorType.NOT_FOUND, message="Energy not found"
             )
 
+        previous_datetime = energy_in_db.datetime
         obj_data = jsonable_encoder(energy_in_db)
         if isinstance(energy, dict):
             update_data = energy
         else:
             update_data = energy.dict(exclude_unset=True)
 
+        try:
+            await self.closed_period_service.ensure_open(
+                previous_datetime, update_data.get("datetime")
+            )
+        except ClosedPeriodError as err:
+            return AppError(error_type=ErrorType.CONFLICT, message=str(err))
+        except DatabaseError as err:
+            logger.error(f"DB Error while updating Energy, error: {err}")
+            return AppError(
+                error_type=ErrorType.DATASOURCE_ERROR,
+                message="Error while updating Energy",
+            )
+
         # This is an iterator over the fields of the model to be updated
         for field in obj_data:
             if field in update_data:
                 setattr(energy_in_db, field, update_data[field])
+        updated_datetime = energy_in_db.datetime
         try:
-            return self.energy_repository.update(energy_in_db)
+            result = await run_in_session(
+                self.energy_repository.update, energy_in_db
+            )
         except DatabaseError as err:
             logger.error(f"DB Error while updating Energy, error: {err}")
             return AppError(
@@ -88,9 +195,12 @@ class EnergyService:
                 message="Error while updating Energy",
             )
 
-    def delete(self, id: str) -> Energy:
+        await self._invalidate_reports(previous_datetime, updated_datetime)
+        return result
+
+    async def delete(self, id: int) -> Energy:
         try:
-            energy_in_db = self.energy_repository.get(id)
+            energy_in_db = await run_in_session(self.energy_repository.get, id)
         except DatabaseError as err:
             logger.error(f"DB Error while fetching Energy, error: {err}")
             return AppError(
@@ -106,8 +216,14 @@ class EnergyService:
                 error_type=ErrorType.NOT_FOUND, message="Energy not found"
             )
 
+        deleted_datetime = energy_in_db.datetime
         try:
-            return self.energy_repository.delete(energy_in_db)
+            await self.closed_period_service.ensure_open(deleted_datetime)
+            result = await run_in_session(
+                self.energy_repository.delete, energy_in_db
+            )
+        except ClosedPeriodError as err:
+            return AppError(error_type=ErrorType.CONFLICT, message=str(err))
         except DatabaseError as err:
             logger.error(f"DB Error while deleting Energy, error: {err}")
             return AppError(
@@ -115,14 +231,21 @@ class EnergyService:
                 message="Error while deleting Energy",
             )
 
-    def get_average_monthly_by_location_and_year(
+        await self._invalidate_reports(deleted_datetime)
+        return result
+
+    @single_flight
+    @cached_report("energy")
+    async def get_average_monthly_by_location_and_year(
         self,
-        year: int,
+        years: tuple[int, ...],
         location: Optional[EnergyLocation] = EnergyLocation.PLANTA_DE_ENVASADO,
-    ) -> Union[dict, AppError]:
+    ) -> Union[dict[int, float], AppError]:
         try:
-            result = self.energy_repository.get_average_monthly_by_location_and_year(
-                year, location
+            result = await run_in_session(
+                self.energy_repository.get_average_monthly_by_location_and_year,
+                years,
+                location,
             )
         except DatabaseError as err:
             logger.error(
@@ -133,7 +256,79 @@ class EnergyService:
                 message="Error while fetching average monthly Energy by location and year",
             )
 
-        if not result:
-            return 0
+        return {
+            year: round(average, 2) if average else 0
+            for year, average in result.items()
+        }
+
+    @single_flight
+    @cached_report("energy")
+    async def get_average_monthly_of_locations_by_year(
+        self, years: tuple[int, ...]
+    ) -> Union[dict[int, dict], AppError]:
+        try:
+            rows = await run_in_session(
+                self.energy_repository.get_average_monthly_of_locations_by_year,
+                years,
+            )
+        except DatabaseError as err:
+            logger.error(
+                f"DB Error while fetching average Energy of locations, error: {err}"
+            )
+            return AppError(
+                error_type=ErrorType.DATASOURCE_ERROR,
+                message="Error while fetching average Energy of locations",
+            )
+
+        result = {
+            year: {
+                location: {"average": 0, "months": {}}
+                for location in EnergyLocation
+            }
+            for year in years
+        }
+        for row in rows:
+            if row.location is None:
+                continue
+            location = result[row.year][row.location]
+            average = round(row.average, 2)
+            if row.month is None:
+                location["average"] = average
+            else:
+                location["months"].setdefault(row.month, {})[
+                    row.energy_category
+                ] = average
+        return result
+
+    @single_flight
+    async def get_report_version(
+        self, years: tuple[int, ...]
+    ) -> Union[list[tuple], AppError]:
+        try:
+            versions = await run_in_session(
+                self.energy_repository.get_version, years
+            )
+        except DatabaseError as err:
+            logger.error(f"DB Error while fetching Energy version: {err}")
+            return AppError(
+                error_type=ErrorType.DATASOURCE_ERROR,
+                message="Error while fetching Energy version",
+            )
+
+        return [tuple(version) for version in versions]
+
+    async def _insert_rows(self, rows: list[dict]) -> int:
+        await self.closed_period_service.ensure_open(
+            *(row["datetime"] for row in rows)
+        )
+        inserted = await run_in_session(
+            self.energy_repository.bulk_insert, rows
+        )
+        await self._invalidate_reports(*(row["datetime"] for row in rows))
+        return inserted
 
-        return round(result, 2)
+    async def _invalidate_reports(self, *datetimes: dt) -> None:
+        years = utc_years(datetimes)
+        report_cache.invalidate("energy", years)
+        await shared_report_cache.invalidate("energy", years)
+        report_view_refresher.schedule()
@@ -1,32 +1,75 @@
 # isort:skip_file
-from typing import Union
+import time
+from datetime import datetime as dt
+from typing import AsyncIterator, Optional, Union
 
 from fastapi import Depends
 from fastapi.encoders import jsonable_encoder
 
 from app.core import get_logger
+from app.infrastructure import (
+    cached_report,
+    report_cache,
+    report_view_refresher,
+    run_in_session,
+    shared_report_cache,
+)
 from app.models import Fuel
 from app.repositories import FuelRepository
-from app.schemas import FuelCreateSchema, FuelUpdateSchema
-from app.utils.errors import AppError, DatabaseError, ErrorType
+from app.services.closed_period import ClosedPeriodService
+from app.schemas import (
+    FuelCreateSchema,
+    FuelFilterSchema,
+    FuelUpdateSchema,
+)
+from app.utils.errors import (
+    AppError,
+    ClosedPeriodError,
+    DatabaseError,
+    ErrorType,
+)
+from app.utils.export import EXPORT_CHUNK_SIZE, rows_to_ndjson
+from app.utils.pagination import decode_cursor, next_cursor
+from app.utils.single_flight import single_flight
+from app.utils.upload import ingest
+from app.utils.years import utc_years
 
 logger = get_logger(__name__)
 
 
 class FuelService:
-    def __init__(self, fuel_repository: FuelRepository = Depends()):
+    def __init__(
+        self,
+        fuel_repository: FuelRepository = Depends(),
+        closed_period_service: ClosedPeriodService = Depends(),
+    ):
         self.fuel_repository = fuel_repository
+        self.closed_period_service = closed_period_service
 
-    def get(self, id: int) -> Union[Fuel, AppError]:
-        event = self.fuel_repository.get(id)
+    async def get(self, id: int) -> Union[Fuel, AppError]:
+        event = await run_in_session(self.fuel_repository.get, id)
         if not event:
             logger.error(f"Fuel not found with id: {id}")
             return None
         return event
 
-    def get_all(self) -> Union[list[Fuel], AppError]:
+    async def get_all(
+        self,
+        filters: FuelFilterSchema,
+        limit: int,
+        cursor: Optional[str] = None,
+    ) -> Union[tuple[list[Fuel], Optional[str]], AppError]:
         try:
-            return self.fuel_repository.get_all()
+            after = decode_cursor(cursor) if cursor else None
+        except ValueError:
+            return AppError(
+                error_type=ErrorType.BAD_REQUEST, message="Invalid cursor"
+            )
+
+        try:
+            fuels = await run_in_session(
+                self.fuel_repository.get_all, filters, limit + 1, after
+            )
         except DatabaseError as err:
             logger.error(f"Error while fetching all Fuels, error: {err}")
             return AppError(
@@ -34,10 +77,28 @@ class FuelService:
                 message="Error while fetching all Fuels",
             )
 
-    def create(self, fuel: FuelCreateSchema) -> Union[Fuel, AppError]:
+        return fuels[:limit], next_cursor(fuels, limit)
+
+    async def export(self, filters: FuelFilterSchema) -> AsyncIterator[bytes]:
+        chunks = self.fuel_repository.stream_all(filters, EXPORT_CHUNK_SIZE)
+        try:
+            while True:
+                chunk = await run_in_session(next, chunks, None)
+                if chunk is None:
+                    return
+                yield rows_to_ndjson(chunk)
+        finally:
+            # Also runs when the client disconnects mid-stream, so the
+            # server-side cursor is not left open until the session closes.
+            await run_in_session(chunks.close)
+
+    async def create(self, fuel: FuelCreateSchema) -> Union[Fuel, AppError]:
         fuel = Fuel(**fuel.dict())
         try:
-            return self.fuel_repository.create(fuel)
+            await self.closed_period_service.ensure_open(fuel.datetime)
+            result = await run_in_session(self.fuel_repository.create, fuel)
+        except ClosedPeriodError as err:
+            return AppError(error_type=ErrorType.CONFLICT, message=str(err))
         except DatabaseError as err:
             logger.error(f"DB Error while creating Fuel, error: {err}")
             return AppError(
@@ -45,17 +106,40 @@ class FuelService:
                 message="Error while creating Fuel",
             )
 
-    def bulk_create(self, fuels: list[FuelCreateSchema]) -> bool:
-        fuels = [Fuel(**event.dict()) for event in fuels]
+        await self._invalidate_reports(fuel.datetime)
+        return result
+
+    async def bulk_create(
+        self, fuels: list[FuelCreateSchema]
+    ) -> Union[dict, AppError]:
+        rows = [fuel.dict() for fuel in fuels]
+        start = time.perf_counter()
         try:
-            return self.fuel_repository.bulk_create(fuels)
+            inserted = await self._insert_rows(rows)
+        except ClosedPeriodError as err:
+            return AppError(error_type=ErrorType.CONFLICT, message=str(err))
         except DatabaseError as err:
-            logger.error(f"DB Error while creating Events, error: {err}")
-            return False
+            logger.error(f"DB Error while creating Fuels, error: {err}")
+            return AppError(
+                error_type=ErrorType.DATASOURCE_ERROR,
+                message="Error while creating Fuels",
+            )
 
-    def update(self, id: int, fuel: FuelUpdateSchema) -> Fuel:
+        return {
+            "inserted": inserted,
+            "elapsed_ms": round((time.perf_counter() - start) * 1000, 3),
+        }
+
+    async def upload(self, records: AsyncIterator[tuple[int, object]]) -> dict:
+        return await ingest(
+            records,
+            FuelCreateSchema,
+            self._insert_rows,
+        )
+
+    async def update(self, id: int, fuel: FuelUpdateSchema) -> Fuel:
         try:
-            fuel_in_db = self.fuel_repository.get(id)
+            fuel_in_db = await run_in_session(self.fuel_repository.get, id)
         except DatabaseError as err:
             logger.error(f"DB Error while fetching Fuel, error: {err}")
             return AppError(
@@ -68,18 +152,35 @@ class FuelService:
                 error_type=ErrorType.NOT_FOUND, message="Fuel not found"
             )
 
+        previous_datetime = fuel_in_db.datetime
         obj_data = jsonable_encoder(fuel_in_db)
         if isinstance(fuel, dict):
             update_data = fuel
         else:
             update_data = fuel.dict(exclude_unset=True)
 
+        try:
+            await self.closed_period_service.ensure_open(
+                previous_datetime, update_data.get("datetime")
+            )
+        except ClosedPeriodError as err:
+            return AppError(error_type=ErrorType.CONFLICT, message=str(err))
+        except DatabaseError as err:
+            logger.error(f"DB Error while updating Fuel, error: {err}")
+            return AppError(
+                error_type=ErrorType.DATASOURCE_ERROR,
+                message="Error while updating Fuel",
+            )
+
         # This is an iterator over the fields of the model to be updated
         for field in obj_data:
             if field in update_data:
                 setattr(fuel_in_db, field, update_data[field])
+        updated_datetime = fuel_in_db.datetime
         try:
-            return self.fuel_repository.update(fuel_in_db)
+            result = await run_in_session(
+                self.fuel_repository.update, fuel_in_db
+            )
         except DatabaseError as err:
             logger.error(f"DB Error while updating Fuel, error: {err}")
             return AppError(
@@ -87,9 +188,12 @@ class FuelService:
                 message="Error while updating Fuel",
             )
 
-    def delete(self, id: str) -> Fuel:
+        await self._invalidate_reports(previous_datetime, updated_datetime)
+        return result
+
+    async def delete(self, id: int) -> Fuel:
         try:
-            fuel_in_db = self.fuel_repository.get(id)
+            fuel_in_db = await run_in_session(self.fuel_repository.get, id)
         except DatabaseError as err:
             logger.error(f"DB Error while fetching Fuel, error: {err}")
             return AppError(
@@ -105,8 +209,14 @@ class FuelService:
                 error_type=ErrorType.NOT_FOUND, message="Fuel not found"
             )
 
+        deleted_datetime = fuel_in_db.datetime
         try:
-            return self.fuel_repository.delete(fuel_in_db)
+            await self.closed_period_service.ensure_open(deleted_datetime)
+            result = await run_in_session(
+                self.fuel_repository.delete, fuel_in_db
+            )
+        except ClosedPeriodError as err:
+            return AppError(error_type=ErrorType.CONFLICT, message=str(err))
         except DatabaseError as err:
             logger.error(f"DB Error while deleting Fuel, error: {err}")
             return AppError(
@@ -114,12 +224,18 @@ class FuelService:
                 message="Error while deleting Fuel",
             )
 
-    def get_consumed_fuel_percentage_by_year(
-        self, year: int
-    ) -> Union[dict, AppError]:
+        await self._invalidate_reports(deleted_datetime)
+        return result
+
+    @single_flight
+    @cached_report("fuel")
+    async def get_consumed_fuel_percentage_by_year(
+        self, years: tuple[int, ...]
+    ) -> Union[dict[int, dict], AppError]:
         try:
-            result = self.fuel_repository.get_consumed_fuel_percentage_by_year(
-                year
+            result = await run_in_session(
+                self.fuel_repository.get_consumed_fuel_percentage_by_year,
+                years,
             )
         except DatabaseError as err:
             logger.error(
@@ -132,11 +248,15 @@ class FuelService:
 
         return result
 
-    def get_average_monthly_consumption(
-        self, year: int
-    ) -> Union[float, AppError]:
+    @single_flight
+    @cached_report("fuel")
+    async def get_average_monthly_consumption(
+        self, years: tuple[int, ...]
+    ) -> Union[dict[int, float], AppError]:
         try:
-            result = self.fuel_repository.get_average_monthly_consumption(year)
+            result = await run_in_session(
+                self.fuel_repository.get_average_monthly_consumption, years
+            )
         except DatabaseError as err:
             logger.error(
                 f"DB Error while fetching consumed fuel by year and fuel type, error: {err}"
@@ -146,16 +266,19 @@ class FuelService:
                 message="Error while fetching consumed fuel by year and fuel type",
             )
 
-        if not result:
-            return 0
-        return round(result, 2)
+        return {
+            year: round(average, 2) if average else 0
+            for year, average in result.items()
+        }
 
-    def get_most_impactful_emission_type(
-        self, year: int
-    ) -> Union[dict[str, int], AppError]:
+    @single_flight
+    @cached_report("fuel")
+    async def get_most_impactful_emission_type(
+        self, years: tuple[int, ...]
+    ) -> Union[dict[int, dict[str, int]], AppError]:
         try:
-            result = self.fuel_repository.get_most_impactful_emission_type(
-                year
+            result = await run_in_session(
+                self.fuel_repository.get_most_impactful_emission_type, years
             )
         except DatabaseError as err:
             logger.error(
@@ -168,11 +291,15 @@ class FuelService:
 
         return result
 
-    def get_min_and_max_fuel_by_year(
-        self, year: int
-    ) -> Union[list[dict], AppError]:
+    @single_flight
+    @cached_report("fuel")
+    async def get_min_and_max_fuel_by_year(
+        self, years: tuple[int, ...]
+    ) -> Union[dict[int, Optional[dict]], AppError]:
         try:
-            result = self.fuel_repository.get_min_and_max_fuel_by_year(year)
+            result = await run_in_session(
+                self.fuel_repository.get_min_and_max_fuel_by_year, years
+            )
         except DatabaseError as err:
             logger.error(
                 f"DB Error while fetching consumed fuel by year and fuel type, error: {err}"
@@ -181,9 +308,41 @@ class FuelService:
                 error_type=ErrorType.DATASOURCE_ERROR,
                 message="Error while fetching consumed fuel by year and fuel type",
             )
-        if not result:
+        # Years without Fuels are null, unless no year has any
+        if not any(result.values()):
             return AppError(
                 error_type=ErrorType.NOT_FOUND,
                 message="No data found for the given year",
             )
         return result
+
+    @single_flight
+    async def get_report_version(
+        self, years: tuple[int, ...]
+    ) -> Union[list[tuple], AppError]:
+        try:
+            versions = await run_in_session(
+                self.fuel_repository.get_version, years
+            )
+        except DatabaseError as err:
+            logger.error(f"DB Error while fetching Fuel version: {err}")
+            return AppError(
+                error_type=ErrorType.DATASOURCE_ERROR,
+                message="Error while fetching Fuel version",
+            )
+
+        return [tuple(version) for version in versions]
+
+    async def _insert_rows(self, rows: list[dict]) -> int:
+        await self.closed_period_service.ensure_open(
+            *(row["datetime"] for row in rows)
+        )
+        inserted = await run_in_session(self.fuel_repository.bulk_insert, rows)
+        await self._invalidate_reports(*(row["datetime"] for row in rows))
+        return inserted
+
+    async def _invalidate_reports(self, *datetimes: dt) -> None:
+        years = utc_years(datetimes)
+        report_cache.invalidate("fuel", years)
+        await shared_report_cache.invalidate("fuel", years)
+        report_view_refresher.schedule()
@@ -1,33 +1,76 @@
 # isort:skip_file
-from typing import Optional, Union
+import time
+from datetime import datetime as dt
+from typing import AsyncIterator, Optional, Union
 
 from fastapi import Depends
 from fastapi.encoders import jsonable_encoder
 
 from app.core import get_logger
+from app.infrastructure import (
+    cached_report,
+    report_cache,
+    report_view_refresher,
+    run_in_session,
+    shared_report_cache,
+)
 from app.models import Oil
 from app.repositories import OilRepository
-from app.schemas import OilCreateSchema, OilUpdateSchema
-from app.utils.errors import AppError, DatabaseError, ErrorType
+from app.services.closed_period import ClosedPeriodService
+from app.schemas import (
+    OilCreateSchema,
+    OilFilterSchema,
+    OilUpdateSchema,
+)
+from app.utils.errors import (
+    AppError,
+    ClosedPeriodError,
+    DatabaseError,
+    ErrorType,
+)
+from app.utils.export import EXPORT_CHUNK_SIZE, rows_to_ndjson
+from app.utils.pagination import decode_cursor, next_cursor
+from app.utils.single_flight import single_flight
+from app.utils.upload import ingest
+from app.utils.years import utc_years
 from app.definitions import OilType
 
 logger = get_logger(__name__)
 
 
 class OilService:
-    def __init__(self, oil_repository: OilRepository = Depends()):
+    def __init__(
+        self,
+        oil_repository: OilRepository = Depends(),
+        closed_period_service: ClosedPeriodService = Depends(),
+    ):
         self.oil_repository = oil_repository
+        self.closed_period_service = closed_period_service
 
-    def get(self, id: int) -> Union[Oil, AppError]:
-        event = self.oil_repository.get(id)
+    async def get(self, id: int) -> Union[Oil, AppError]:
+        event = await run_in_session(self.oil_repository.get, id)
         if not event:
             logger.error(f"Oil not found with id: {id}")
             return None
         return event
 
-    def get_all(self) -> Union[list[Oil], AppError]:
+    async def get_all(
+        self,
+        filters: OilFilterSchema,
+        limit: int,
+        cursor: Optional[str] = None,
+    ) -> Union[tuple[list[Oil], Optional[str]], AppError]:
         try:
-            return self.oil_repository.get_all()
+            after = decode_cursor(cursor) if cursor else None
+        except ValueError:
+            return AppError(
+                error_type=ErrorType.BAD_REQUEST, message="Invalid cursor"
+            )
+
+        try:
+            oils = await run_in_session(
+                self.oil_repository.get_all, filters, limit + 1, after
+            )
         except DatabaseError as err:
             logger.error(f"Error while fetching all Oils, error: {err}")
             return AppError(
@@ -35,10 +78,28 @@ class OilService:
                 message="DB Error while fetching all Oils",
             )
 
-    def create(self, oil: OilCreateSchema) -> Union[Oil, AppError]:
+        return oils[:limit], next_cursor(oils, limit)
+
+    async def export(self, filters: OilFilterSchema) -> AsyncIterator[bytes]:
+        chunks = self.oil_repository.stream_all(filters, EXPORT_CHUNK_SIZE)
+        try:
+            while True:
+                chunk = await run_in_session(next, chunks, None)
+                if chunk is None:
+                    return
+                yield rows_to_ndjson(chunk)
+        finally:
+            # Also runs when the client disconnects mid-stream, so the
+            # server-side cursor is not left open until the session closes.
+            await run_in_session(chunks.close)
+
+    async def create(self, oil: OilCreateSchema) -> Union[Oil, AppError]:
         oil = Oil(**oil.dict())
         try:
-            return self.oil_repository.create(oil)
+            await self.closed_period_service.ensure_open(oil.datetime)
+            result = await run_in_session(self.oil_repository.create, oil)
+        except ClosedPeriodError as err:
+            return AppError(error_type=ErrorType.CONFLICT, message=str(err))
         except DatabaseError as err:
             logger.error(f"DB Error while creating Oil, error: {err}")
             return AppError(
@@ -46,17 +107,40 @@ class OilService:
                 message="Error while creating Oil",
             )
 
-    def bulk_create(self, oils: list[OilCreateSchema]) -> bool:
-        oils = [Oil(**event.dict()) for event in oils]
+        await self._invalidate_reports(oil.datetime)
+        return result
+
+    async def bulk_create(
+        self, oils: list[OilCreateSchema]
+    ) -> Union[dict, AppError]:
+        rows = [oil.dict() for oil in oils]
+        start = time.perf_counter()
         try:
-            return self.oil_repository.bulk_create(oils)
+            inserted = await self._insert_rows(rows)
+        except ClosedPeriodError as err:
+            return AppError(error_type=ErrorType.CONFLICT, message=str(err))
         except DatabaseError as err:
-            logger.error(f"DB Error while creating Events, error: {err}")
-            return False
+            logger.error(f"DB Error while creating Oils, error: {err}")
+            return AppError(
+                error_type=ErrorType.DATASOURCE_ERROR,
+                message="Error while creating Oils",
+            )
+
+        return {
+            "inserted": inserted,
+            "elapsed_ms": round((time.perf_counter() - start) * 1000, 3),
+        }
 
-    def update(self, id: int, oil: OilUpdateSchema) -> Oil:
+    async def upload(self, records: AsyncIterator[tuple[int, object]]) -> dict:
+        return await ingest(
+            records,
+            OilCreateSchema,
+            self._insert_rows,
+        )
+
+    async def update(self, id: int, oil: OilUpdateSchema) -> Oil:
         try:
-            oil_in_db = self.oil_repository.get(id)
+            oil_in_db = await run_in_session(self.oil_repository.get, id)
         except DatabaseError as err:
             logger.error(f"DB Error while fetching Oil, error: {err}")
             return AppError(
@@ -69,18 +153,35 @@ class OilService:
                 error_type=ErrorType.NOT_FOUND, message="Oil not found"
             )
 
+        previous_datetime = oil_in_db.datetime
         obj_data = jsonable_encoder(oil_in_db)
         if isinstance(oil, dict):
             update_data = oil
         else:
             update_data = oil.dict(exclude_unset=True)
 
+        try:
+            await self.closed_period_service.ensure_open(
+                previous_datetime, update_data.get("datetime")
+            )
+        except ClosedPeriodError as err:
+            return AppError(error_type=ErrorType.CONFLICT, message=str(err))
+        except DatabaseError as err:
+            logger.error(f"DB Error while updating Oil, error: {err}")
+            return AppError(
+                error_type=ErrorType.DATASOURCE_ERROR,
+                message="Error while updating Oil",
+            )
+
         # This is an iterator over the fields of the model to be updated
         for field in obj_data:
             if field in update_data:
                 setattr(oil_in_db, field, update_data[field])
+        updated_datetime = oil_in_db.datetime
         try:
-            return self.oil_repository.update(oil_in_db)
+            result = await run_in_session(
+                self.oil_repository.update, oil_in_db
+            )
         except DatabaseError as err:
             logger.error(f"DB Error while updating Oil, error: {err}")
             return AppError(
@@ -88,9 +189,12 @@ class OilService:
                 message="Error while updating Oil",
             )
 
-    def delete(self, id: str) -> Oil:
+        await self._invalidate_reports(previous_datetime, updated_datetime)
+        return result
+
+    async def delete(self, id: int) -> Oil:
         try:
-            oil_in_db = self.oil_repository.get(id)
+            oil_in_db = await run_in_session(self.oil_repository.get, id)
         except DatabaseError as err:
             logger.error(f"DB Error while fetching Oil, error: {err}")
             return AppError(
@@ -106,8 +210,14 @@ class OilService:
                 error_type=ErrorType.NOT_FOUND, message="Oil not found"
             )
 
+        deleted_datetime = oil_in_db.datetime
         try:
-            return self.oil_repository.delete(oil_in_db)
+            await self.closed_period_service.ensure_open(deleted_datetime)
+            result = await run_in_session(
+                self.oil_repository.delete, oil_in_db
+            )
+        except ClosedPeriodError as err:
+            return AppError(error_type=ErrorType.CONFLICT, message=str(err))
         except DatabaseError as err:
             logger.error(f"DB Error while deleting Oil, error: {err}")
             return AppError(
@@ -115,14 +225,21 @@ class OilService:
                 message="Error while deleting Oil",
             )
 
-    def get_monthly_consumption_by_type_and_year(
-        self, year: int, oil_type: Optional[OilType] = OilType.ACEITE
-    ) -> Union[dict[str, int], AppError]:
+        await self._invalidate_reports(deleted_datetime)
+        return result
+
+    @single_flight
+    @cached_report("oil")
+    async def get_monthly_consumption_by_type_and_year(
+        self,
+        years: tuple[int, ...],
+        oil_type: Optional[OilType] = OilType.ACEITE,
+    ) -> Union[dict[int, dict[int, float]], AppError]:
         try:
-            return (
-                self.oil_repository.get_monthly_consumption_by_type_and_year(
-                    year, oil_type
-                )
+            result = await run_in_session(
+                self.oil_repository.get_monthly_consumption_by_type_and_year,
+                years,
+                oil_type,
             )
         except DatabaseError as err:
             logger.error(
@@ -133,12 +250,24 @@ class OilService:
                 message="Error while fetching monthly consumption",
             )
 
-    def get_min_loss_by_type_and_year(
-        self, year: int, oil_type: Optional[OilType] = OilType.REFRIGERANTE
-    ) -> Union[dict[str, int], AppError]:
+        # Keyed by month number, as the route has always answered
+        return {
+            year: dict(enumerate(values, start=1))
+            for year, values in result.items()
+        }
+
+    @single_flight
+    @cached_report("oil")
+    async def get_min_loss_by_type_and_year(
+        self,
+        years: tuple[int, ...],
+        oil_type: Optional[OilType] = OilType.REFRIGERANTE,
+    ) -> Union[dict[int, Optional[str]], AppError]:
         try:
-            result = self.oil_repository.get_min_loss_by_type_and_year(
-                year, oil_type
+            result = await run_in_session(
+                self.oil_repository.get_min_loss_by_type_and_year,
+                years,
+                oil_type,
             )
         except DatabaseError as err:
             logger.error(f"DB Error while fetching min lost, error: {err}")
@@ -147,10 +276,42 @@ class OilService:
                 message="Error while fetching min lost",
             )
 
-        if not result:
+        # Years without Oils are null, unless no year has any
+        if not any(result.values()):
             return AppError(
                 error_type=ErrorType.NOT_FOUND,
                 message="Min loss not found for requested year",
             )
 
         return result
+
+    @single_flight
+    async def get_report_version(
+        self, years: tuple[int, ...]
+    ) -> Union[list[tuple], AppError]:
+        try:
+            versions = await run_in_session(
+                self.oil_repository.get_version, years
+            )
+        except DatabaseError as err:
+            logger.error(f"DB Error while fetching Oil version: {err}")
+            return AppError(
+                error_type=ErrorType.DATASOURCE_ERROR,
+                message="Error while fetching Oil version",
+            )
+
+        return [tuple(version) for version in versions]
+
+    async def _insert_rows(self, rows: list[dict]) -> int:
+        await self.closed_period_service.ensure_open(
+            *(row["datetime"] for row in rows)
+        )
+        inserted = await run_in_session(self.oil_repository.bulk_insert, rows)
+        await self._invalidate_reports(*(row["datetime"] for row in rows))
+        return inserted
+
+    async def _invalidate_reports(self, *datetimes: dt) -> None:
+        years = utc_years(datetimes)
+        report_cache.invalidate("oil", years)
+        await shared_report_cache.invalidate("oil", years)
+        report_view_refresher.schedule()
@@ -4,32 +4,59 @@ from typing import Optional, Union
 from fastapi import Depends
 
 from app.core import get_logger
-from app.repositories import FuelRepository, EnergyRepository
-from app.repositories.oil_repo import OilRepository
+from app.definitions.general import EmissionType, OilType
+from app.infrastructure import cached_report, run_in_session
+from app.repositories import ReportRepository
 
 # from app.schemas import FuelCreateSchema, FuelUpdateSchema
 from app.utils.errors import AppError, DatabaseError, ErrorType
+from app.utils.single_flight import single_flight
 
 logger = get_logger(__name__)
 
+# The domains the reports of the service are read from
+DOMAINS = ("fuel", "oil", "energy", "roadtrip")
 
+
+# Every report reads all of its domains in one statement over the emission
+# view, so its latency is one query whatever the number of domains.
 class ReportService:
     def __init__(
         self,
-        fuel_repository: FuelRepository = Depends(),
-        oil_repository: OilRepository = Depends(),
-        energy_repository: EnergyRepository = Depends(),
+        report_repository: ReportRepository = Depends(),
     ):
-        self.fuel_repository = fuel_repository
-        self.oil_repository = oil_repository
-        self.energy_repository = energy_repository
+        self.report_repository = report_repository
+
+    @single_flight
+    async def get_report_version(
+        self, years: tuple[int, ...], *domains: str
+    ) -> Union[list[tuple], AppError]:
+        # Only the domains the report reads, a write to another one does not
+        # change it
+        try:
+            versions = await run_in_session(
+                self.report_repository.get_version, domains or DOMAINS, years
+            )
+        except DatabaseError as err:
+            logger.error(f"Error while fetching report versions: {err}")
+            return AppError(
+                error_type=ErrorType.DATASOURCE_ERROR,
+                message="Error while fetching report versions",
+            )
+
+        return [tuple(version) for version in versions]
 
-    def get_comparative_energy_fuel_by_year(
-        self, year: int
-    ) -> Union[dict[str, float], AppError]:
+    @single_flight
+    @cached_report("fuel", "energy")
+    async def get_comparative_energy_fuel_by_year(
+        self, years: tuple[int, ...]
+    ) -> Union[dict[int, Optional[dict[str, float]]], AppError]:
         try:
-            fuel_sum = self.fuel_repository.get_fuel_sum_by_year(year)
-            energy_sum = self.energy_repository.get_energy_sum_by_year(year)
+            sums = await run_in_session(
+                self.report_repository.get_sum_by_domain,
+                ("fuel", "energy"),
+                years,
+            )
         except DatabaseError as err:
             logger.error(f"Error while fetching all Fuels, error: {err}")
             return AppError(
@@ -37,37 +64,41 @@ class ReportService:
                 message="Error while fetching all Fuels",
             )
 
-        if fuel_sum is None:
-            fuel_sum = 0
-
-        if energy_sum is None:
-            energy_sum = 0
+        result = {}
+        for year in years:
+            fuel_sum = sums[year]["fuel"] or 0
+            energy_sum = sums[year]["energy"] or 0
+            total = fuel_sum + energy_sum
+            # Years without data are null, unless no year has any
+            result[year] = (
+                {
+                    "COMBUSTIBLE": round(fuel_sum / total, 2),
+                    "ENERGIA": round(energy_sum / total, 2),
+                }
+                if total
+                else None
+            )
 
-        try:
-            fuel_percentage = fuel_sum / (fuel_sum + energy_sum)
-            energy_percentage = energy_sum / (fuel_sum + energy_sum)
-        except Exception as err:
-            logger.error(f"Error while calculating percentages, error: {err}")
+        if not any(result.values()):
+            logger.error(f"No Fuels nor Energies found for years {years}")
             return AppError(
                 error_type=ErrorType.NOT_FOUND,
                 message="No data found for requested year",
             )
 
-        return {
-            "COMBUSTIBLE": round(fuel_percentage, 2),
-            "ENERGIA": round(energy_percentage, 2),
-        }
+        return result
 
-    def get_average_consumption_by_year(
-        self, year: int
-    ) -> Union[dict[str, float], AppError]:
+    @single_flight
+    @cached_report("fuel", "oil")
+    async def get_average_consumption_by_year(
+        self, years: tuple[int, ...]
+    ) -> Union[dict[int, dict[str, float]], AppError]:
         try:
-            fuel_average: Optional[
-                int
-            ] = self.fuel_repository.get_average_monthly_consumption(year)
-            oil_average: dict[
-                str, int
-            ] = self.oil_repository.get_average_compsution_for_every_type(year)
+            averages = await run_in_session(
+                self.report_repository.get_average_by_domain,
+                {"fuel": None, "oil": OilType},
+                years,
+            )
         except DatabaseError as err:
             logger.error(
                 f"Error while fetching all average consumption for every oil type, error: {err}"
@@ -77,10 +108,47 @@ class ReportService:
                 message="Error while fetching all average consumption for every oil type",
             )
 
-        if fuel_average is None:
-            fuel_average = 0
+        return {
+            year: {
+                # Every oil type at 0 for a year without Oils
+                **(
+                    {
+                        oil_type: round(average, 2)
+                        for oil_type, average in averages[year]["oil"].items()
+                    }
+                    or dict.fromkeys((OilType.ACEITE, OilType.REFRIGERANTE), 0)
+                ),
+                "COMBUSTIBLE": round(averages[year]["fuel"] or 0, 2),
+            }
+            for year in years
+        }
+
+    @single_flight
+    @cached_report(*DOMAINS)
+    async def get_consumption_by_emission_type(
+        self, years: tuple[int, ...]
+    ) -> Union[dict[int, dict[EmissionType, dict[str, float]]], AppError]:
+        try:
+            result = await run_in_session(
+                self.report_repository.get_sum_by_emission_type,
+                DOMAINS,
+                years,
+            )
+        except DatabaseError as err:
+            logger.error(
+                f"Error while fetching consumption by emission type, error: {err}"
+            )
+            return AppError(
+                error_type=ErrorType.DATASOURCE_ERROR,
+                message="Error while fetching consumption by emission type",
+            )
 
         return {
-            **oil_average,
-            "COMBUSTIBLE": round(fuel_average, 2),
+            year: {
+                emission_type: {
+                    domain: round(total, 2) for domain, total in totals.items()
+                }
+                for emission_type, totals in by_type.items()
+            }
+            for year, by_type in result.items()
         }
@@ -1,32 +1,75 @@
 # isort:skip_file
-from typing import Union
+import time
+from datetime import datetime as dt
+from typing import AsyncIterator, Optional, Union
 
 from fastapi import Depends
 from fastapi.encoders import jsonable_encoder
 
 from app.core import get_logger
+from app.infrastructure import (
+    cached_report,
+    report_cache,
+    report_view_refresher,
+    run_in_session,
+    shared_report_cache,
+)
 from app.models import Roadtrip
 from app.repositories import RoadtripRepository
-from app.schemas import RoadtripCreateSchema, RoadtripUpdateSchema
-from app.utils.errors import AppError, DatabaseError, ErrorType
+from app.services.closed_period import ClosedPeriodService
+from app.schemas import (
+    RoadtripCreateSchema,
+    RoadtripFilterSchema,
+    RoadtripUpdateSchema,
+)
+from app.utils.errors import (
+    AppError,
+    ClosedPeriodError,
+    DatabaseError,
+    ErrorType,
+)
+from app.utils.export import EXPORT_CHUNK_SIZE, rows_to_ndjson
+from app.utils.pagination import decode_cursor, next_cursor
+from app.utils.single_flight import single_flight
+from app.utils.upload import ingest
+from app.utils.years import utc_years
 
 logger = get_logger(__name__)
 
 
 class RoadtripService:
-    def __init__(self, roadtrip_repository: RoadtripRepository = Depends()):
+    def __init__(
+        self,
+        roadtrip_repository: RoadtripRepository = Depends(),
+        closed_period_service: ClosedPeriodService = Depends(),
+    ):
         self.roadtrip_repository = roadtrip_repository
+        self.closed_period_service = closed_period_service
 
-    def get(self, id: int) -> Union[Roadtrip, AppError]:
-        event = self.roadtrip_repository.get(id)
+    async def get(self, id: int) -> Union[Roadtrip, AppError]:
+        event = await run_in_session(self.roadtrip_repository.get, id)
         if not event:
             logger.error(f"Roadtrip not found with id: {id}")
             return None
         return event
 
-    def get_all(self) -> Union[list[Roadtrip], AppError]:
+    async def get_all(
+        self,
+        filters: RoadtripFilterSchema,
+        limit: int,
+        cursor: Optional[str] = None,
+    ) -> Union[tuple[list[Roadtrip], Optional[str]], AppError]:
         try:
-            return self.roadtrip_repository.get_all()
+            after = decode_cursor(cursor) if cursor else None
+        except ValueError:
+            return AppError(
+                error_type=ErrorType.BAD_REQUEST, message="Invalid cursor"
+            )
+
+        try:
+            roadtrips = await run_in_session(
+                self.roadtrip_repository.get_all, filters, limit + 1, after
+            )
         except DatabaseError as err:
             logger.error(f"Error while fetching all Roadtrips, error: {err}")
             return AppError(
@@ -34,12 +77,36 @@ class RoadtripService:
                 message="DB Error while fetching all Roadtrips",
             )
 
-    def create(
+        return roadtrips[:limit], next_cursor(roadtrips, limit)
+
+    async def export(
+        self, filters: RoadtripFilterSchema
+    ) -> AsyncIterator[bytes]:
+        chunks = self.roadtrip_repository.stream_all(
+            filters, EXPORT_CHUNK_SIZE
+        )
+        try:
+            while True:
+                chunk = await run_in_session(next, chunks, None)
+                if chunk is None:
+                    return
+                yield rows_to_ndjson(chunk)
+        finally:
+            # Also runs when the client disconnects mid-stream, so the
+            # server-side cursor is not left open until the session closes.
+            await run_in_session(chunks.close)
+
+    async def create(
         self, roadtrip: RoadtripCreateSchema
     ) -> Union[Roadtrip, AppError]:
         roadtrip = Roadtrip(**roadtrip.dict())
         try:
-            return self.roadtrip_repository.create(roadtrip)
+            await self.closed_period_service.ensure_open(roadtrip.datetime)
+            result = await run_in_session(
+                self.roadtrip_repository.create, roadtrip
+            )
+        except ClosedPeriodError as err:
+            return AppError(error_type=ErrorType.CONFLICT, message=str(err))
         except DatabaseError as err:
             logger.error(f"DB Error while creating Roadtrip, error: {err}")
             return AppError(
@@ -47,17 +114,44 @@ class RoadtripService:
                 message="Error while creating Roadtrip",
             )
 
-    def bulk_create(self, roadtrips: list[RoadtripCreateSchema]) -> bool:
-        roadtrips = [Roadtrip(**event.dict()) for event in roadtrips]
+        await self._invalidate_reports(roadtrip.datetime)
+        return result
+
+    async def bulk_create(
+        self, roadtrips: list[RoadtripCreateSchema]
+    ) -> Union[dict, AppError]:
+        rows = [roadtrip.dict() for roadtrip in roadtrips]
+        start = time.perf_counter()
         try:
-            return self.roadtrip_repository.bulk_create(roadtrips)
+            inserted = await self._insert_rows(rows)
+        except ClosedPeriodError as err:
+            return AppError(error_type=ErrorType.CONFLICT, message=str(err))
         except DatabaseError as err:
-            logger.error(f"DB Error while creating Events, error: {err}")
-            return False
+            logger.error(f"DB Error while creating Roadtrips, error: {err}")
+            return AppError(
+                error_type=ErrorType.DATASOURCE_ERROR,
+                message="Error while creating Roadtrips",
+            )
+
+        return {
+            "inserted": inserted,
+            "elapsed_ms": round((time.perf_counter() - start) * 1000, 3),
+        }
+
+    async def upload(self, records: AsyncIterator[tuple[int, object]]) -> dict:
+        return await ingest(
+            records,
+            RoadtripCreateSchema,
+            self._insert_rows,
+        )
 
-    def update(self, id: int, roadtrip: RoadtripUpdateSchema) -> Roadtrip:
+    async def update(
+        self, id: int, roadtrip: RoadtripUpdateSchema
+    ) -> Roadtrip:
         try:
-            roadtrip_in_db = self.roadtrip_repository.get(id)
+            roadtrip_in_db = await run_in_session(
+                self.roadtrip_repository.get, id
+            )
         except DatabaseError as err:
             logger.error(f"DB Error while fetching Roadtrip, error: {err}")
             return AppError(
@@ -70,18 +164,35 @@ class RoadtripService:
                 error_type=ErrorType.NOT_FOUND, message="Roadtrip not found"
             )
 
+        previous_datetime = roadtrip_in_db.datetime
         obj_data = jsonable_encoder(roadtrip_in_db)
         if isinstance(roadtrip, dict):
             update_data = roadtrip
         else:
             update_data = roadtrip.dict(exclude_unset=True)
 
+        try:
+            await self.closed_period_service.ensure_open(
+                previous_datetime, update_data.get("datetime")
+            )
+        except ClosedPeriodError as err:
+            return AppError(error_type=ErrorType.CONFLICT, message=str(err))
+        except DatabaseError as err:
+            logger.error(f"DB Error while updating Roadtrip, error: {err}")
+            return AppError(
+                error_type=ErrorType.DATASOURCE_ERROR,
+                message="Error while updating Roadtrip",
+            )
+
         # This is an iterator over the fields of the model to be updated
         for field in obj_data:
             if field in update_data:
                 setattr(roadtrip_in_db, field, update_data[field])
+        updated_datetime = roadtrip_in_db.datetime
         try:
-            return self.roadtrip_repository.update(roadtrip_in_db)
+            result = await run_in_session(
+                self.roadtrip_repository.update, roadtrip_in_db
+            )
         except DatabaseError as err:
             logger.error(f"DB Error while updating Roadtrip, error: {err}")
             return AppError(
@@ -89,9 +200,14 @@ class RoadtripService:
                 message="Error while updating Roadtrip",
             )
 
-    def delete(self, id: str) -> Roadtrip:
+        await self._invalidate_reports(previous_datetime, updated_datetime)
+        return result
+
+    async def delete(self, id: int) -> Roadtrip:
         try:
-            roadtrip_in_db = self.roadtrip_repository.get(id)
+            roadtrip_in_db = await run_in_session(
+                self.roadtrip_repository.get, id
+            )
         except DatabaseError as err:
             logger.error(f"DB Error while fetching Roadtrip, error: {err}")
             return AppError(
@@ -107,8 +223,14 @@ class RoadtripService:
                 error_type=ErrorType.NOT_FOUND, message="Roadtrip not found"
             )
 
+        deleted_datetime = roadtrip_in_db.datetime
         try:
-            return self.roadtrip_repository.delete(roadtrip_in_db)
+            await self.closed_period_service.ensure_open(deleted_datetime)
+            result = await run_in_session(
+                self.roadtrip_repository.delete, roadtrip_in_db
+            )
+        except ClosedPeriodError as err:
+            return AppError(error_type=ErrorType.CONFLICT, message=str(err))
         except DatabaseError as err:
             logger.error(f"DB Error while deleting Roadtrip, error: {err}")
             return AppError(
@@ -116,10 +238,18 @@ class RoadtripService:
                 message="Error while deleting Roadtrip",
             )
 
-    def get_average_monthly_comparative_percentage(self, year: int):
+        await self._invalidate_reports(deleted_datetime)
+        return result
+
+    @single_flight
+    @cached_report("roadtrip")
+    async def get_average_monthly_comparative_percentage(
+        self, years: tuple[int, ...]
+    ):
         try:
-            return self.roadtrip_repository.get_average_monthly_comparative_percentage(
-                year
+            return await run_in_session(
+                self.roadtrip_repository.get_average_monthly_comparative_percentage,
+                years,
             )
         except DatabaseError as err:
             logger.error(
@@ -129,3 +259,36 @@ class RoadtripService:
                 error_type=ErrorType.DATASOURCE_ERROR,
                 message="Error while getting average monthly comparative percentage",
             )
+
+    @single_flight
+    async def get_report_version(
+        self, years: tuple[int, ...]
+    ) -> Union[list[tuple], AppError]:
+        try:
+            versions = await run_in_session(
+                self.roadtrip_repository.get_version, years
+            )
+        except DatabaseError as err:
+            logger.error(f"DB Error while fetching Roadtrip version: {err}")
+            return AppError(
+                error_type=ErrorType.DATASOURCE_ERROR,
+                message="Error while fetching Roadtrip version",
+            )
+
+        return [tuple(version) for version in versions]
+
+    async def _insert_rows(self, rows: list[dict]) -> int:
+        await self.closed_period_service.ensure_open(
+            *(row["datetime"] for row in rows)
+        )
+        inserted = await run_in_session(
+            self.roadtrip_repository.bulk_insert, rows
+        )
+        await self._invalidate_reports(*(row["datetime"] for row in rows))
+        return inserted
+
+    async def _invalidate_reports(self, *datetimes: dt) -> None:
+        years = utc_years(datetimes)
+        report_cache.invalidate("roadtrip", years)
+        await shared_report_cache.invalidate("roadtrip", years)
+        report_view_refresher.schedule()
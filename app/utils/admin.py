@@ -0,0 +1,33 @@
+import secrets
+from typing import Optional
+
+from fastapi import Header, HTTPException, status
+
+from app.core.config import get_app_settings
+
+app_settings = get_app_settings()
+
+
+def require_admin(x_admin_token: Optional[str] = Header(None)) -> None:
+    """
+    Guard of the routes changing data for good and of the internal routes,
+    dependency of the route or of its router.
+
+    Raises
+    ------
+    `HTTPException`
+        403 if `ADMIN_TOKEN` is not set or the `X-Admin-Token` header does
+        not match it
+    """
+    token = app_settings.ADMIN_TOKEN
+    if (
+        token is None
+        or x_admin_token is None
+        or not secrets.compare_digest(
+            x_admin_token.encode(), token.get_secret_value().encode()
+        )
+    ):
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="A valid X-Admin-Token header is required",
+        )
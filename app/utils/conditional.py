@@ -0,0 +1,136 @@
+import hashlib
+import inspect
+from contextvars import ContextVar
+from datetime import timezone
+from email.utils import format_datetime
+from functools import wraps
+from typing import Any, Awaitable, Callable, Optional
+
+from fastapi import Request, Response
+
+from app.core.config import get_app_settings
+from app.utils.errors import AppError
+
+app_settings = get_app_settings()
+
+REQUEST_PARAMETER = "conditional_request"
+
+# `ETag` of the data the current request reports on, part of the in-process
+# report cache key so a worker never serves a report older than the `ETag`
+report_version: ContextVar[Optional[str]] = ContextVar(
+    "report_version", default=None
+)
+
+
+def _etag(name: str, versions: list[tuple]) -> str:
+    digest = hashlib.blake2b(
+        repr((name, versions)).encode(), digest_size=16
+    ).hexdigest()
+    return f'"{digest}"'
+
+
+def _matches(if_none_match: str, etag: str) -> bool:
+    # Weak comparison, as RFC 9110 asks for `If-None-Match`
+    if if_none_match.strip() == "*":
+        return True
+    return any(
+        candidate.strip().removeprefix("W/") == etag
+        for candidate in if_none_match.split(",")
+    )
+
+
+def conditional_report(
+    service: str, *domains: str
+) -> Callable[[Callable[..., Awaitable[Response]]], Callable[..., Any]]:
+    """
+    Answer a yearly report route with 304 when the client's copy is current.
+
+    Before the report runs, the service's `get_report_version(years)` reads
+    the row count and last change of the tables the report reads in each
+    year asked for, which the `ETag` is derived from. A matching
+    `If-None-Match` is answered with 304 without running the aggregate,
+    otherwise the response gets the `ETag` and `Last-Modified` headers. When
+    the reports are read from the materialized view, the version is the one
+    of the view and `X-Report-Refreshed-At` tells how stale the report may
+    be.
+
+    The version is read before the report, so a write committing in
+    between at worst sends a newer report under an older `ETag`, which the
+    next poll replaces. `If-Modified-Since` is not honoured because a
+    delete does not move `Last-Modified`.
+
+    Parameters
+    ----------
+    `service` : str
+        Name of the route parameter holding the report service
+    `domains` : str
+        The domains the report reads, for a service reporting on several,
+        passed on to its `get_report_version`
+
+    Returns
+    -------
+    `Callable`
+        Decorator for a route taking a `ReportYears` `years` parameter
+    """
+
+    def decorator(
+        func: Callable[..., Awaitable[Response]]
+    ) -> Callable[..., Any]:
+        name = f"{func.__module__}.{func.__name__}"
+        signature = inspect.signature(func)
+
+        @wraps(func)
+        async def wrapper(**kwargs) -> Response:
+            request: Request = kwargs.pop(REQUEST_PARAMETER)
+            versions = await kwargs[service].get_report_version(
+                kwargs["years"].years, *domains
+            )
+            if isinstance(versions, AppError):
+                return await func(**kwargs)
+
+            if app_settings.REPORT_SOURCE == "matview":
+                # The refresh time of the view is no change of its data
+                tagged = [version[:-1] for version in versions]
+            else:
+                tagged = versions
+            headers = {
+                "ETag": _etag(name, tagged),
+                "Cache-Control": "no-cache",
+            }
+            modified = [version[-1] for version in versions if version[-1]]
+            if modified:
+                headers["Last-Modified"] = format_datetime(
+                    max(modified).astimezone(timezone.utc), usegmt=True
+                )
+                if app_settings.REPORT_SOURCE == "matview":
+                    # The view refresh the report is as old as, later
+                    # writes are not in it yet
+                    headers["X-Report-Refreshed-At"] = headers["Last-Modified"]
+
+            if_none_match = request.headers.get("if-none-match")
+            if if_none_match and _matches(if_none_match, headers["ETag"]):
+                return Response(status_code=304, headers=headers)
+
+            token = report_version.set(headers["ETag"])
+            try:
+                response = await func(**kwargs)
+            finally:
+                report_version.reset(token)
+            if response.status_code == 200:
+                response.headers.update(headers)
+            return response
+
+        # FastAPI reads the parameters from the signature, add the request
+        wrapper.__signature__ = signature.replace(
+            parameters=[
+                *signature.parameters.values(),
+                inspect.Parameter(
+                    REQUEST_PARAMETER,
+                    inspect.Parameter.KEYWORD_ONLY,
+                    annotation=Request,
+                ),
+            ]
+        )
+        return wrapper
+
+    return decorator
@@ -1,3 +1,4 @@
+import re
 from enum import Enum
 from typing import Optional
 
@@ -9,6 +10,7 @@ from sqlalchemy import exc
 class ErrorType(Enum):
     BAD_REQUEST = status.HTTP_400_BAD_REQUEST
     NOT_FOUND = status.HTTP_404_NOT_FOUND
+    CONFLICT = status.HTTP_409_CONFLICT
     DATASOURCE_ERROR = status.HTTP_500_INTERNAL_SERVER_ERROR
     INTERNAL_SERVER_ERROR = status.HTTP_500_INTERNAL_SERVER_ERROR
 
@@ -39,11 +41,41 @@ class DatabaseError(Exception):
         self.error_code = error_code
 
 
+class ClosedPeriodError(Exception):
+    def __init__(self, years: set[int]):
+        super().__init__(
+            "Closed years can not be changed: "
+            + ", ".join(str(year) for year in sorted(years))
+        )
+        self.years = years
+
+
+# Message of the `closed_year` trigger of the domain tables
+CLOSED_YEAR_MESSAGE = re.compile(r"Closed years can not be changed: (\d+)")
+
+
+def closed_period_error(
+    err: exc.SQLAlchemyError,
+) -> Optional[ClosedPeriodError]:
+    """
+    The `ClosedPeriodError` of a write the database rejected because its
+    year is closed, None for any other error.
+    """
+    match = CLOSED_YEAR_MESSAGE.search(str(getattr(err, "orig", "")))
+    if match is None:
+        return None
+    return ClosedPeriodError({int(match.group(1))})
+
+
 def handle_database_error(func: callable):
     def wrapper(*args, **kwargs):
         try:
             return func(*args, **kwargs)
         except exc.SQLAlchemyError as err:
+            closed = closed_period_error(err)
+            if closed is not None:
+                raise closed from err
+
             error_code = None
             # sqlstate = None
             # # Get the SQLSTATE error code
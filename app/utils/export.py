@@ -0,0 +1,36 @@
+from typing import Sequence
+
+import orjson
+from sqlalchemy.engine import Row
+from sqlmodel import SQLModel
+
+# Rows fetched from the server-side cursor and written per response chunk
+EXPORT_CHUNK_SIZE = 1000
+
+
+def rows_to_ndjson(rows: Sequence[Row]) -> bytes:
+    """
+    Serialize `rows` as newline-delimited JSON, one object per row.
+    """
+    return b"".join(
+        orjson.dumps(dict(row._mapping), option=orjson.OPT_APPEND_NEWLINE)
+        for row in rows
+    )
+
+
+def models_to_json(models: Sequence[SQLModel]) -> bytes:
+    """
+    Serialize table `models` as a JSON array, like their `response_model`.
+
+    Rows read from the database are valid already, so they are not
+    validated and encoded again one by one the way FastAPI would.
+    """
+    if not models:
+        return b"[]"
+    fields = list(type(models[0]).__fields__)
+    return orjson.dumps(
+        [
+            {field: getattr(model, field) for field in fields}
+            for model in models
+        ]
+    )
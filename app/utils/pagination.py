@@ -0,0 +1,83 @@
+import base64
+import json
+from datetime import datetime as dt
+from typing import Optional, Sequence, Union
+
+from sqlalchemy import tuple_
+from sqlmodel.sql.expression import Select, SelectOfScalar
+
+DEFAULT_PAGE_SIZE = 100
+MAX_PAGE_SIZE = 1000
+
+
+def encode_cursor(datetime: dt, id: int) -> str:
+    """
+    Build the opaque token pointing right after the row `(datetime, id)`.
+    """
+    payload = json.dumps([datetime.isoformat(), id])
+    return base64.urlsafe_b64encode(payload.encode()).decode()
+
+
+def decode_cursor(cursor: str) -> tuple[dt, int]:
+    """
+    Read a token built by `encode_cursor`.
+
+    Raises
+    ------
+    `ValueError`
+        If the token was not built by `encode_cursor`
+    """
+    try:
+        datetime, id = json.loads(base64.urlsafe_b64decode(cursor.encode()))
+        return dt.fromisoformat(datetime), int(id)
+    except (TypeError, ValueError) as err:
+        raise ValueError(f"Invalid cursor: {cursor}") from err
+
+
+def paginate(
+    statement: Union[Select, SelectOfScalar],
+    model,
+    limit: Optional[int] = None,
+    after: Optional[tuple[dt, int]] = None,
+) -> Union[Select, SelectOfScalar]:
+    """
+    Order `statement` by `(datetime, id)` and seek past the `after` row.
+
+    Unlike `OFFSET`, the seek is answered from the `(datetime, id)` indexes,
+    so every page costs the same no matter how deep the client has gone.
+
+    Parameters
+    ----------
+    `statement` : Select
+        The select over `model`, with the filters already applied
+    `model` : SQLModel
+        A model with `datetime` and `id` columns
+    `limit` : int, optional
+        Maximum number of rows to return
+    `after` : tuple[datetime, int], optional
+        The `(datetime, id)` of the last row of the previous page
+
+    Returns
+    -------
+    `Select`
+        The paginated statement
+    """
+    if after is not None:
+        statement = statement.where(tuple_(model.datetime, model.id) > after)
+    statement = statement.order_by(model.datetime, model.id)
+    if limit is not None:
+        statement = statement.limit(limit)
+    return statement
+
+
+def next_cursor(rows: Sequence, limit: int) -> Optional[str]:
+    """
+    Token for the page after `rows`, fetched with `limit + 1`.
+
+    The extra row only tells whether there is a next page, so callers must
+    return `rows[:limit]`.
+    """
+    if len(rows) <= limit:
+        return None
+    last = rows[limit - 1]
+    return encode_cursor(last.datetime, last.id)
@@ -0,0 +1,98 @@
+import asyncio
+import inspect
+from functools import wraps
+from typing import Awaitable, Callable, Hashable, TypeVar
+
+T = TypeVar("T")
+
+
+class _Flight:
+    # The shared task and how many callers are waiting on it
+    def __init__(self, task: asyncio.Task):
+        self.task = task
+        self.callers = 0
+
+
+async def _lead(flight: _Flight, forget: Callable[[_Flight], None]) -> T:
+    # The call runs on the session of the request that started it, so that
+    # request must not end, and close its session, before the call does.
+    try:
+        return await asyncio.shield(flight.task)
+    except asyncio.CancelledError:
+        if flight.callers == 1:
+            forget(flight)
+            flight.task.cancel()
+        while not flight.task.done():
+            try:
+                await asyncio.wait({flight.task})
+            except asyncio.CancelledError:
+                continue
+        raise
+
+
+def single_flight(
+    func: Callable[..., Awaitable[T]]
+) -> Callable[..., Awaitable[T]]:
+    """
+    Coalesce concurrent calls of a service method with the same arguments.
+
+    The first caller starts the query; everyone arriving while it is still
+    running awaits the same task and receives the same result. Nothing is
+    kept once the task finishes, so this only removes duplicate work during
+    stampedes and never serves stale data.
+
+    The task runs on the first caller's service, and so on the connection
+    its request already holds. The other callers only wait on the task and
+    never check out a connection. The first caller waits for the task even
+    when its request goes away, so the session is not closed under it; the
+    task itself is only cancelled once nobody else waits on it.
+
+    Calls only overlap while the task awaits. With `DATABASE_ASYNC` or
+    `DATABASE_THREADPOOL` that is the whole query. Inline, the query blocks
+    the event loop, so calls are never coalesced.
+
+    Parameters
+    ----------
+    `func` : Callable
+        The async service method to wrap. `self` is not part of the key, so
+        calls from different requests (different service instances) share
+        the in-flight task.
+
+    Returns
+    -------
+    `Callable`
+        The wrapped method
+    """
+    signature = inspect.signature(func)
+    in_flight: dict[Hashable, _Flight] = {}
+
+    @wraps(func)
+    async def wrapper(self, *args, **kwargs) -> T:
+        bound = signature.bind(self, *args, **kwargs)
+        bound.apply_defaults()
+        key = tuple(bound.arguments.items())[1:]
+
+        def forget(flight: _Flight) -> None:
+            if in_flight.get(key) is flight:
+                del in_flight[key]
+
+        flight = in_flight.get(key)
+        leader = flight is None
+        if leader:
+            flight = _Flight(
+                asyncio.ensure_future(func(self, *args, **kwargs))
+            )
+            in_flight[key] = flight
+            flight.task.add_done_callback(lambda _: forget(flight))
+
+        flight.callers += 1
+        try:
+            if leader:
+                return await _lead(flight, forget)
+            # Shield the shared task so one caller going away does not
+            # cancel the query for every other caller waiting on it.
+            return await asyncio.shield(flight.task)
+        finally:
+            flight.callers -= 1
+
+    return wrapper
@@ -0,0 +1,179 @@
+import codecs
+import csv
+import json
+from typing import AsyncIterator, Awaitable, Callable, Optional, Type
+
+from pydantic import BaseModel, ValidationError
+
+from app.utils.errors import ClosedPeriodError, DatabaseError
+
+# Rows validated and inserted at a time, the most an upload holds in memory
+UPLOAD_CHUNK_SIZE = 5000
+# Errors kept per chunk, the rest are only counted
+MAX_CHUNK_ERRORS = 100
+
+NDJSON_CONTENT_TYPES = ("application/x-ndjson", "application/jsonl")
+CSV_CONTENT_TYPES = ("text/csv",)
+
+
+async def _iter_lines(body: AsyncIterator[bytes]) -> AsyncIterator[str]:
+    decoder = codecs.getincrementaldecoder("utf-8")()
+    pending = ""
+    async for data in body:
+        pending += decoder.decode(data)
+        *lines, pending = pending.split("\n")
+        for line in lines:
+            yield line.rstrip("\r")
+    pending += decoder.decode(b"", final=True)
+    if pending:
+        yield pending.rstrip("\r")
+
+
+async def _iter_ndjson(
+    body: AsyncIterator[bytes],
+) -> AsyncIterator[tuple[int, object]]:
+    line_number = 0
+    async for line in _iter_lines(body):
+        line_number += 1
+        if not line.strip():
+            continue
+        try:
+            yield line_number, json.loads(line)
+        except ValueError as err:
+            yield line_number, err
+
+
+async def _iter_csv(
+    body: AsyncIterator[bytes],
+) -> AsyncIterator[tuple[int, object]]:
+    # One record per line: quoted fields spanning lines are not supported
+    header: Optional[list[str]] = None
+    line_number = 0
+    async for line in _iter_lines(body):
+        line_number += 1
+        if not line.strip():
+            continue
+        values = next(csv.reader([line]))
+        if header is None:
+            header = values
+            continue
+        if len(values) != len(header):
+            yield line_number, ValueError(
+                f"Expected {len(header)} fields, got {len(values)}"
+            )
+            continue
+        yield line_number, {
+            key: value if value != "" else None
+            for key, value in zip(header, values)
+        }
+
+
+def read_records(
+    content_type: str, body: AsyncIterator[bytes]
+) -> AsyncIterator[tuple[int, object]]:
+    """
+    Parse an upload body as it arrives.
+
+    Parameters
+    ----------
+    `content_type` : str
+        The request `Content-Type`, NDJSON or CSV with a header line
+    `body` : AsyncIterator[bytes]
+        The request body, usually `request.stream()`
+
+    Returns
+    -------
+    `AsyncIterator[tuple[int, object]]`
+        `(line number, record)` pairs, where the record is the parsed dict
+        or the exception raised while parsing that line
+
+    Raises
+    ------
+    `ValueError`
+        If `content_type` is neither NDJSON nor CSV
+    """
+    media_type = content_type.split(";")[0].strip().lower()
+    if media_type in NDJSON_CONTENT_TYPES:
+        return _iter_ndjson(body)
+    if media_type in CSV_CONTENT_TYPES:
+        return _iter_csv(body)
+    raise ValueError(
+        "Unsupported Content-Type, expected one of "
+        + ", ".join(NDJSON_CONTENT_TYPES + CSV_CONTENT_TYPES)
+    )
+
+
+async def ingest(
+    records: AsyncIterator[tuple[int, object]],
+    schema: Type[BaseModel],
+    insert: Callable[[list[dict]], Awaitable[int]],
+    chunk_size: Optional[int] = None,
+) -> dict:
+    """
+    Validate `records` and insert them `chunk_size` at a time.
+
+    Each chunk is inserted as soon as it is validated, so memory does not
+    grow with the upload. Invalid rows are reported and skipped, and a
+    chunk failing in the database or writing into a closed year does not
+    stop the following ones.
+
+    Parameters
+    ----------
+    `records` : AsyncIterator[tuple[int, object]]
+        The output of `read_records`
+    `schema` : Type[BaseModel]
+        The create schema every record is validated against
+    `insert` : Callable
+        Coroutine inserting a list of validated rows, returning the count
+    `chunk_size` : int, optional
+        Rows per chunk, `UPLOAD_CHUNK_SIZE` by default
+
+    Returns
+    -------
+    `dict`
+        The totals and one report per chunk
+    """
+    chunk_size = chunk_size or UPLOAD_CHUNK_SIZE
+    report = {"inserted": 0, "rejected": 0, "chunks": []}
+
+    async def flush(rows: list[dict], errors: list[dict], error_count: int):
+        chunk = {
+            "chunk": len(report["chunks"]) + 1,
+            "inserted": 0,
+            "rejected": error_count,
+            "errors": errors,
+        }
+        if rows:
+            try:
+                chunk["inserted"] = await insert(rows)
+            except ClosedPeriodError as err:
+                chunk["rejected"] += len(rows)
+                chunk["errors"].append({"error": str(err)})
+            except DatabaseError:
+                chunk["rejected"] += len(rows)
+                chunk["errors"].append({"error": "Database error"})
+        report["inserted"] += chunk["inserted"]
+        report["rejected"] += chunk["rejected"]
+        report["chunks"].append(chunk)
+
+    rows, errors, error_count, seen = [], [], 0, 0
+    async for line_number, record in records:
+        seen += 1
+        try:
+            if isinstance(record, Exception):
+                raise record
+            if not isinstance(record, dict):
+                raise ValueError("Expected an object")
+            rows.append(schema(**record).dict())
+        except (ValidationError, ValueError) as err:
+            error_count += 1
+            if len(errors) < MAX_CHUNK_ERRORS:
+                errors.append({"line": line_number, "error": str(err)})
+
+        if seen == chunk_size:
+            await flush(rows, errors, error_count)
+            rows, errors, error_count, seen = [], [], 0, 0
+
+    if seen:
+        await flush(rows, errors, error_count)
+    return report
@@ -0,0 +1,152 @@
+from datetime import datetime as dt
+from datetime import timezone
+from typing import Any, Callable, Iterable, NamedTuple, Optional
+
+from fastapi import HTTPException, Query, status
+
+FIRST_REPORT_YEAR = 1900
+
+
+def to_utc(moment: dt) -> dt:
+    """
+    `moment` in UTC, the time zone rows are counted in by year and month.
+
+    Naive datetimes are UTC already, the time zone the engines pin the
+    session to.
+    """
+    if moment.tzinfo is None:
+        return moment
+    return moment.astimezone(timezone.utc)
+
+
+def utc_years(datetimes: Iterable[Optional[dt]]) -> set[int]:
+    """
+    The UTC years of `datetimes`, the years of the rows written with them.
+    """
+    return {to_utc(moment).year for moment in datetimes if moment is not None}
+
+
+class ReportYears(NamedTuple):
+    """
+    The years a report route is asked for.
+
+    A single `year` is answered with the report itself, a range or list of
+    years with the reports keyed by year.
+    """
+
+    years: tuple[int, ...]
+    keyed: bool
+
+    def params(self) -> dict[str, Any]:
+        """
+        The years as query parameters, a single `year` as it always was.
+        """
+        if self.keyed:
+            return {"years": list(self.years)}
+        return {"year": self.years[0]}
+
+    def data(self, result: dict[int, Any]) -> Any:
+        """
+        The response data of a report computed by year.
+        """
+        return result if self.keyed else result[self.years[0]]
+
+
+def _bad_request(detail: str) -> HTTPException:
+    return HTTPException(
+        status_code=status.HTTP_400_BAD_REQUEST, detail=detail
+    )
+
+
+def _read_years(
+    year: Optional[int],
+    from_year: Optional[int],
+    to_year: Optional[int],
+    years: Optional[list[int]],
+    first_year: int,
+    out_of_range: str,
+) -> ReportYears:
+    given = [
+        name
+        for name, present in (
+            ("year", year is not None),
+            ("from_year", from_year is not None or to_year is not None),
+            ("years", bool(years)),
+        )
+        if present
+    ]
+    if not given:
+        raise _bad_request("Year is required")
+    if len(given) > 1:
+        raise _bad_request("Use only one of year, from_year/to_year or years")
+    if given == ["from_year"] and from_year is None:
+        raise _bad_request("from_year is required with to_year")
+
+    if year is not None:
+        first = last = year
+    elif years:
+        first, last = min(years), max(years)
+    else:
+        first, last = from_year, dt.now().year if to_year is None else to_year
+        if first > last:
+            raise _bad_request("from_year must not be after to_year")
+
+    # Checked before a range is expanded into its years
+    if first < first_year or last > dt.now().year:
+        raise _bad_request(out_of_range)
+
+    if years:
+        selected = tuple(sorted(set(years)))
+    else:
+        selected = tuple(range(first, last + 1))
+    return ReportYears(years=selected, keyed=year is None)
+
+
+def report_years(
+    year: Optional[int] = None,
+    from_year: Optional[int] = None,
+    to_year: Optional[int] = None,
+    years: Optional[list[int]] = Query(None),
+) -> ReportYears:
+    """
+    Read the years of a report route, dependency of every report route.
+
+    A report is asked for one `year`, for `from_year` to `to_year`
+    inclusive, `to_year` being the current year by default, or for a list
+    of `years`.
+
+    Raises
+    ------
+    `HTTPException`
+        400 if no or several of these are given, or a year is not between
+        1900 and the current year
+    """
+    return _read_years(
+        year,
+        from_year,
+        to_year,
+        years,
+        FIRST_REPORT_YEAR,
+        f"Year must be between {FIRST_REPORT_YEAR} and {dt.now().year}",
+    )
+
+
+def report_years_from(
+    first_year: int, out_of_range: str
+) -> Callable[..., ReportYears]:
+    """
+    `report_years` for a route with its own first year and message for
+    years out of range.
+    """
+
+    def dependency(
+        year: Optional[int] = None,
+        from_year: Optional[int] = None,
+        to_year: Optional[int] = None,
+        years: Optional[list[int]] = Query(None),
+    ) -> ReportYears:
+        return _read_years(
+            year, from_year, to_year, years, first_year, out_of_range
+        )
+
+    return dependency
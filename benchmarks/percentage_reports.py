@@ -0,0 +1,124 @@
+"""
+Compare the fuel percentage reports before and after the window rewrite.
+
+Loads `--rows` random Fuels into the current year of the configured
+database, prints the number of scans of the fuel table, the buffers read
+and the execution time of both queries, then rolls everything back.
+
+    python -m benchmarks.percentage_reports --rows 2000000
+"""
+import argparse
+import json
+from datetime import datetime as dt
+
+from sqlalchemy import func, select, text
+from sqlalchemy.engine import Connection
+
+from app.infrastructure import percentage_by
+from app.infrastructure.db import engine
+from app.models import Fuel
+
+
+def _total_subquery(year: int):
+    # The report as it was, the total comes from a second scan of the year
+    criteria = (
+        Fuel.datetime >= dt(year, 1, 1),
+        Fuel.datetime <= dt(year, 12, 31, 23, 59, 59),
+    )
+    subquery = (
+        select(func.sum(Fuel.quantity).label("total"))
+        .where(*criteria)
+        .subquery()
+    )
+    return (
+        select(
+            Fuel.fuel_type,
+            (func.sum(Fuel.quantity) * 100.0 / subquery.c.total).label(
+                "percentage"
+            ),
+        )
+        .join(subquery, True)
+        .where(*criteria)
+        .group_by(Fuel.fuel_type, subquery.c.total)
+    )
+
+
+def _window(year: int):
+    return percentage_by(
+        Fuel.fuel_type,
+        Fuel.quantity,
+        Fuel.datetime >= dt(year, 1, 1),
+        Fuel.datetime <= dt(year, 12, 31, 23, 59, 59),
+    )
+
+
+def _scans(plan: dict) -> int:
+    scans = int(
+        plan["Node Type"].endswith("Scan")
+        and plan.get("Relation Name", "").startswith("fuel")
+    )
+    return scans + sum(_scans(child) for child in plan.get("Plans", []))
+
+
+def _explain(connection: Connection, statement) -> dict:
+    compiled = statement.compile(dialect=connection.dialect)
+    plan = connection.exec_driver_sql(
+        f"EXPLAIN (ANALYZE, BUFFERS, FORMAT JSON) {compiled}",
+        compiled.params,
+    ).scalar()
+    if isinstance(plan, str):
+        plan = json.loads(plan)
+    root = plan[0]["Plan"]
+    return {
+        "scans": _scans(root),
+        "buffers": root["Shared Hit Blocks"] + root["Shared Read Blocks"],
+        "ms": plan[0]["Execution Time"],
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.split("\n")[1])
+    parser.add_argument("--rows", type=int, default=2_000_000)
+    parser.add_argument("--runs", type=int, default=3)
+    args = parser.parse_args()
+
+    year = dt.now().year
+    with engine.connect() as connection:
+        transaction = connection.begin()
+        try:
+            connection.execute(
+                text(
+                    """
+                    INSERT INTO fuel (datetime, fuel_type, emission_type,
+                                      quantity)
+                    SELECT
+                        make_timestamptz(:year, 1, 1, 0, 0, 0, 'UTC')
+                            + random() * interval '364 days',
+                        (enum_range(NULL::fueltype))[1 + i % 3],
+                        (enum_range(NULL::emissiontype))[1 + i % 3],
+                        random() * 100
+                    FROM generate_series(1, :rows) AS i
+                    """
+                ),
+                {"year": year, "rows": args.rows},
+            )
+            connection.execute(text("ANALYZE fuel"))
+
+            for name, statement in (
+                ("total subquery", _total_subquery(year)),
+                ("window", _window(year)),
+            ):
+                runs = [
+                    _explain(connection, statement) for _ in range(args.runs)
+                ]
+                best = min(runs, key=lambda run: run["ms"])
+                print(
+                    f"{name:>14}: {best['scans']} scan(s) of fuel, "
+                    f"{best['buffers']} buffers, {best['ms']:.1f} ms"
+                )
+        finally:
+            transaction.rollback()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,264 @@
+from datetime import datetime as dt
+from datetime import timedelta, timezone
+
+import pytest
+from fastapi.testclient import TestClient
+from sqlalchemy import text
+from sqlmodel import Session
+
+from app.definitions import EmissionType, OilCategory, OilType
+from app.models import Oil
+from app.models.closed_period import CLOSED_YEAR_TRIGGERS
+from app.repositories import ClosedPeriodRepository
+from app.services import ClosedPeriodService, OilService
+from app.services.closed_period import IMMUTABLE, app_settings
+
+URL = "/api/oil/consumo_mensual_aceite"
+CLOSED = dt.now().year - 2
+ADMIN_TOKEN = "admin"
+
+
+@pytest.fixture(autouse=True)
+def admin_token(monkeypatch):
+    monkeypatch.setattr(app_settings, "ADMIN_TOKEN", ADMIN_TOKEN)
+
+
+def close(client: TestClient, year: int, **params):
+    return client.post(
+        f"/api/closed_years/{year}",
+        params={"confirm": year, **params},
+        headers={"X-Admin-Token": ADMIN_TOKEN},
+    )
+
+
+def _oil(datetime: dt) -> dict:
+    return {
+        "quantity": 10,
+        "datetime": datetime.isoformat(),
+        "oil_type": OilType.ACEITE.value,
+        "oil_category": OilCategory.CONSUMO_ADMINISTRATIVO.value,
+        "emission_type": EmissionType.EMISIONES_DIRECTAS.value,
+    }
+
+
+def _add_oil(session: Session, datetime: dt) -> Oil:
+    oil = Oil(**_oil(datetime))
+    session.add(oil)
+    session.commit()
+    return oil
+
+
+def test_close_year(client: TestClient, test_db_session: Session):
+    response = close(client, CLOSED)
+    assert response.status_code == 200
+    assert CLOSED in response.json()["data"]["years"]
+
+    # Closing it again is a no-op
+    assert close(client, CLOSED).status_code == 200
+    response = client.get("/api/closed_years/")
+    assert response.json()["data"]["years"] == [CLOSED]
+
+
+def test_closed_years_are_enforced_by_the_database(
+    client: TestClient, test_db_session: Session, monkeypatch
+):
+    close(client, CLOSED)
+
+    # As for a write checked just before the year was closed
+    async def still_open(self, *datetimes):
+        return None
+
+    monkeypatch.setattr(ClosedPeriodService, "ensure_open", still_open)
+    response = client.post("/api/oil", json=_oil(dt(CLOSED, 2, 1)))
+
+    assert response.status_code == 409
+    assert response.json()["detail"] == (
+        f"Closed years can not be changed: {CLOSED}"
+    )
+
+
+def test_closed_years_are_not_read_for_every_report(
+    client: TestClient, test_db_session: Session, monkeypatch
+):
+    calls = []
+    get_closed_years = ClosedPeriodRepository.get_closed_years
+
+    def count(self):
+        calls.append(self)
+        return get_closed_years(self)
+
+    monkeypatch.setattr(ClosedPeriodRepository, "get_closed_years", count)
+
+    # The current year cannot be closed yet
+    client.get(URL, params={"year": dt.now().year})
+    assert calls == []
+    for _ in range(3):
+        client.get(URL, params={"year": CLOSED})
+    assert len(calls) == 1
+
+
+def test_only_past_years_can_be_closed(client: TestClient):
+    response = close(client, dt.now().year)
+
+    assert response.status_code == 400
+
+
+def test_closing_needs_the_admin_token_and_a_confirmation(
+    client: TestClient, test_db_session: Session, monkeypatch
+):
+    url = f"/api/closed_years/{CLOSED}"
+    headers = {"X-Admin-Token": ADMIN_TOKEN}
+
+    assert client.post(url, params={"confirm": CLOSED}).status_code == 403
+    response = client.post(
+        url, params={"confirm": CLOSED}, headers={"X-Admin-Token": "guess"}
+    )
+    assert response.status_code == 403
+    response = client.post(
+        url, params={"confirm": CLOSED + 1}, headers=headers
+    )
+    assert response.status_code == 400
+    assert client.post(url, headers=headers).status_code == 422
+    # Without a token set, no year can be closed
+    monkeypatch.setattr(app_settings, "ADMIN_TOKEN", None)
+    assert close(client, CLOSED).status_code == 403
+
+    assert client.get("/api/closed_years/").json()["data"]["years"] == []
+
+
+def test_writes_into_closed_year_are_rejected(
+    client: TestClient, test_db_session: Session
+):
+    open_oil = _add_oil(test_db_session, dt(CLOSED + 1, 1, 1))
+    closed_oil = _add_oil(test_db_session, dt(CLOSED, 1, 1))
+    close(client, CLOSED)
+
+    response = client.post("/api/oil", json=_oil(dt(CLOSED, 2, 1)))
+    assert response.status_code == 409
+
+    response = client.post(
+        "/api/oil/bulk_create",
+        json=[_oil(dt(CLOSED + 1, 2, 1)), _oil(dt(CLOSED, 2, 1))],
+    )
+    assert response.status_code == 409
+
+    response = client.put(
+        f"/api/oil/{open_oil.id}",
+        json={"datetime": dt(CLOSED, 3, 1).isoformat()},
+    )
+    assert response.status_code == 409
+
+    response = client.delete(f"/api/oil/{closed_oil.id}")
+    assert response.status_code == 409
+
+    response = client.post("/api/oil", json=_oil(dt(CLOSED + 1, 2, 1)))
+    assert response.status_code == 200
+
+
+def test_upload_rejects_chunks_in_closed_year(
+    client: TestClient, test_db_session: Session, monkeypatch
+):
+    monkeypatch.setattr(app_settings, "CLOSED_YEARS_BEFORE", CLOSED + 1)
+    oils = [_oil(dt(CLOSED, 1, 1)), _oil(dt(CLOSED + 1, 1, 1))]
+    body = "\n".join(
+        [
+            ",".join(oils[0]),
+            *(",".join(map(str, oil.values())) for oil in oils),
+        ]
+    )
+
+    response = client.post(
+        "/api/oil/upload",
+        content=body,
+        headers={"Content-Type": "text/csv"},
+    )
+
+    report = response.json()["data"]
+    assert report["inserted"] == 0
+    assert report["rejected"] == 2
+    assert str(CLOSED) in report["chunks"][0]["errors"][0]["error"]
+
+
+def test_closed_year_report_is_stored(
+    client: TestClient, test_db_session: Session, monkeypatch
+):
+    _add_oil(test_db_session, dt(CLOSED, 1, 1))
+    close(client, CLOSED)
+
+    first = client.get(URL, params={"year": CLOSED})
+    assert first.status_code == 200
+    assert first.headers["Cache-Control"] == IMMUTABLE
+
+    async def report(*args, **kwargs):
+        pytest.fail("The report ran for a closed year")
+
+    monkeypatch.setattr(
+        OilService, "get_monthly_consumption_by_type_and_year", report
+    )
+    second = client.get(URL, params={"year": CLOSED})
+
+    assert second.status_code == 200
+    assert second.headers["Cache-Control"] == IMMUTABLE
+    assert second.content == first.content
+
+
+def test_open_year_report_is_not_immutable(
+    client: TestClient, test_db_session: Session, monkeypatch
+):
+    monkeypatch.setattr(app_settings, "CLOSED_YEARS_BEFORE", CLOSED)
+    _add_oil(test_db_session, dt(CLOSED, 1, 1))
+
+    response = client.get(URL, params={"year": CLOSED})
+
+    assert response.status_code == 200
+    assert response.headers["Cache-Control"] == "no-cache"
+
+
+def test_writes_are_checked_by_their_utc_year(
+    client: TestClient, test_db_session: Session, monkeypatch
+):
+    monkeypatch.setattr(app_settings, "CLOSED_YEARS_BEFORE", CLOSED + 1)
+    # The last minutes of a closed year in UTC-2, already open in UTC
+    new_year = dt(CLOSED, 12, 31, 23, 30, tzinfo=timezone(timedelta(hours=-2)))
+    _add_oil(test_db_session, dt(CLOSED + 1, 1, 5))
+    before = client.get(URL, params={"year": CLOSED + 1}).json()["data"]
+
+    response = client.post("/api/oil", json=_oil(new_year))
+    assert response.status_code == 200
+    # The report of the UTC year is the one dropped from the cache
+    after = client.get(URL, params={"year": CLOSED + 1}).json()["data"]
+    assert after != before
+
+    # The first minutes of an open year in UTC+2, still closed in UTC
+    new_year = dt(CLOSED + 1, 1, 1, 0, 30, tzinfo=timezone(timedelta(hours=2)))
+    response = client.post("/api/oil", json=_oil(new_year))
+    assert response.status_code == 409
+
+
+def test_closed_years_are_checked_once_per_statement(
+    client: TestClient, test_db_session: Session, monkeypatch
+):
+    close(client, CLOSED)
+
+    async def still_open(self, *datetimes):
+        return None
+
+    monkeypatch.setattr(ClosedPeriodService, "ensure_open", still_open)
+    statements = test_db_session.execute(
+        text(
+            "SELECT tgname FROM pg_trigger "
+            "WHERE tgrelid = 'oil'::regclass AND NOT tgisinternal "
+            # TRIGGER_TYPE_ROW
+            "AND tgtype & 1 = 0"
+        )
+    ).scalars()
+    assert set(statements) == set(CLOSED_YEAR_TRIGGERS)
+
+    # One open and one closed year in the same statement
+    response = client.post(
+        "/api/oil/bulk_create",
+        json=[_oil(dt(CLOSED + 1, 2, 1)), _oil(dt(CLOSED, 2, 1))],
+    )
+
+    assert response.status_code == 409
+    assert str(CLOSED) in response.json()["detail"]
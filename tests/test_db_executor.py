@@ -0,0 +1,74 @@
+import asyncio
+import threading
+
+import pytest
+from fastapi.testclient import TestClient
+
+from app.infrastructure.executor import DatabaseExecutor
+
+
+def test_executor_runs_off_event_loop():
+    executor = DatabaseExecutor(max_workers=2)
+
+    thread_id = asyncio.run(executor.run(threading.get_ident))
+
+    assert thread_id != threading.get_ident()
+    assert executor.stats()["completed"] == 1
+    assert executor.stats()["queued"] == 0
+    executor.shutdown()
+
+
+def test_executor_queue_depth():
+    executor = DatabaseExecutor(max_workers=1)
+    release = threading.Event()
+
+    async def saturate():
+        tasks = [
+            asyncio.ensure_future(executor.run(release.wait)) for _ in range(3)
+        ]
+        await asyncio.sleep(0.1)
+        stats = executor.stats()
+        release.set()
+        await asyncio.gather(*tasks)
+        return stats
+
+    stats = asyncio.run(saturate())
+
+    assert stats["active"] == 1
+    assert stats["queued"] == 2
+    assert executor.stats()["completed"] == 3
+    executor.shutdown()
+
+
+def test_db_executor_route_disabled(client: TestClient, admin_headers):
+    response = client.get("/api/internal/db_executor", headers=admin_headers)
+
+    assert response.status_code == 404
+
+
+def test_db_pool_route(client: TestClient, admin_headers):
+    response = client.get("/api/internal/db_pool", headers=admin_headers)
+    body = response.json()
+
+    assert response.status_code == 200
+    assert body["data"]["sync"]["waiting"] == 0
+    assert "checked_out" in body["data"]["sync"]
+
+
+@pytest.mark.parametrize(
+    "method, url",
+    [
+        ("GET", "/api/internal/db_executor"),
+        ("GET", "/api/internal/db_pool"),
+        ("GET", "/api/internal/report_cache"),
+        ("GET", "/api/internal/shared_report_cache"),
+        ("GET", "/api/internal/report_view"),
+        ("POST", "/api/internal/report_view/refresh"),
+    ],
+)
+def test_internal_routes_need_the_admin_token(
+    client: TestClient, admin_headers, method: str, url: str
+):
+    assert client.request(method, url).status_code == 403
+    response = client.request(method, url, headers={"X-Admin-Token": "guess"})
+    assert response.status_code == 403
@@ -0,0 +1,93 @@
+from collections import defaultdict
+
+import pytest
+from fastapi.testclient import TestClient
+from sqlalchemy import event, func, select
+from sqlmodel import Session
+
+from app.definitions import EmissionType, OilType
+from app.models import Energy, Fuel, Oil, Roadtrip, emission
+from app.repositories import ReportRepository
+from app.repositories.report_repo import app_settings
+
+from .test_report_years import YEAR, YEARS, _add_rows
+
+MODELS = {"fuel": Fuel, "oil": Oil, "energy": Energy, "roadtrip": Roadtrip}
+
+
+def _rows(session: Session, domain: str) -> list:
+    return session.exec(select(MODELS[domain])).scalars().all()
+
+
+def test_view_holds_every_domain(test_db_session: Session):
+    _add_rows(test_db_session)
+
+    counts = dict(
+        test_db_session.execute(
+            select(emission.c.domain, func.count()).group_by(emission.c.domain)
+        ).all()
+    )
+
+    assert counts == {domain: 20 * len(YEARS) for domain in MODELS}
+
+
+@pytest.mark.parametrize("source", ["raw", "rollup", "matview"])
+def test_consumo_por_tipo_de_emision(
+    client: TestClient, test_db_session: Session, monkeypatch, source: str
+):
+    monkeypatch.setattr(app_settings, "REPORT_SOURCE", source)
+    _add_rows(test_db_session)
+    expected = {
+        emission_type.value: dict.fromkeys(MODELS, 0)
+        for emission_type in EmissionType
+    }
+    for domain in MODELS:
+        for row in _rows(test_db_session, domain):
+            if row.datetime.year == YEAR:
+                expected[row.emission_type.value][domain] += row.quantity
+
+    response = client.get(
+        "/api/consumo_por_tipo_de_emision", params={"year": YEAR}
+    )
+
+    assert response.status_code == 200
+    assert response.json()["data"] == expected
+
+
+def test_cross_domain_reports_are_one_statement(
+    test_db_session: Session, monkeypatch
+):
+    monkeypatch.setattr(app_settings, "REPORT_SOURCE", "raw")
+    _add_rows(test_db_session)
+    statements = []
+
+    def count(connection, cursor, statement, *args):
+        statements.append(statement)
+
+    connection = test_db_session.connection()
+    event.listen(connection, "before_cursor_execute", count)
+    repository = ReportRepository(test_db_session)
+    sums = repository.get_sum_by_domain(("fuel", "energy"), YEARS)
+    averages = repository.get_average_by_domain(
+        {"fuel": None, "oil": OilType}, YEARS
+    )
+    event.remove(connection, "before_cursor_execute", count)
+
+    assert len(statements) == 2
+    quantities = defaultdict(list)
+    for domain in ("fuel", "energy", "oil"):
+        for row in _rows(test_db_session, domain):
+            category = row.oil_type if domain == "oil" else None
+            quantities[row.datetime.year, domain, category].append(
+                row.quantity
+            )
+    for year in YEARS:
+        for domain in ("fuel", "energy"):
+            assert sums[year][domain] == sum(quantities[year, domain, None])
+        assert averages[year]["fuel"] == pytest.approx(
+            sum(quantities[year, "fuel", None])
+            / len(quantities[year, "fuel", None])
+        )
+        for oil_type, average in averages[year]["oil"].items():
+            values = quantities[year, "oil", oil_type]
+            assert average == pytest.approx(sum(values) / len(values))
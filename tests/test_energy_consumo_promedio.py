@@ -39,3 +39,63 @@ def test_get_consumo_promedio_mensual(
 
     assert response.status_code == 200
     assert isinstance(body["data"], float)
+
+
+def test_consumo_promedio_mensual_por_ubicacion(
+    client: TestClient, test_db_session: Session
+):
+    year = dt.now().year - 1
+    for month, quantity, location, category in (
+        (1, 10, EnergyLocation.LOCAL, EnergyCategory.CONSUMO_LOGISTICO),
+        (1, 30, EnergyLocation.LOCAL, EnergyCategory.CONSUMO_LOGISTICO),
+        (1, 5, EnergyLocation.LOCAL, EnergyCategory.CONSUMO_ADMINISTRATIVO),
+        (4, 7, EnergyLocation.DESCONOCIDO, EnergyCategory.CONSUMO_LOGISTICO),
+    ):
+        test_db_session.add(
+            Energy(
+                quantity=quantity,
+                datetime=dt(year, month, 10),
+                location=location,
+                energy_category=category,
+                emission_type=EmissionType.EMISIONES_INDIRECTAS,
+            )
+        )
+    test_db_session.commit()
+
+    response = client.get(
+        "/api/energy/consumo_promedio_mensual_por_ubicacion",
+        params={"year": year},
+    )
+    body = response.json()
+
+    assert response.status_code == 200
+    assert body["data"] == {
+        EnergyLocation.LOCAL.value: {
+            "average": 15,
+            "months": {
+                "1": {
+                    EnergyCategory.CONSUMO_LOGISTICO.value: 20,
+                    EnergyCategory.CONSUMO_ADMINISTRATIVO.value: 5,
+                }
+            },
+        },
+        EnergyLocation.OFICINAS_ADMINISTRATIVAS.value: {
+            "average": 0,
+            "months": {},
+        },
+        EnergyLocation.PLANTA_DE_ENVASADO.value: {
+            "average": 0,
+            "months": {},
+        },
+        EnergyLocation.DESCONOCIDO.value: {
+            "average": 7,
+            "months": {"4": {EnergyCategory.CONSUMO_LOGISTICO.value: 7}},
+        },
+    }
+    # The same averages as one request per location
+    for location in EnergyLocation:
+        single = client.get(
+            "/api/energy/consumo_promedio_mensual",
+            params={"year": year, "location": location.value},
+        )
+        assert single.json()["data"] == body["data"][location.value]["average"]
@@ -46,3 +46,34 @@ def test_create_invalid_emission_type(
 
     assert response.status_code == 422
     assert "value is not a valid" in body["detail"][0]["msg"]
+
+
+def test_bulk_create_records(client: TestClient, test_db_session: Session):
+    """
+    Test route to create Fuel records in bulk.
+    """
+
+    response = client.post(
+        "/api/fuel/bulk_create",
+        json=[
+            {
+                "quantity": quantity,
+                "description": "tab\tand\nnewline" if quantity == 1 else None,
+                "datetime": dt(2022, 1, 1).isoformat(),
+                "fuel_type": random.choice(list(FuelType)),
+                "emission_type": random.choice(list(EmissionType)),
+            }
+            for quantity in range(3)
+        ],
+    )
+    body = response.json()
+
+    assert response.status_code == 200
+    assert body["data"]["inserted"] == 3
+
+    fuels = client.get("/api/fuel").json()
+    assert sorted(fuel["quantity"] for fuel in fuels) == [0, 1, 2]
+    assert {fuel["description"] for fuel in fuels} == {
+        None,
+        "tab\tand\nnewline",
+    }
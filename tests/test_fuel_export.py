@@ -0,0 +1,69 @@
+import json
+from datetime import datetime as dt
+
+from fastapi.testclient import TestClient
+from sqlmodel import Session
+
+from app.definitions import EmissionType, FuelType
+from app.models import Fuel
+from app.repositories import FuelRepository
+
+
+def test_route_empty_export(client: TestClient, test_db_session: Session):
+    response = client.get("/api/fuel/export")
+
+    assert response.status_code == 200
+    assert response.headers["content-type"] == "application/x-ndjson"
+    assert response.text == ""
+
+
+def test_route_export(
+    client: TestClient, test_db_session: Session, monkeypatch
+):
+    # Several chunks, so rows have to come from more than one fetch
+    monkeypatch.setattr("app.services.fuel.EXPORT_CHUNK_SIZE", 2)
+    fuel_repository = FuelRepository(test_db_session)
+    fuel_repository.bulk_create(
+        [
+            Fuel(
+                quantity=day,
+                datetime=dt(2022, 1, day),
+                fuel_type=FuelType.COMBUSTIBLE_ADMINISTRATIVO,
+                emission_type=EmissionType.EMISIONES_DIRECTAS,
+            )
+            for day in range(1, 6)
+        ]
+    )
+
+    response = client.get("/api/fuel/export")
+    rows = [json.loads(line) for line in response.text.splitlines()]
+
+    assert response.status_code == 200
+    assert sorted(row["quantity"] for row in rows) == [1, 2, 3, 4, 5]
+    assert rows[0]["fuel_type"] == FuelType.COMBUSTIBLE_ADMINISTRATIVO.value
+    assert dt.fromisoformat(rows[0]["datetime"])
+
+
+def test_route_export_filters(client: TestClient, test_db_session: Session):
+    fuel_repository = FuelRepository(test_db_session)
+    fuel_repository.bulk_create(
+        [
+            Fuel(
+                quantity=quantity,
+                datetime=dt(2022, 1, 1),
+                fuel_type=fuel_type,
+                emission_type=EmissionType.EMISIONES_DIRECTAS,
+            )
+            for quantity, fuel_type in enumerate(FuelType)
+        ]
+    )
+
+    response = client.get(
+        "/api/fuel/export",
+        params={"fuel_type": FuelType.COMBUSTIBLE_DE_LOGISTICA.value},
+    )
+    rows = [json.loads(line) for line in response.text.splitlines()]
+
+    assert [row["fuel_type"] for row in rows] == [
+        FuelType.COMBUSTIBLE_DE_LOGISTICA.value
+    ]
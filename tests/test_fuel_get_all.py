@@ -35,3 +35,76 @@ def test_route_response(client: TestClient, test_db_session: Session):
 
     assert response.status_code == 200
     assert len(body) == 1
+
+
+def test_route_keyset_pagination(client: TestClient, test_db_session: Session):
+    fuel_repository = FuelRepository(test_db_session)
+    fuel_repository.bulk_create(
+        [
+            Fuel(
+                quantity=day,
+                datetime=dt(2022, 1, day),
+                fuel_type=FuelType.COMBUSTIBLE_ADMINISTRATIVO,
+                emission_type=EmissionType.EMISIONES_DIRECTAS,
+            )
+            for day in range(1, 6)
+        ]
+    )
+
+    quantities, cursor = [], None
+    while True:
+        params = {"limit": 2}
+        if cursor:
+            params["cursor"] = cursor
+        response = client.get("/api/fuel", params=params)
+        assert response.status_code == 200
+        quantities += [fuel["quantity"] for fuel in response.json()]
+        cursor = response.headers.get("X-Next-Cursor")
+        if cursor is None:
+            break
+
+    assert quantities == [1, 2, 3, 4, 5]
+
+
+def test_route_filters(client: TestClient, test_db_session: Session):
+    fuel_repository = FuelRepository(test_db_session)
+    fuel_repository.bulk_create(
+        [
+            Fuel(
+                quantity=1,
+                datetime=dt(2022, 3, 1),
+                fuel_type=FuelType.COMBUSTIBLE_ADMINISTRATIVO,
+                emission_type=EmissionType.EMISIONES_DIRECTAS,
+            ),
+            Fuel(
+                quantity=2,
+                datetime=dt(2022, 3, 1),
+                fuel_type=FuelType.COMBUSTIBLE_DE_LOGISTICA,
+                emission_type=EmissionType.EMISIONES_DIRECTAS,
+            ),
+            Fuel(
+                quantity=3,
+                datetime=dt(2022, 4, 1),
+                fuel_type=FuelType.COMBUSTIBLE_DE_LOGISTICA,
+                emission_type=EmissionType.EMISIONES_DIRECTAS,
+            ),
+        ]
+    )
+
+    response = client.get(
+        "/api/fuel",
+        params={
+            "fuel_type": FuelType.COMBUSTIBLE_DE_LOGISTICA.value,
+            "start_date": "2022-03-01T00:00:00",
+            "end_date": "2022-04-01T00:00:00",
+        },
+    )
+
+    assert response.status_code == 200
+    assert [fuel["quantity"] for fuel in response.json()] == [2]
+
+
+def test_route_invalid_cursor(client: TestClient, test_db_session: Session):
+    response = client.get("/api/fuel", params={"cursor": "not-a-cursor"})
+
+    assert response.status_code == 400
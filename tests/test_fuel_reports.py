@@ -1,12 +1,15 @@
 import random
 from datetime import datetime as dt
 
+import pytest
 from fastapi.testclient import TestClient
+from sqlalchemy import event
 from sqlmodel import Session
 
 from app.definitions import EmissionType, FuelType
 from app.models import Fuel
 from app.repositories import FuelRepository
+from app.repositories.fuel_repo import app_settings
 
 
 def test_consumo_anual_por_categoria(
@@ -169,3 +172,45 @@ def test_porcentaje_por_segmento_anual_vacio(
         response.json()["data"][EmissionType.OTRAS_EMISIONES_INDIRECTAS.value]
         == 0
     )
+
+
+@pytest.mark.parametrize("source", ["raw", "rollup"])
+def test_min_max_consumo_meses(
+    client: TestClient, test_db_session: Session, monkeypatch, source: str
+):
+    monkeypatch.setattr(app_settings, "REPORT_SOURCE", source)
+    year = dt.now().year - 1
+    for month, quantity in ((1, 30), (2, 10), (3, 50), (3, 20)):
+        test_db_session.add(
+            Fuel(
+                quantity=quantity,
+                datetime=dt(year, month, 10),
+                fuel_type=FuelType.COMBUSTIBLE_ADMINISTRATIVO,
+                emission_type=EmissionType.EMISIONES_DIRECTAS,
+            )
+        )
+    test_db_session.commit()
+
+    statements = []
+
+    def count(connection, cursor, statement, *args):
+        statements.append(statement)
+
+    connection = test_db_session.connection()
+    event.listen(connection, "before_cursor_execute", count)
+    repository = FuelRepository(test_db_session)
+    result = repository.get_min_and_max_fuel_by_year((year,))[year]
+    event.remove(connection, "before_cursor_execute", count)
+
+    assert len(statements) == 1
+    assert result["lowest"] == "February"
+    assert result["highest"] == "March"
+    assert [
+        (row["month"], row["total_quantity"], row["rank"])
+        for row in result["ranking"]
+    ] == [("March", 70, 1), ("January", 30, 2), ("February", 10, 3)]
+
+    response = client.get(
+        "/api/fuel/min_max_consumo_meses", params={"year": year}
+    )
+    assert response.json()["data"] == result
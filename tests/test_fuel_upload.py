@@ -0,0 +1,80 @@
+import json
+
+from fastapi.testclient import TestClient
+from sqlmodel import Session
+
+from app.definitions import EmissionType, FuelType
+
+
+def _fuel(quantity) -> dict:
+    return {
+        "quantity": quantity,
+        "datetime": "2022-01-01T00:00:00",
+        "fuel_type": FuelType.COMBUSTIBLE_ADMINISTRATIVO.value,
+        "emission_type": EmissionType.EMISIONES_DIRECTAS.value,
+    }
+
+
+def test_upload_ndjson(
+    client: TestClient, test_db_session: Session, monkeypatch
+):
+    monkeypatch.setattr("app.utils.upload.UPLOAD_CHUNK_SIZE", 2)
+    lines = [
+        json.dumps(_fuel(1)),
+        json.dumps(_fuel("not a number")),
+        json.dumps(_fuel(3)),
+        "{not json",
+        json.dumps(_fuel(5)),
+    ]
+
+    response = client.post(
+        "/api/fuel/upload",
+        content="\n".join(lines),
+        headers={"Content-Type": "application/x-ndjson"},
+    )
+    body = response.json()["data"]
+
+    assert response.status_code == 200
+    assert body["inserted"] == 3
+    assert body["rejected"] == 2
+    assert [chunk["inserted"] for chunk in body["chunks"]] == [1, 1, 1]
+    assert [
+        error["line"] for chunk in body["chunks"] for error in chunk["errors"]
+    ] == [2, 4]
+
+    fuels = client.get("/api/fuel").json()
+    assert sorted(fuel["quantity"] for fuel in fuels) == [1, 3, 5]
+
+
+def test_upload_csv(client: TestClient, test_db_session: Session):
+    header = "quantity,description,datetime,fuel_type,emission_type"
+    rows = [
+        ",".join(
+            [str(quantity), "", fuel["datetime"]]
+            + [fuel["fuel_type"], fuel["emission_type"]]
+        )
+        for quantity, fuel in ((q, _fuel(q)) for q in (1, 2))
+    ]
+
+    response = client.post(
+        "/api/fuel/upload",
+        content="\r\n".join([header] + rows) + "\r\n",
+        headers={"Content-Type": "text/csv"},
+    )
+    body = response.json()["data"]
+
+    assert response.status_code == 200
+    assert body["inserted"] == 2
+    assert body["rejected"] == 0
+
+
+def test_upload_unsupported_content_type(
+    client: TestClient, test_db_session: Session
+):
+    response = client.post(
+        "/api/fuel/upload",
+        content="[]",
+        headers={"Content-Type": "application/json"},
+    )
+
+    assert response.status_code == 415
@@ -0,0 +1,50 @@
+import pytest
+from fastapi.encoders import jsonable_encoder
+from fastapi.testclient import TestClient
+from pydantic import parse_obj_as
+from sqlmodel import Session, select
+
+from app.models import Energy, Fuel, Oil, Roadtrip
+from app.utils.export import models_to_json
+
+from .test_report_years import _add_rows
+
+MODELS = {"fuel": Fuel, "oil": Oil, "energy": Energy, "roadtrip": Roadtrip}
+
+
+@pytest.mark.parametrize("domain", list(MODELS))
+def test_list_matches_response_model(
+    client: TestClient, test_db_session: Session, domain: str
+):
+    _add_rows(test_db_session)
+    model = MODELS[domain]
+
+    response = client.get(f"/api/{domain}/", params={"limit": 25})
+
+    assert response.status_code == 200
+    assert "X-Next-Cursor" in response.headers
+    rows = test_db_session.exec(
+        select(model).order_by(model.datetime, model.id).limit(25)
+    ).all()
+    # What FastAPI makes of the rows through `response_model`
+    assert response.json() == jsonable_encoder(parse_obj_as(list[model], rows))
+
+
+def test_empty_list(client: TestClient):
+    assert models_to_json([]) == b"[]"
+    assert client.get("/api/fuel/", params={"limit": 5}).json() == []
+
+
+def test_cursor_is_exposed_to_other_origins(
+    client: TestClient, test_db_session: Session
+):
+    _add_rows(test_db_session)
+
+    response = client.get(
+        "/api/fuel/",
+        params={"limit": 5},
+        headers={"Origin": "http://localhost:3000"},
+    )
+
+    exposed = response.headers["Access-Control-Expose-Headers"].split(", ")
+    assert {"X-Next-Cursor", "ETag", "Last-Modified"} <= set(exposed)
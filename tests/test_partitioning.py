@@ -0,0 +1,125 @@
+import threading
+from datetime import date
+from datetime import datetime as dt
+
+from sqlalchemy import text
+from sqlalchemy.ext.compiler import compiles
+from sqlalchemy.sql.expression import ClauseElement, Executable
+from sqlmodel import Session, select
+
+from app.definitions import EmissionType, FuelType
+from app.models import ClosedYear, Fuel
+from app.models.partitioning import (
+    create_year_partition,
+    detach_year_partition,
+    ensure_year_partitions,
+)
+
+
+class Explain(Executable, ClauseElement):
+    inherit_cache = False
+
+    def __init__(self, statement):
+        self.statement = statement
+
+
+@compiles(Explain, "postgresql")
+def _compile_explain(element, compiler, **kw):
+    return "EXPLAIN " + compiler.process(element.statement, **kw)
+
+
+def _partition_of(session: Session, fuel_id: int) -> str:
+    return session.execute(
+        text("SELECT tableoid::regclass::text FROM fuel WHERE id = :id"),
+        {"id": fuel_id},
+    ).scalar()
+
+
+def _add_fuel(session: Session, datetime: dt) -> Fuel:
+    fuel = Fuel(
+        quantity=1,
+        datetime=datetime,
+        fuel_type=FuelType.COMBUSTIBLE_ADMINISTRATIVO,
+        emission_type=EmissionType.EMISIONES_DIRECTAS,
+    )
+    session.add(fuel)
+    session.flush()
+    return fuel
+
+
+def test_year_query_is_pruned_to_one_partition(test_db_session: Session):
+    year = date.today().year
+    statement = select(Fuel).where(
+        Fuel.datetime >= dt(year, 1, 1),
+        Fuel.datetime <= dt(year, 12, 31, 23, 59, 59),
+    )
+
+    plan = "\n".join(
+        row[0] for row in test_db_session.execute(Explain(statement))
+    )
+
+    assert f"fuel_y{year}" in plan, plan
+    assert f"fuel_y{year + 1}" not in plan, plan
+    assert "fuel_default" not in plan, plan
+
+
+def test_rows_move_out_of_the_default_partition(test_db_session: Session):
+    fuel = _add_fuel(test_db_session, dt(2015, 6, 1))
+    assert _partition_of(test_db_session, fuel.id) == "fuel_default"
+    # Moving rows does not change them, even in a closed year
+    test_db_session.add(ClosedYear(year=2015))
+    test_db_session.flush()
+
+    created = ensure_year_partitions(test_db_session.connection())
+
+    assert "fuel_y2015" in created
+    assert _partition_of(test_db_session, fuel.id) == "fuel_y2015"
+
+
+def test_detach_year_partition(test_db_session: Session):
+    fuel = _add_fuel(test_db_session, dt(2014, 6, 1))
+    connection = test_db_session.connection()
+    ensure_year_partitions(connection, years=[2014])
+
+    assert detach_year_partition(connection, "fuel", 2014)
+    assert _partition_of(test_db_session, fuel.id) is None
+    assert not detach_year_partition(connection, "fuel", 2014)
+
+
+def test_concurrent_partition_creation(test_db_session: Session):
+    # The partitions have to be committed for the race to show, so they go
+    # in a table of their own
+    engine = test_db_session.get_bind().engine
+    with engine.begin() as connection:
+        connection.execute(
+            text(
+                "CREATE TABLE partition_race (datetime timestamptz) "
+                "PARTITION BY RANGE (datetime)"
+            )
+        )
+    try:
+        first = engine.connect()
+        transaction = first.begin()
+        assert create_year_partition(first, "partition_race", 2020)
+
+        results = []
+
+        def create():
+            with engine.begin() as connection:
+                results.append(
+                    create_year_partition(connection, "partition_race", 2020)
+                )
+
+        second = threading.Thread(target=create)
+        second.start()
+        second.join(timeout=0.5)
+        # Waits for the first transaction instead of racing it
+        assert second.is_alive()
+        transaction.commit()
+        first.close()
+        second.join()
+
+        assert results == [False]
+    finally:
+        with engine.begin() as connection:
+            connection.execute(text("DROP TABLE partition_race"))
@@ -0,0 +1,165 @@
+from datetime import datetime as dt
+
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+from sqlalchemy.engine import Engine
+from sqlalchemy.exc import OperationalError
+from sqlmodel import Session
+
+from app.repositories import FuelRepository, OilRepository
+from app.routes.batch_routes import MAX_BATCH_REPORTS, REPORTS
+
+from .test_report_years import REPORTS as URLS
+from .test_report_years import YEAR, YEARS, _add_rows
+
+
+def test_batch_matches_single_reports(
+    client: TestClient, test_db_session: Session
+):
+    _add_rows(test_db_session)
+    urls = {url.removeprefix("/api/").strip("/"): url for url in URLS}
+    assert set(urls) == set(REPORTS)
+    items = [
+        {"report": report, "params": params}
+        for report in REPORTS
+        for params in ({"year": YEAR}, {"years": YEARS})
+    ]
+
+    response = client.post("/api/reports/batch", json=items)
+
+    assert response.status_code == 200
+    results = response.json()["data"]
+    assert len(results) == len(items)
+    for item, result in zip(items, results):
+        single = client.get(urls[item["report"]], params=item["params"])
+        assert result["status_code"] == 200, item
+        assert result["data"] == single.json()["data"], item
+
+
+def test_batch_runs_on_one_connection(app: FastAPI, one_connection: Engine):
+    items = [
+        {"report": report, "params": {"year": dt.now().year}}
+        for report in REPORTS
+    ]
+
+    with TestClient(app) as client:
+        response = client.post("/api/reports/batch", json=items)
+
+    assert response.status_code == 200
+    assert len(response.json()["data"]) == len(items)
+    # Every report ran on the session of the batch
+    assert one_connection.pool.stats()["checkouts"] == 1
+
+
+def test_batch_runs_repeated_reports_once(
+    client: TestClient, test_db_session: Session, monkeypatch
+):
+    _add_rows(test_db_session)
+    calls = []
+    get_version = FuelRepository.get_version
+
+    def count(self, years):
+        calls.append(years)
+        return get_version(self, years)
+
+    monkeypatch.setattr(FuelRepository, "get_version", count)
+    item = {
+        "report": "fuel/consumo_promedio_mensual",
+        "params": {"year": YEAR},
+    }
+    response = client.post(
+        "/api/reports/batch",
+        json=[
+            item,
+            item,
+            {**item, "report": "fuel/consumo_anual_por_categoria"},
+            {**item, "report": "fuel/porcentaje_por_segmento_anual"},
+            {**item, "report": "fuel/min_max_consumo_meses"},
+        ],
+    )
+
+    results = response.json()["data"]
+    assert results[0] == results[1]
+    assert {result["status_code"] for result in results} == {200}
+    assert len(calls) == 1
+
+
+def test_batch_reports_errors_per_report(
+    client: TestClient, test_db_session: Session
+):
+    _add_rows(test_db_session)
+    response = client.post(
+        "/api/reports/batch",
+        json=[
+            {"report": "fuel/consumo_promedio_mensual", "params": {}},
+            {
+                "report": "fuel/consumo_promedio_mensual",
+                "params": {"year": dt.now().year + 1},
+            },
+            {"report": "fuel/unknown", "params": {"year": YEAR}},
+            {
+                "report": "fuel/consumo_promedio_mensual",
+                "params": {"year": YEAR, "location": "A"},
+            },
+            {
+                "report": "energy/consumo_promedio_mensual",
+                "params": {"year": YEAR, "location": "nowhere"},
+            },
+            {
+                "report": "fuel/consumo_promedio_mensual",
+                "params": {"year": str(YEAR)},
+            },
+        ],
+    )
+
+    assert response.status_code == 200
+    results = response.json()["data"]
+    assert [result["status_code"] for result in results] == [
+        400,
+        400,
+        404,
+        400,
+        422,
+        200,
+    ]
+    assert "data" not in results[0]
+    assert results[0]["detail"] == "Year is required"
+
+
+def test_batch_reports_database_errors_per_report(
+    client: TestClient, test_db_session: Session, monkeypatch
+):
+    _add_rows(test_db_session)
+
+    def fail(self, *args):
+        raise OperationalError("SELECT 1", {}, Exception("connection lost"))
+
+    monkeypatch.setattr(OilRepository, "get_version", fail)
+    response = client.post(
+        "/api/reports/batch",
+        json=[
+            {
+                "report": "fuel/consumo_promedio_mensual",
+                "params": {"year": YEAR},
+            },
+            {"report": "oil/consumo_mensual_aceite", "params": {"year": YEAR}},
+        ],
+    )
+
+    assert response.status_code == 200
+    results = response.json()["data"]
+    assert [result["status_code"] for result in results] == [200, 500]
+    assert "data" not in results[1]
+
+
+def test_batch_size_is_limited(client: TestClient):
+    item = {
+        "report": "fuel/consumo_promedio_mensual",
+        "params": {"year": YEAR},
+    }
+
+    response = client.post(
+        "/api/reports/batch", json=[item] * (MAX_BATCH_REPORTS + 1)
+    )
+
+    assert response.status_code == 422
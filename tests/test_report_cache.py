@@ -0,0 +1,71 @@
+from datetime import datetime as dt
+
+import pytest
+from fastapi.testclient import TestClient
+from sqlmodel import Session
+
+from app.definitions import EmissionType, FuelType
+from app.infrastructure import report_cache
+
+URL = "/api/fuel/consumo_anual_por_categoria/"
+
+
+@pytest.fixture(autouse=True)
+def enabled_report_cache(monkeypatch):
+    # Off by default, a single worker can turn it on
+    monkeypatch.setattr(report_cache, "ttl", 300)
+
+
+def _create_fuel(client: TestClient, datetime: dt, quantity: float = 10):
+    response = client.post(
+        "/api/fuel",
+        json={
+            "quantity": quantity,
+            "datetime": datetime.isoformat(),
+            "fuel_type": FuelType.COMBUSTIBLE_ADMINISTRATIVO.value,
+            "emission_type": EmissionType.EMISIONES_DIRECTAS.value,
+        },
+    )
+    assert response.status_code == 200
+    return response.json()
+
+
+def test_report_is_cached(client: TestClient, test_db_session: Session):
+    year = dt.now().year
+    _create_fuel(client, dt(year, 1, 1))
+    hits = report_cache.stats()["hits"]
+
+    first = client.get(URL, params={"year": year})
+    second = client.get(URL, params={"year": year})
+
+    assert first.json() == second.json()
+    assert report_cache.stats()["hits"] == hits + 1
+
+
+def test_write_invalidates_its_year(
+    client: TestClient, test_db_session: Session
+):
+    year = dt.now().year
+    _create_fuel(client, dt(year, 1, 1))
+    _create_fuel(client, dt(year - 1, 1, 1))
+    client.get(URL, params={"year": year})
+    client.get(URL, params={"year": year - 1})
+    assert report_cache.stats()["size"] == 2
+
+    # Only the report of the year written to is dropped
+    fuel = _create_fuel(client, dt(year, 2, 1), quantity=30)
+    assert report_cache.stats()["size"] == 1
+
+    client.get(URL, params={"year": year})
+    response = client.delete(f"/api/fuel/{fuel['id']}")
+    assert response.status_code == 200
+    assert report_cache.stats()["size"] == 1
+
+
+def test_route_stats(
+    client: TestClient, test_db_session: Session, admin_headers
+):
+    response = client.get("/api/internal/report_cache", headers=admin_headers)
+
+    assert response.status_code == 200
+    assert {"hits", "misses", "size"} <= set(response.json()["data"])
@@ -0,0 +1,119 @@
+from datetime import datetime as dt
+
+import pytest
+from fastapi.testclient import TestClient
+from sqlmodel import Session
+
+from app.definitions import EmissionType, FuelType, OilCategory, OilType
+from app.models import Fuel, Oil
+from app.services import OilService
+
+URL = "/api/oil/consumo_mensual_aceite"
+
+
+def _add_oil(session: Session, datetime: dt) -> Oil:
+    oil = Oil(
+        quantity=10,
+        datetime=datetime,
+        oil_type=OilType.ACEITE,
+        oil_category=OilCategory.CONSUMO_ADMINISTRATIVO,
+        emission_type=EmissionType.EMISIONES_DIRECTAS,
+    )
+    session.add(oil)
+    session.commit()
+    return oil
+
+
+def test_report_has_validators(client: TestClient, test_db_session: Session):
+    year = dt.now().year
+    _add_oil(test_db_session, dt(year, 1, 1))
+
+    response = client.get(URL, params={"year": year})
+
+    assert response.status_code == 200
+    assert response.headers["ETag"].startswith('"')
+    assert "Last-Modified" in response.headers
+    assert response.headers["Cache-Control"] == "no-cache"
+
+
+def test_not_modified_skips_the_report(
+    client: TestClient, test_db_session: Session, monkeypatch
+):
+    year = dt.now().year
+    _add_oil(test_db_session, dt(year, 1, 1))
+    etag = client.get(URL, params={"year": year}).headers["ETag"]
+
+    async def report(*args, **kwargs):
+        pytest.fail("The report ran for a current ETag")
+
+    monkeypatch.setattr(
+        OilService, "get_monthly_consumption_by_type_and_year", report
+    )
+    response = client.get(
+        URL, params={"year": year}, headers={"If-None-Match": f"W/{etag}"}
+    )
+
+    assert response.status_code == 304
+    assert response.headers["ETag"] == etag
+    assert response.content == b""
+
+
+def test_writes_change_the_etag(client: TestClient, test_db_session: Session):
+    year = dt.now().year
+    oil = _add_oil(test_db_session, dt(year, 1, 1))
+    response = client.get(URL, params={"year": year})
+    first, body = response.headers["ETag"], response.content
+
+    _add_oil(test_db_session, dt(year - 1, 1, 1))
+    response = client.get(
+        URL, params={"year": year}, headers={"If-None-Match": first}
+    )
+    assert response.status_code == 304
+
+    _add_oil(test_db_session, dt(year, 1, 2))
+    response = client.get(
+        URL, params={"year": year}, headers={"If-None-Match": first}
+    )
+    assert response.status_code == 200
+    assert response.content != body
+    second = response.headers["ETag"]
+    assert second != first
+
+    test_db_session.delete(oil)
+    test_db_session.commit()
+    response = client.get(
+        URL, params={"year": year}, headers={"If-None-Match": second}
+    )
+    assert response.status_code == 200
+
+
+def test_invalid_year_is_still_rejected(client: TestClient):
+    response = client.get(URL, params={"year": 100000})
+
+    assert response.status_code == 400
+    assert "ETag" not in response.headers
+
+
+def test_cross_domain_etag_follows_its_domains(
+    client: TestClient, test_db_session: Session
+):
+    url = "/api/comparativa_energia_combustible"
+    year = dt.now().year
+    test_db_session.add(
+        Fuel(
+            quantity=10,
+            datetime=dt(year, 1, 1),
+            fuel_type=FuelType.COMBUSTIBLE_ADMINISTRATIVO,
+            emission_type=EmissionType.EMISIONES_DIRECTAS,
+        )
+    )
+    test_db_session.commit()
+    etag = client.get(url, params={"year": year}).headers["ETag"]
+
+    # The report does not read the oils
+    _add_oil(test_db_session, dt(year, 1, 1))
+    response = client.get(
+        url, params={"year": year}, headers={"If-None-Match": etag}
+    )
+
+    assert response.status_code == 304
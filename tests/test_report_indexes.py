@@ -0,0 +1,234 @@
+import re
+from datetime import datetime as dt
+from datetime import timedelta, timezone
+from typing import Any, Callable
+
+import pytest
+from sqlalchemy import delete, event, insert, text
+from sqlmodel import Session
+
+from app.definitions import (
+    EmissionType,
+    EnergyCategory,
+    EnergyLocation,
+    FuelType,
+    OilCategory,
+    OilType,
+    RoadtripGroupType,
+)
+from app.models import Energy, Fuel, Oil, Roadtrip
+from app.repositories import (
+    EnergyRepository,
+    FuelRepository,
+    OilRepository,
+    RoadtripRepository,
+)
+from app.repositories.fuel_repo import app_settings
+
+YEARS = [dt.now().year - 1]
+# Rows every day through the years before too, so the year asked for is
+# a range of the `datetime` index and not the whole table
+FIRST_YEAR = YEARS[0] - 3
+ROWS = (dt(YEARS[0] + 1, 1, 1) - dt(FIRST_YEAR, 1, 1)).days
+ENUMS = {
+    Fuel: {"fuel_type": FuelType},
+    Oil: {"oil_type": OilType, "oil_category": OilCategory},
+    Energy: {"location": EnergyLocation, "energy_category": EnergyCategory},
+    Roadtrip: {"group": RoadtripGroupType},
+}
+
+
+def _rows(enums: dict) -> list[dict]:
+    start = dt(FIRST_YEAR, 1, 1, tzinfo=timezone.utc)
+    return [
+        {
+            "quantity": i % 100,
+            "datetime": start + timedelta(days=i),
+            "emission_type": list(EmissionType)[i % len(EmissionType)],
+            **{
+                column: list(enum)[i % len(enum)]
+                for column, enum in enums.items()
+            },
+        }
+        for i in range(ROWS)
+    ]
+
+
+@pytest.fixture
+def vacuumed_rows(test_db_session: Session):
+    # Committed and vacuumed rows, so the planner knows the tables and an
+    # index only scan does not have to visit the heap. Inserted outside the
+    # ORM, the rollup is left alone.
+    engine = test_db_session.get_bind().engine
+    ids = {}
+    with engine.begin() as connection:
+        for model, enums in ENUMS.items():
+            table = model.__table__
+            ids[table] = (
+                connection.execute(
+                    insert(table).values(_rows(enums)).returning(table.c.id)
+                )
+                .scalars()
+                .all()
+            )
+    with engine.connect().execution_options(
+        isolation_level="AUTOCOMMIT"
+    ) as connection:
+        for table in ids:
+            connection.execute(text(f"VACUUM ANALYZE {table.name}"))
+    try:
+        yield
+    finally:
+        # Only the rows inserted here, the tables are shared
+        with engine.begin() as connection:
+            for table, table_ids in ids.items():
+                connection.execute(
+                    delete(table).where(table.c.id.in_(table_ids))
+                )
+
+
+def _statements(
+    session: Session, monkeypatch, report: Callable[[], Any]
+) -> list[tuple[str, Any]]:
+    # The statements a repository sends when the reports read the rows
+    monkeypatch.setattr(app_settings, "REPORT_SOURCE", "raw")
+    statements = []
+
+    def capture(connection, cursor, statement, parameters, *args):
+        statements.append((statement, parameters))
+
+    connection = session.connection()
+    event.listen(connection, "before_cursor_execute", capture)
+    try:
+        report()
+    finally:
+        event.remove(connection, "before_cursor_execute", capture)
+    assert statements
+    return statements
+
+
+def _plan(session: Session, statement: str, parameters: Any) -> str:
+    # The tables are still small, so make the planner prove it *can*
+    # answer from the index instead of picking a heap scan on cost.
+    session.execute(text("SET LOCAL enable_seqscan = off"))
+    session.execute(text("SET LOCAL enable_bitmapscan = off"))
+    result = session.connection().exec_driver_sql(
+        f"EXPLAIN {statement}", parameters
+    )
+    return "\n".join(row[0] for row in result)
+
+
+def _index_names(session: Session, index: str) -> set[str]:
+    # The index of a partitioned table and its copy on every partition
+    partitions = session.execute(
+        text(
+            "SELECT inhrelid::regclass::text FROM pg_inherits "
+            "WHERE inhparent = CAST(:index AS regclass)"
+        ),
+        {"index": index},
+    ).scalars()
+    return {index, *partitions}
+
+
+def _scans(plan: str) -> list[tuple[str, str]]:
+    return re.findall(
+        r"(\w[\w ]*? Scan)(?: Backward)?(?: using (\S+))? on", plan
+    )
+
+
+@pytest.mark.parametrize(
+    "repository, report, index",
+    [
+        (
+            FuelRepository,
+            lambda repository: repository.get_consumed_fuel_percentage_by_year(
+                YEARS
+            ),
+            "ix_fuel_datetime",
+        ),
+        (
+            FuelRepository,
+            lambda repository: repository.get_average_monthly_consumption(
+                YEARS
+            ),
+            "ix_fuel_datetime",
+        ),
+        (
+            FuelRepository,
+            lambda repository: repository.get_version(YEARS),
+            "ix_fuel_datetime",
+        ),
+        (
+            EnergyRepository,
+            lambda repository: (
+                repository.get_average_monthly_by_location_and_year(
+                    YEARS, EnergyLocation.PLANTA_DE_ENVASADO
+                )
+            ),
+            "ix_energy_location_datetime",
+        ),
+        (
+            EnergyRepository,
+            lambda repository: (
+                repository.get_average_monthly_of_locations_by_year(YEARS)
+            ),
+            "ix_energy_datetime",
+        ),
+        (
+            OilRepository,
+            lambda repository: repository.get_min_loss_by_type_and_year(
+                YEARS, OilType.ACEITE
+            ),
+            "ix_oil_oil_type_datetime",
+        ),
+        (
+            OilRepository,
+            lambda repository: repository.get_version(YEARS),
+            "ix_oil_datetime",
+        ),
+        (
+            RoadtripRepository,
+            lambda repository: (
+                repository.get_average_monthly_comparative_percentage(YEARS)
+            ),
+            "ix_roadtrip_datetime",
+        ),
+    ],
+)
+def test_reports_use_covering_index(
+    test_db_session: Session,
+    vacuumed_rows,
+    monkeypatch,
+    repository: type,
+    report: Callable[[Any], Any],
+    index: str,
+):
+    statements = _statements(
+        test_db_session,
+        monkeypatch,
+        lambda: report(repository(test_db_session)),
+    )
+    names = _index_names(test_db_session, index)
+
+    for statement, parameters in statements:
+        plan = _plan(test_db_session, statement, parameters)
+        scans = _scans(plan)
+        assert scans, plan
+        for kind, name in scans:
+            assert kind == "Index Only Scan" and name in names, plan
+
+
+def test_percentage_reports_scan_once(
+    test_db_session: Session, vacuumed_rows, monkeypatch
+):
+    repository = FuelRepository(test_db_session)
+    [(statement, parameters)] = _statements(
+        test_db_session,
+        monkeypatch,
+        lambda: repository.get_consumed_fuel_percentage_by_year(YEARS),
+    )
+
+    plan = _plan(test_db_session, statement, parameters)
+    # Every partition of the year range is read once, in the same pass
+    scans = re.findall(r"Scan.* on (fuel\w*)", plan)
+    assert len(scans) == len(set(scans)), plan
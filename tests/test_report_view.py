@@ -0,0 +1,163 @@
+import time
+from datetime import datetime as dt
+from datetime import timezone
+from email.utils import format_datetime
+
+import pytest
+from fastapi.testclient import TestClient
+from sqlalchemy import select, text
+from sqlmodel import Session
+
+from app.definitions import EmissionType, OilCategory, OilType
+from app.infrastructure import (
+    refresh_report_view,
+    report_cache,
+    report_view_refresher,
+)
+from app.models import REPORT_VIEW, Oil, report_view_refresh
+from app.services.closed_period import app_settings
+
+from .test_closed_years import ADMIN_TOKEN, close
+
+URL = "/api/oil/consumo_mensual_aceite"
+YEAR = dt.now().year - 1
+
+
+@pytest.fixture
+def matview(monkeypatch):
+    monkeypatch.setattr(app_settings, "REPORT_SOURCE", "matview")
+    monkeypatch.setattr(report_cache, "ttl", 0)
+
+
+def _oil(datetime: dt, quantity: float = 10) -> dict:
+    return {
+        "quantity": quantity,
+        "datetime": datetime.isoformat(),
+        "oil_type": OilType.ACEITE.value,
+        "oil_category": OilCategory.CONSUMO_ADMINISTRATIVO.value,
+        "emission_type": EmissionType.EMISIONES_DIRECTAS.value,
+    }
+
+
+def _add_oil(session: Session, datetime: dt, quantity: float = 10) -> None:
+    session.add(Oil(**_oil(datetime, quantity)))
+    session.commit()
+
+
+def _january(response) -> float:
+    return response.json()["data"]["1"]
+
+
+def test_reports_follow_the_refreshes(
+    client: TestClient, test_db_session: Session, matview
+):
+    _add_oil(test_db_session, dt(YEAR, 1, 5))
+    refresh_report_view(test_db_session.connection())
+    first = client.get(URL, params={"year": YEAR})
+    assert first.status_code == 200
+    assert _january(first) == 10
+    assert first.headers["X-Report-Refreshed-At"] == (
+        first.headers["Last-Modified"]
+    )
+
+    # Stale until the next refresh, and the ETag with it
+    _add_oil(test_db_session, dt(YEAR, 1, 6))
+    stale = client.get(
+        URL,
+        params={"year": YEAR},
+        headers={"If-None-Match": first.headers["ETag"]},
+    )
+    assert stale.status_code == 304
+
+    refresh_report_view(test_db_session.connection())
+    fresh = client.get(
+        URL,
+        params={"year": YEAR},
+        headers={"If-None-Match": first.headers["ETag"]},
+    )
+    assert fresh.status_code == 200
+    assert _january(fresh) == 20
+
+
+def test_a_refresh_without_changes_keeps_the_etag(
+    client: TestClient, test_db_session: Session, matview
+):
+    _add_oil(test_db_session, dt(YEAR, 1, 5))
+    refresh_report_view(test_db_session.connection())
+    first = client.get(URL, params={"year": YEAR})
+    cells = test_db_session.execute(
+        text(f"SELECT xmin FROM {REPORT_VIEW} ORDER BY domain, year, month")
+    ).all()
+
+    refresh_report_view(test_db_session.connection())
+    refreshed_at = test_db_session.execute(
+        select(report_view_refresh.c.refreshed_at)
+    ).scalar_one()
+    again = client.get(
+        URL,
+        params={"year": YEAR},
+        headers={"If-None-Match": first.headers["ETag"]},
+    )
+
+    # The unchanged cells are not rewritten, only the refresh time moves
+    assert (
+        test_db_session.execute(
+            text(
+                f"SELECT xmin FROM {REPORT_VIEW} ORDER BY domain, year, month"
+            )
+        ).all()
+        == cells
+    )
+    assert again.status_code == 304
+    assert again.headers["X-Report-Refreshed-At"] == format_datetime(
+        refreshed_at.astimezone(timezone.utc), usegmt=True
+    )
+
+
+def test_writes_are_folded_into_one_refresh(
+    client: TestClient, test_db_session: Session, matview, monkeypatch
+):
+    refreshes = []
+    monkeypatch.setattr(report_view_refresher, "delay", 0.2)
+    monkeypatch.setattr(
+        report_view_refresher, "_refresh", lambda: refreshes.append(dt.now())
+    )
+
+    for day in range(1, 4):
+        response = client.post("/api/oil", json=_oil(dt(YEAR, 1, day)))
+        assert response.status_code == 200
+    time.sleep(0.5)
+
+    assert len(refreshes) == 1
+    assert report_view_refresher.stats()["refreshed_at"] is not None
+
+
+def test_raw_and_rollup_sources_do_not_refresh(
+    client: TestClient, test_db_session: Session, monkeypatch, admin_headers
+):
+    monkeypatch.setattr(report_view_refresher, "delay", 0.01)
+    monkeypatch.setattr(
+        report_view_refresher,
+        "_refresh",
+        lambda: pytest.fail("The view was refreshed"),
+    )
+
+    client.post("/api/oil", json=_oil(dt(YEAR, 1, 1)))
+    time.sleep(0.1)
+
+    response = client.post(
+        "/api/internal/report_view/refresh", headers=admin_headers
+    )
+    assert response.status_code == 404
+
+
+def test_closing_a_year_refreshes_the_view(
+    client: TestClient, test_db_session: Session, matview, monkeypatch
+):
+    monkeypatch.setattr(app_settings, "ADMIN_TOKEN", ADMIN_TOKEN)
+    _add_oil(test_db_session, dt(YEAR - 1, 1, 5), 7)
+
+    assert close(client, YEAR - 1).status_code == 200
+    response = client.get(URL, params={"year": YEAR - 1})
+
+    assert _january(response) == 7
@@ -0,0 +1,218 @@
+import random
+from datetime import datetime as dt
+
+import pytest
+from fastapi.testclient import TestClient
+from sqlalchemy import event
+from sqlmodel import Session
+
+from app.definitions import (
+    EmissionType,
+    EnergyLocation,
+    FuelType,
+    OilCategory,
+    OilType,
+    RoadtripGroupType,
+)
+from app.infrastructure import refresh_report_view
+from app.models import Energy, Fuel, Oil, Roadtrip
+from app.repositories import FuelRepository
+from app.repositories.fuel_repo import app_settings
+
+YEAR = dt.now().year - 1
+YEARS = [YEAR - 2, YEAR - 1, YEAR]
+REPORTS = [
+    "/api/fuel/consumo_anual_por_categoria/",
+    "/api/fuel/consumo_promedio_mensual",
+    "/api/fuel/porcentaje_por_segmento_anual",
+    "/api/fuel/min_max_consumo_meses",
+    "/api/oil/consumo_mensual_aceite",
+    "/api/oil/mes_menos_perdida_refrigerante",
+    "/api/energy/consumo_promedio_mensual",
+    "/api/energy/consumo_promedio_mensual_por_ubicacion",
+    "/api/roadtrip/comparativa_promedio_mensual",
+    "/api/comparativa_energia_combustible",
+    "/api/promedio_mensual_petroleo",
+    "/api/consumo_por_tipo_de_emision",
+]
+
+
+def _add_rows(session: Session) -> None:
+    random.seed(22)
+    for year in YEARS:
+        for _ in range(20):
+            moment = dt(year, random.randint(1, 12), random.randint(1, 28))
+            session.add_all(
+                [
+                    Fuel(
+                        quantity=random.randint(1, 100),
+                        datetime=moment,
+                        fuel_type=random.choice(list(FuelType)),
+                        emission_type=random.choice(list(EmissionType)),
+                    ),
+                    Oil(
+                        quantity=random.randint(1, 100),
+                        datetime=moment,
+                        oil_type=random.choice(list(OilType)),
+                        oil_category=random.choice(list(OilCategory)),
+                        emission_type=random.choice(list(EmissionType)),
+                    ),
+                    Energy(
+                        quantity=random.randint(1, 100),
+                        datetime=moment,
+                        location=random.choice(list(EnergyLocation)),
+                        emission_type=random.choice(list(EmissionType)),
+                    ),
+                    Roadtrip(
+                        quantity=random.randint(1, 100),
+                        datetime=moment,
+                        group=random.choice(list(RoadtripGroupType)),
+                        emission_type=random.choice(list(EmissionType)),
+                    ),
+                ]
+            )
+    session.commit()
+    refresh_report_view(session.connection())
+
+
+@pytest.mark.parametrize("source", ["raw", "rollup", "matview"])
+def test_years_match_single_years(
+    client: TestClient, test_db_session: Session, monkeypatch, source: str
+):
+    monkeypatch.setattr(app_settings, "REPORT_SOURCE", source)
+    _add_rows(test_db_session)
+
+    for url in REPORTS:
+        response = client.get(
+            url, params={"from_year": YEARS[0], "to_year": YEARS[-1]}
+        )
+        assert response.status_code == 200, url
+        data = response.json()["data"]
+        assert list(data) == [str(year) for year in YEARS], url
+        for year in YEARS:
+            single = client.get(url, params={"year": year})
+            assert data[str(year)] == single.json()["data"], url
+
+        listed = client.get(url, params={"years": [YEARS[-1], YEARS[0]]})
+        assert listed.json()["data"] == {
+            str(year): data[str(year)] for year in (YEARS[0], YEARS[-1])
+        }, url
+
+
+def test_years_without_rows(client: TestClient, test_db_session: Session):
+    _add_rows(test_db_session)
+    empty = YEARS[0] - 1
+
+    response = client.get(
+        "/api/fuel/min_max_consumo_meses",
+        params={"years": [empty, YEAR]},
+    )
+    assert response.json()["data"][str(empty)] is None
+
+    response = client.get(
+        "/api/fuel/consumo_anual_por_categoria/",
+        params={"years": [empty, YEAR]},
+    )
+    assert set(response.json()["data"][str(empty)].values()) == {0}
+
+    response = client.get(
+        "/api/fuel/min_max_consumo_meses", params={"year": empty}
+    )
+    assert response.status_code == 404
+
+
+def test_years_are_one_statement(test_db_session: Session, monkeypatch):
+    monkeypatch.setattr(app_settings, "REPORT_SOURCE", "raw")
+    _add_rows(test_db_session)
+    statements = []
+
+    def count(connection, cursor, statement, *args):
+        statements.append(statement)
+
+    connection = test_db_session.connection()
+    event.listen(connection, "before_cursor_execute", count)
+    repository = FuelRepository(test_db_session)
+    percentages = repository.get_consumed_fuel_percentage_by_year(YEARS)
+    versions = repository.get_version(YEARS)
+    event.remove(connection, "before_cursor_execute", count)
+
+    assert len(statements) == 2
+    assert list(percentages) == YEARS
+    for year in YEARS:
+        assert sum(percentages[year].values()) == pytest.approx(1, abs=0.03)
+    assert [version.year for version in versions] == YEARS
+    assert sum(version.count for version in versions) == 20 * len(YEARS)
+
+
+def test_from_year_defaults_to_this_year(client: TestClient):
+    response = client.get(
+        "/api/fuel/consumo_promedio_mensual", params={"from_year": YEAR}
+    )
+
+    assert response.status_code == 200
+    assert list(response.json()["data"]) == [str(YEAR), str(YEAR + 1)]
+
+
+@pytest.mark.parametrize(
+    "params",
+    [
+        {},
+        {"year": YEAR, "years": [YEAR]},
+        {"year": YEAR, "from_year": YEAR},
+        {"to_year": YEAR},
+        {"from_year": YEAR, "to_year": YEAR - 1},
+        {"from_year": 1, "to_year": 100000},
+        {"years": [YEAR, dt.now().year + 1]},
+    ],
+)
+def test_invalid_years_are_rejected(client: TestClient, params: dict):
+    response = client.get("/api/fuel/consumo_promedio_mensual", params=params)
+
+    assert response.status_code == 400
+    assert "ETag" not in response.headers
+
+
+@pytest.mark.parametrize(
+    "url, first_year",
+    [
+        ("/api/comparativa_energia_combustible", 2000),
+        ("/api/promedio_mensual_petroleo", 1900),
+    ],
+)
+def test_cross_domain_years_out_of_range(
+    client: TestClient, url: str, first_year: int
+):
+    for params in (
+        {"year": first_year - 1},
+        {"from_year": first_year, "to_year": dt.now().year + 1},
+    ):
+        response = client.get(url, params=params)
+
+        assert response.status_code == 400
+        assert response.json()["detail"] == (
+            f"El año debe ser mayor a {first_year} y menor al año actual"
+        )
+
+
+def test_write_changes_the_years_etag(
+    client: TestClient, test_db_session: Session
+):
+    _add_rows(test_db_session)
+    params = {"from_year": YEARS[0], "to_year": YEARS[-1]}
+    first = client.get("/api/fuel/consumo_promedio_mensual", params=params)
+
+    client.post(
+        "/api/fuel",
+        json={
+            "quantity": 1000,
+            "datetime": dt(YEARS[1], 6, 1).isoformat(),
+            "fuel_type": FuelType.COMBUSTIBLE_DE_LOGISTICA.value,
+            "emission_type": EmissionType.EMISIONES_DIRECTAS.value,
+        },
+    )
+    second = client.get("/api/fuel/consumo_promedio_mensual", params=params)
+
+    assert second.headers["ETag"] != first.headers["ETag"]
+    data = second.json()["data"]
+    assert data[str(YEARS[1])] != first.json()["data"][str(YEARS[1])]
+    assert data[str(YEARS[0])] == first.json()["data"][str(YEARS[0])]
@@ -46,3 +46,26 @@ def test_create_invalid_emission_type(
 
     assert response.status_code == 422
     assert "value is not a valid" in body["detail"][0]["msg"]
+
+
+def test_bulk_create_records(client: TestClient, test_db_session: Session):
+    """
+    Test route to create Roadtrip records in bulk.
+    """
+
+    response = client.post(
+        "/api/roadtrip/bulk_create",
+        json=[
+            {
+                "quantity": random.randint(1, 30),
+                "datetime": dt.now().isoformat(),
+                "group": group,
+                "emission_type": random.choice(list(EmissionType)),
+            }
+            for group in RoadtripGroupType
+        ],
+    )
+    body = response.json()
+
+    assert response.status_code == 200
+    assert body["data"]["inserted"] == len(RoadtripGroupType)
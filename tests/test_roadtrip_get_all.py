@@ -35,3 +35,27 @@ def test_route_response(client: TestClient, test_db_session: Session):
 
     assert response.status_code == 200
     assert len(body) == 1
+
+
+def test_route_group_filter(client: TestClient, test_db_session: Session):
+    roadtrip_repo = RoadtripRepository(test_db_session)
+    for group in RoadtripGroupType:
+        roadtrip_repo.create(
+            Roadtrip(
+                quantity=random.randint(1, 300),
+                datetime=dt.now(),
+                group=group,
+                emission_type=random.choice(list(EmissionType)),
+            )
+        )
+
+    response = client.get(
+        "/api/roadtrip",
+        params={"group": RoadtripGroupType.EQUIPO_DE_VENTAS.value},
+    )
+    body = response.json()
+
+    assert response.status_code == 200
+    assert [roadtrip["group"] for roadtrip in body] == [
+        RoadtripGroupType.EQUIPO_DE_VENTAS.value
+    ]
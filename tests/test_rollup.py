@@ -0,0 +1,336 @@
+import random
+import threading
+import time
+from datetime import datetime as dt
+from datetime import timedelta, timezone
+
+import pytest
+from fastapi.testclient import TestClient
+from sqlalchemy import delete, event, func, insert, select, text
+from sqlmodel import Session
+
+from app.definitions import (
+    EmissionType,
+    EnergyLocation,
+    FuelType,
+    OilCategory,
+    OilType,
+    RoadtripGroupType,
+)
+from app.infrastructure import refresh_report_view, report_cache, row_year
+from app.infrastructure.db import engine
+from app.infrastructure.rollup import KEY_COLUMNS, refresh_cells
+from app.models import Energy, Fuel, MonthlyRollup, Oil, Roadtrip
+from app.repositories import FuelRepository, ReportRepository
+from app.repositories.fuel_repo import app_settings
+
+YEAR = dt.now().year - 1
+REPORTS = [
+    "/api/fuel/consumo_anual_por_categoria/",
+    "/api/fuel/consumo_promedio_mensual",
+    "/api/fuel/porcentaje_por_segmento_anual",
+    "/api/fuel/min_max_consumo_meses",
+    "/api/oil/consumo_mensual_aceite",
+    "/api/oil/mes_menos_perdida_refrigerante",
+    "/api/energy/consumo_promedio_mensual",
+    "/api/roadtrip/comparativa_promedio_mensual",
+    "/api/comparativa_energia_combustible",
+    "/api/promedio_mensual_petroleo",
+]
+
+
+def _fuel(datetime: dt, quantity: float = 10) -> dict:
+    return {
+        "quantity": quantity,
+        "datetime": datetime.isoformat(),
+        "fuel_type": FuelType.COMBUSTIBLE_ADMINISTRATIVO.value,
+        "emission_type": EmissionType.EMISIONES_DIRECTAS.value,
+    }
+
+
+def _cells(session: Session) -> list[tuple]:
+    return session.exec(
+        select(
+            MonthlyRollup.month,
+            MonthlyRollup.category,
+            MonthlyRollup.count,
+            MonthlyRollup.sum,
+            MonthlyRollup.min,
+            MonthlyRollup.max,
+        )
+        .where(MonthlyRollup.domain == "fuel")
+        .order_by(MonthlyRollup.month)
+    ).all()
+
+
+def _raw_cells(session: Session) -> list[tuple]:
+    # The rollup as the migration backfills it
+    return session.exec(
+        text(
+            """
+            SELECT
+                'fuel',
+                extract(year FROM datetime AT TIME ZONE 'UTC')::int,
+                extract(month FROM datetime AT TIME ZONE 'UTC')::int,
+                fuel_type::text,
+                coalesce(emission_type::text, ''),
+                count(*),
+                sum(quantity),
+                min(quantity),
+                max(quantity)
+            FROM fuel
+            GROUP BY 2, 3, 4, 5
+            ORDER BY 2, 3, 4, 5
+            """
+        )
+    ).all()
+
+
+def test_writes_maintain_the_rollup(
+    client: TestClient, test_db_session: Session
+):
+    response = client.post("/api/fuel", json=_fuel(dt(YEAR, 1, 5), 10))
+    fuel_id = response.json()["id"]
+    client.post(
+        "/api/fuel/bulk_create",
+        json=[_fuel(dt(YEAR, 1, 6), 4), _fuel(dt(YEAR, 2, 1), 7)],
+    )
+    test_db_session.add(Fuel(**_fuel(dt(YEAR, 1, 7), 20)))
+    test_db_session.commit()
+
+    assert _cells(test_db_session) == [
+        (1, FuelType.COMBUSTIBLE_ADMINISTRATIVO.name, 3, 34, 4, 20),
+        (2, FuelType.COMBUSTIBLE_ADMINISTRATIVO.name, 1, 7, 7, 7),
+    ]
+
+    # Moving the row recomputes the cells it left and joined
+    client.put(
+        f"/api/fuel/{fuel_id}",
+        json={"datetime": dt(YEAR, 2, 3).isoformat()},
+    )
+    assert _cells(test_db_session) == [
+        (1, FuelType.COMBUSTIBLE_ADMINISTRATIVO.name, 2, 24, 4, 20),
+        (2, FuelType.COMBUSTIBLE_ADMINISTRATIVO.name, 2, 17, 7, 10),
+    ]
+
+    fuels = client.get("/api/fuel").json()
+    for fuel in fuels:
+        if fuel["datetime"].startswith(f"{YEAR}-02"):
+            client.delete(f"/api/fuel/{fuel['id']}")
+    assert [cell[0] for cell in _cells(test_db_session)] == [1]
+
+
+def test_rollup_matches_the_rows(client: TestClient, test_db_session: Session):
+    random.seed(16)
+    client.post(
+        "/api/fuel/bulk_create",
+        json=[
+            {
+                **_fuel(
+                    dt(YEAR, random.randint(1, 12), random.randint(1, 28)),
+                    random.randint(1, 100),
+                ),
+                "fuel_type": random.choice(list(FuelType)).value,
+                "emission_type": random.choice(list(EmissionType)).value,
+            }
+            for _ in range(200)
+        ],
+    )
+    test_db_session.execute(text("UPDATE fuel SET quantity = quantity + 1"))
+    test_db_session.commit()
+    # Statements outside the ORM are not tracked, refresh what they touched
+    cells = [row[:5] for row in _raw_cells(test_db_session)]
+    refresh_cells(test_db_session.connection(), cells)
+    test_db_session.commit()
+
+    rollup = test_db_session.exec(
+        select(
+            *(
+                column
+                for column in MonthlyRollup.__table__.c
+                if column.name != "last_modified"
+            )
+        )
+        .where(MonthlyRollup.domain == "fuel")
+        .order_by(*MonthlyRollup.__table__.primary_key)
+    ).all()
+    assert rollup == _raw_cells(test_db_session)
+
+
+@pytest.mark.parametrize("source", ["rollup", "matview"])
+def test_reports_match_the_raw_source(
+    client: TestClient, test_db_session: Session, monkeypatch, source: str
+):
+    monkeypatch.setattr(report_cache, "ttl", 0)
+    random.seed(17)
+
+    def moment() -> dt:
+        return dt(YEAR, random.randint(1, 12), random.randint(1, 28), 12)
+
+    for _ in range(60):
+        test_db_session.add_all(
+            [
+                Fuel(
+                    quantity=random.randint(1, 100),
+                    datetime=moment(),
+                    fuel_type=random.choice(list(FuelType)),
+                    emission_type=random.choice(list(EmissionType)),
+                ),
+                Oil(
+                    quantity=random.randint(1, 100),
+                    datetime=moment(),
+                    oil_type=random.choice(list(OilType)),
+                    oil_category=random.choice(list(OilCategory)),
+                    emission_type=random.choice(list(EmissionType)),
+                ),
+                Energy(
+                    quantity=random.randint(1, 100),
+                    datetime=moment(),
+                    location=random.choice(list(EnergyLocation)),
+                    emission_type=random.choice(list(EmissionType)),
+                ),
+                Roadtrip(
+                    quantity=random.randint(1, 100),
+                    datetime=moment(),
+                    group=random.choice(list(RoadtripGroupType)),
+                    emission_type=random.choice(list(EmissionType)),
+                ),
+            ]
+        )
+    test_db_session.commit()
+    refresh_report_view(test_db_session.connection())
+
+    for url in REPORTS:
+        monkeypatch.setattr(app_settings, "REPORT_SOURCE", "raw")
+        raw = client.get(url, params={"year": YEAR})
+        monkeypatch.setattr(app_settings, "REPORT_SOURCE", source)
+        response = client.get(url, params={"year": YEAR})
+        assert response.status_code == 200, url
+        assert response.json() == raw.json(), url
+
+
+def test_versions_are_read_from_the_rollup(
+    client: TestClient, test_db_session: Session, monkeypatch
+):
+    client.post(
+        "/api/fuel/bulk_create",
+        json=[_fuel(dt(YEAR - 1, 5, 1)), _fuel(dt(YEAR, 1, 5))],
+    )
+    test_db_session.add(
+        Energy(
+            quantity=5,
+            datetime=dt(YEAR, 2, 1),
+            location=EnergyLocation.LOCAL,
+            emission_type=EmissionType.EMISIONES_INDIRECTAS,
+        )
+    )
+    test_db_session.commit()
+    years = [YEAR - 1, YEAR]
+    statements = []
+
+    def count(connection, cursor, statement, *args):
+        statements.append(statement)
+
+    def versions() -> tuple[list, list]:
+        return (
+            FuelRepository(test_db_session).get_version(years),
+            ReportRepository(test_db_session).get_version(
+                ("fuel", "energy"), years
+            ),
+        )
+
+    monkeypatch.setattr(app_settings, "REPORT_SOURCE", "raw")
+    raw = versions()
+    monkeypatch.setattr(app_settings, "REPORT_SOURCE", "rollup")
+    connection = test_db_session.connection()
+    event.listen(connection, "before_cursor_execute", count)
+    rollup = versions()
+    event.remove(connection, "before_cursor_execute", count)
+
+    assert rollup == raw
+    assert [(row.year, row.count) for row in rollup[0]] == [
+        (YEAR - 1, 1),
+        (YEAR, 1),
+    ]
+    assert len(statements) == 2
+    for statement in statements:
+        assert "FROM monthly_rollup" in statement
+        assert "fuel." not in statement and "energy." not in statement
+
+
+def test_empty_cells_are_dropped(client: TestClient, test_db_session: Session):
+    response = client.post("/api/fuel", json=_fuel(dt(YEAR, 3, 1)))
+    client.delete(f"/api/fuel/{response.json()['id']}")
+
+    count = test_db_session.exec(select(func.count(MonthlyRollup.domain)))
+    assert count.one() == (0,)
+
+
+def test_years_are_utc_years(client: TestClient, test_db_session: Session):
+    with engine.connect() as connection:
+        assert connection.execute(text("SHOW timezone")).scalar() == "UTC"
+    # 22:00 on New Year's Eve in UTC-3 is already the next year in UTC
+    moment = dt(YEAR - 1, 12, 31, 22, tzinfo=timezone(timedelta(hours=-3)))
+    client.post("/api/fuel", json=_fuel(moment))
+
+    cells = test_db_session.exec(
+        select(MonthlyRollup.year, MonthlyRollup.month).where(
+            MonthlyRollup.domain == "fuel"
+        )
+    ).all()
+    assert cells == [(YEAR, 1)]
+    assert test_db_session.exec(select(row_year(Fuel))).all() == [(YEAR,)]
+
+
+def test_concurrent_refreshes_of_a_cell(test_db_session: Session):
+    # Two committing writers recompute the same cell, the second one waits
+    # on the row of the first instead of inserting it again
+    engine = test_db_session.get_bind().engine
+    fuel = {**_fuel(dt(YEAR, 4, 1)), "datetime": dt(YEAR, 4, 1)}
+    cell = (
+        "fuel",
+        YEAR,
+        4,
+        FuelType.COMBUSTIBLE_ADMINISTRATIVO.name,
+        EmissionType.EMISIONES_DIRECTAS.name,
+    )
+    key = [
+        MonthlyRollup.__table__.c[column] == value
+        for column, value in zip(KEY_COLUMNS, cell)
+    ]
+    with engine.begin() as connection:
+        fuel_id = connection.execute(
+            insert(Fuel.__table__).returning(Fuel.__table__.c.id), fuel
+        ).scalar_one()
+        refresh_cells(connection, [cell])
+
+    errors = []
+
+    def refresh():
+        try:
+            with engine.begin() as connection:
+                refresh_cells(connection, [cell])
+        except Exception as err:
+            errors.append(err)
+
+    try:
+        with engine.begin() as connection:
+            refresh_cells(connection, [cell])
+            thread = threading.Thread(target=refresh)
+            thread.start()
+            # Let the other writer reach the row this one holds
+            time.sleep(0.5)
+        thread.join()
+
+        assert errors == []
+        with engine.connect() as connection:
+            rows = connection.execute(
+                select(MonthlyRollup.count).where(*key)
+            ).all()
+        assert rows == [(1,)]
+    finally:
+        with engine.begin() as connection:
+            connection.execute(
+                delete(Fuel.__table__).where(Fuel.__table__.c.id == fuel_id)
+            )
+            connection.execute(delete(MonthlyRollup.__table__).where(*key))
@@ -0,0 +1,117 @@
+from datetime import datetime as dt
+
+import pytest
+from fakeredis import FakeServer, aioredis
+from fastapi.testclient import TestClient
+from sqlmodel import Session
+
+from app.definitions import EmissionType, OilCategory, OilType
+from app.infrastructure import report_cache, shared_report_cache
+from app.infrastructure.shared_cache import SharedReportCache
+from app.models import Oil
+from app.services import OilService
+
+URL = "/api/oil/consumo_mensual_aceite"
+
+
+@pytest.fixture
+def server(monkeypatch) -> FakeServer:
+    server = FakeServer()
+    monkeypatch.setattr(
+        shared_report_cache, "client", aioredis.FakeRedis(server=server)
+    )
+    monkeypatch.setattr(shared_report_cache, "ttl", 300)
+    # As when `REPORT_CACHE_URL` is set
+    monkeypatch.setattr(report_cache, "ttl", 0)
+    return server
+
+
+def _add_oil(session: Session, datetime: dt, quantity: float = 10) -> None:
+    session.add(
+        Oil(
+            quantity=quantity,
+            datetime=datetime,
+            oil_type=OilType.ACEITE,
+            oil_category=OilCategory.CONSUMO_ADMINISTRATIVO,
+            emission_type=EmissionType.EMISIONES_DIRECTAS,
+        )
+    )
+    session.commit()
+
+
+def test_hit_skips_the_database(
+    client: TestClient,
+    test_db_session: Session,
+    server: FakeServer,
+    monkeypatch,
+):
+    year = dt.now().year
+    _add_oil(test_db_session, dt(year, 1, 1))
+    first = client.get(URL, params={"year": year})
+    assert first.status_code == 200
+
+    async def report(*args, **kwargs):
+        pytest.fail("The report ran on a cache hit")
+
+    monkeypatch.setattr(
+        OilService, "get_monthly_consumption_by_type_and_year", report
+    )
+    second = client.get(URL, params={"year": year})
+
+    assert second.status_code == 200
+    assert second.content == first.content
+
+
+def test_write_invalidates_its_year(
+    client: TestClient, test_db_session: Session, server: FakeServer
+):
+    year = dt.now().year
+    _add_oil(test_db_session, dt(year, 1, 1))
+    first = client.get(URL, params={"year": year})
+
+    response = client.post(
+        "/api/oil",
+        json={
+            "quantity": 20,
+            "datetime": dt(year, 1, 2).isoformat(),
+            "oil_type": OilType.ACEITE.value,
+            "oil_category": OilCategory.CONSUMO_ADMINISTRATIVO.value,
+            "emission_type": EmissionType.EMISIONES_DIRECTAS.value,
+        },
+    )
+    assert response.status_code == 200
+
+    second = client.get(URL, params={"year": year})
+    assert second.content != first.content
+
+
+def test_write_on_another_worker_invalidates(
+    client: TestClient, test_db_session: Session, server: FakeServer
+):
+    year = dt.now().year
+    _add_oil(test_db_session, dt(year, 1, 1))
+    client.get(URL, params={"year": year})
+    misses = shared_report_cache.stats()["misses"]
+
+    # Another worker only shares the store with this one
+    worker = SharedReportCache(aioredis.FakeRedis(server=server), ttl=300)
+    client.portal.call(worker.invalidate, "oil", [year - 1])
+    client.get(URL, params={"year": year})
+    assert shared_report_cache.stats()["misses"] == misses
+
+    client.portal.call(worker.invalidate, "oil", [year])
+    client.get(URL, params={"year": year})
+    assert shared_report_cache.stats()["misses"] == misses + 1
+
+
+def test_store_errors_fall_back_to_the_database(
+    client: TestClient, test_db_session: Session, server: FakeServer
+):
+    server.connected = False
+    year = dt.now().year
+    _add_oil(test_db_session, dt(year, 1, 1))
+
+    response = client.get(URL, params={"year": year})
+
+    assert response.status_code == 200
+    assert shared_report_cache.stats()["errors"] > 0
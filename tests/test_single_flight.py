@@ -0,0 +1,139 @@
+import asyncio
+from datetime import datetime as dt
+
+import pytest
+from fastapi import FastAPI
+from httpx import AsyncClient
+from sqlalchemy.engine import Engine
+from sqlalchemy.orm import Session
+
+from app.utils.single_flight import single_flight
+
+
+class CountingService:
+    calls = 0
+
+    @single_flight
+    async def report(self, year: int, scale: int = 1):
+        CountingService.calls += 1
+        await asyncio.sleep(0.1)
+        return {"year": year * scale}
+
+
+def test_concurrent_calls_share_one_query():
+    CountingService.calls = 0
+
+    async def stampede():
+        return await asyncio.gather(
+            *(CountingService().report(2023) for _ in range(20)),
+            CountingService().report(year=2023),
+        )
+
+    results = asyncio.run(stampede())
+
+    assert CountingService.calls == 1
+    assert all(result == {"year": 2023} for result in results)
+
+
+def test_different_arguments_are_not_coalesced():
+    CountingService.calls = 0
+
+    async def mixed():
+        return await asyncio.gather(
+            CountingService().report(2022),
+            CountingService().report(2023),
+            CountingService().report(2023, scale=2),
+        )
+
+    results = asyncio.run(mixed())
+
+    assert CountingService.calls == 3
+    assert results == [{"year": 2022}, {"year": 2023}, {"year": 4046}]
+
+
+def test_finished_calls_are_not_reused():
+    CountingService.calls = 0
+
+    asyncio.run(CountingService().report(2023))
+    asyncio.run(CountingService().report(2023))
+
+    assert CountingService.calls == 2
+
+
+class Repository:
+    def __init__(self, session: Session):
+        self.session = session
+
+
+class SessionService:
+    def __init__(self, session: Session):
+        self.repository = Repository(session)
+        self.done = False
+
+    @single_flight
+    async def report(self, year: int):
+        await asyncio.sleep(0.1)
+        self.done = True
+        return self.repository.session
+
+
+def test_the_shared_call_runs_on_the_first_session():
+    services = [SessionService(Session()), SessionService(Session())]
+
+    async def stampede():
+        first = asyncio.ensure_future(services[0].report(2023))
+        await asyncio.sleep(0)
+        second = asyncio.ensure_future(services[1].report(2023))
+        await asyncio.sleep(0)
+        # The request that started the call goes away, but its session
+        # must stay open until the call is done
+        first.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await first
+        assert services[0].done
+        return await second
+
+    session = asyncio.run(stampede())
+
+    assert session is services[0].repository.session
+
+
+def test_the_shared_call_is_cancelled_with_its_last_caller():
+    service = SessionService(Session())
+
+    async def cancel():
+        first = asyncio.ensure_future(service.report(2023))
+        await asyncio.sleep(0)
+        first.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await first
+        return await SessionService(Session()).report(2023)
+
+    session = asyncio.run(cancel())
+
+    assert not service.done
+    assert session is not service.repository.session
+
+
+def test_concurrent_requests_fit_in_one_connection(
+    app: FastAPI, one_connection: Engine
+):
+    # Followers wait on the first request's connection instead of checking
+    # out one of their own, so a stampede never exhausts the pool
+    url = "/api/fuel/consumo_promedio_mensual"
+
+    async def stampede():
+        async with AsyncClient(app=app, base_url="http://test") as client:
+            return await asyncio.gather(
+                *(
+                    client.get(url, params={"year": dt.now().year})
+                    for _ in range(6)
+                )
+            )
+
+    responses = asyncio.run(stampede())
+
+    assert [response.status_code for response in responses] == [200] * 6
+    # The version read is coalesced too, so no request waited for the
+    # connection until the timeout
+    assert one_connection.pool.stats()["timeouts"] == 0
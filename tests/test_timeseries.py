@@ -0,0 +1,97 @@
+from datetime import datetime as dt
+
+import pytest
+from fastapi.testclient import TestClient
+from sqlmodel import Session
+
+from app.definitions import (
+    EmissionType,
+    EnergyLocation,
+    OilCategory,
+    OilType,
+)
+from app.infrastructure import monthly_series, refresh_report_view
+from app.infrastructure.timeseries import app_settings
+from app.models import Energy, Oil, Roadtrip
+
+YEAR = dt.now().year - 1
+
+
+@pytest.fixture(params=["raw", "rollup", "matview"])
+def source(request, monkeypatch) -> str:
+    monkeypatch.setattr(app_settings, "REPORT_SOURCE", request.param)
+    return request.param
+
+
+def _values(session: Session, statement) -> list:
+    return session.exec(statement).one().values
+
+
+def test_months_without_rows_are_zero(test_db_session: Session, source):
+    for month, quantity, location in (
+        (2, 10, EnergyLocation.LOCAL),
+        (2, 5, EnergyLocation.LOCAL),
+        (7, 3, EnergyLocation.LOCAL),
+        (7, 100, EnergyLocation.DESCONOCIDO),
+        (12, 8, None),
+    ):
+        test_db_session.add(
+            Energy(
+                quantity=quantity,
+                datetime=dt(YEAR, month, 15),
+                location=location,
+                emission_type=EmissionType.EMISIONES_INDIRECTAS,
+            )
+        )
+    test_db_session.commit()
+    refresh_report_view(test_db_session.connection())
+
+    local = _values(
+        test_db_session,
+        monthly_series(Energy, (YEAR,), category=EnergyLocation.LOCAL),
+    )
+    assert local == [0, 15, 0, 0, 0, 0, 3, 0, 0, 0, 0, 0]
+
+    unknown = _values(
+        test_db_session, monthly_series(Energy, (YEAR,), category=None)
+    )
+    assert unknown == [0] * 11 + [8]
+
+    counts = _values(
+        test_db_session, monthly_series(Energy, (YEAR,), aggregate="count")
+    )
+    assert counts == [0, 2, 0, 0, 0, 0, 2, 0, 0, 0, 0, 1]
+
+    largest = _values(
+        test_db_session, monthly_series(Energy, (YEAR,), aggregate="max")
+    )
+    assert largest == [0, 10, 0, 0, 0, 0, 100, 0, 0, 0, 0, 8]
+
+
+def test_empty_year(test_db_session: Session, source):
+    values = _values(test_db_session, monthly_series(Roadtrip, (YEAR,)))
+
+    assert values == [0] * 12
+
+
+def test_oil_keeps_its_month_keys(
+    client: TestClient, test_db_session: Session
+):
+    test_db_session.add(
+        Oil(
+            quantity=4,
+            datetime=dt(YEAR, 3, 1, 12),
+            oil_type=OilType.ACEITE,
+            oil_category=OilCategory.CONSUMO_LOGISTICO,
+            emission_type=EmissionType.EMISIONES_DIRECTAS,
+        )
+    )
+    test_db_session.commit()
+
+    response = client.get(
+        "/api/oil/consumo_mensual_aceite", params={"year": YEAR}
+    )
+
+    assert response.json()["data"] == {
+        str(month): 4 if month == 3 else 0 for month in range(1, 13)
+    }